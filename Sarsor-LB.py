@@ -1,15 +1,12 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import datetime
 import os
+import io
 import hashlib
 import streamlit.components.v1 as components
 import json
-from PIL import Image
-import base64
 from dotenv import load_dotenv
-import matplotlib.pyplot as plt
 import time
 st.set_page_config(page_title="Monthly Leaderboard", layout="wide")
 
@@ -123,14 +120,30 @@ def verify_password(password):
         return False
 
 # Data management
+# Parse ISO dates in one vectorized pass; only the rows that fail fall back to format inference
+def parse_dates(raw):
+    dates = pd.to_datetime(raw, format='%Y-%m-%d', errors='coerce')
+    failed = dates.isna() & raw.notna()
+    if failed.any():
+        dates[failed] = pd.to_datetime(raw[failed], format='mixed')
+    return dates, raw[failed].astype(str).tolist()
+
+# Cached by the file's bytes, so reloading an unchanged file skips parsing
+@st.cache_data(show_spinner=False, max_entries=4)
+def parse_data(content):
+    df = pd.read_csv(io.BytesIO(content))
+    df['Date'], fallbacks = parse_dates(df['Date'])
+    df['Month'] = df['Date'].dt.to_period('M')
+    return df, fallbacks
+
 # Improve error handling in load_data
 def load_data():
     try:
         if os.path.exists(DATA_FILE):
-            df = pd.read_csv(DATA_FILE)
-            # Handle different date formats more flexibly
-            df['Date'] = pd.to_datetime(df['Date'], format='mixed')
-            df['Month'] = pd.to_datetime(df['Date']).dt.to_period('M')
+            with open(DATA_FILE, 'rb') as f:
+                df, fallbacks = parse_data(f.read())
+            if fallbacks:
+                st.warning(f"{len(fallbacks)} entries have non-ISO dates, e.g. {', '.join(fallbacks[:5])}")
             return df
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -222,10 +235,19 @@ def display_leaderboard(cumulative_df, badges_data):
             # Ensure all required columns exist
             display_df = cumulative_df[['Name', 'Rank', 'Base Points', 'Bonus Points', 'Total Points']]
 
+            # A native progress column replaces the Styler gradient, which
+            # computed and serialized a colour for every cell on each rerun.
             st.dataframe(
-                display_df.style
-                .background_gradient(subset=['Total Points'], cmap='YlGn')
-                .format({'Base Points': '{:.0f}', 'Bonus Points': '{:.0f}', 'Total Points': '{:.0f}'}),
+                display_df,
+                column_config={
+                    'Base Points': st.column_config.NumberColumn(format="%d"),
+                    'Bonus Points': st.column_config.NumberColumn(format="%d"),
+                    'Total Points': st.column_config.ProgressColumn(
+                        format="%d",
+                        min_value=min(0, int(display_df['Total Points'].min())),
+                        max_value=max(1, int(display_df['Total Points'].max()))
+                    )
+                },
                 use_container_width=True,
                 hide_index=True
             )
@@ -322,6 +344,7 @@ def display_badge_analytics(badges_data):
                 badge_counts[badge] = badge_counts.get(badge, 0) + 1
 
         badge_df = pd.DataFrame(list(badge_counts.items()), columns=['Badge', 'Count'])
+        import plotly.express as px
         fig = px.bar(badge_df, x='Badge', y='Count', title='Badge Distribution')
         st.plotly_chart(fig, use_container_width=True)
 
@@ -655,20 +678,15 @@ if st.session_state.admin:
 
 current_tab = st.tabs(tabs)
 
-def calculate_cumulative_points(df, current_month):
+def calculate_cumulative_points(df, current_month=None):
     try:
-        # Create a copy of the dataframe to avoid modifications to original
-        df = df.copy()
-
-        # Ensure Date column is datetime with flexible parsing
-        df['Date'] = pd.to_datetime(df['Date'], format='mixed')
-
-        # Convert current_month to Period if needed
-        if isinstance(current_month, str):
-            current_month = pd.Period(current_month)
-
-        # Filter for current month
-        monthly_df = df[df['Month'] == current_month].copy()
+        # Dates were parsed once by load_data; Month is derived from them.
+        monthly_df = df
+        if current_month is not None:
+            # Convert current_month to Period if needed
+            if isinstance(current_month, str):
+                current_month = pd.Period(current_month)
+            monthly_df = df[df['Month'] == current_month]
 
         if monthly_df.empty:
             return pd.DataFrame(columns=['Name', 'Rank', 'Base Points', 'Bonus Points', 'Total Points'])
@@ -771,6 +789,7 @@ with current_tab[analytics_tab_index]:
     monthly_df = st.session_state.df[st.session_state.df['Month'] == current_month]
 
     if not monthly_df.empty:
+        import plotly.express as px
         col1, col2 = st.columns(2)
         with col1:
             st.write("### Progress Over Time")
@@ -995,27 +1014,18 @@ if st.session_state.admin:
 
                             if st.button("Update Entry"):
                                 try:
-                                    # Remove existing entry
-                                    remove_mask = ~((st.session_state.df['Date'].dt.date == selected_date) &
-                                                 (st.session_state.df['Name'] == selected_entry_name))
-                                    st.session_state.df = st.session_state.df[remove_mask]
-
-                                    # Create updated entry
+                                    # Update the entry in place, keyed by (Date, Name)
+                                    df = st.session_state.df
+                                    keys = date_entries.index[entry_mask]
                                     updated_entry = {
-                                        'Name': selected_entry_name,
-                                        'Date': pd.to_datetime(selected_date),
-                                        'Month': pd.Period(selected_date, freq='M'),
                                         **base_points,
                                         'Base Points': total_base,
                                         'Bonus Points': bonus_points,
                                         'Total Points': total_points
                                     }
-
-                                    # Add the updated entry
-                                    st.session_state.df = pd.concat([
-                                        st.session_state.df,
-                                        pd.DataFrame([updated_entry])
-                                    ], ignore_index=True)
+                                    df.loc[keys[0], list(updated_entry)] = list(updated_entry.values())
+                                    if len(keys) > 1:
+                                        df.drop(index=keys[1:], inplace=True)
 
                                     # Save the updated dataframe
                                     save_data(st.session_state.df)
@@ -0,0 +1,140 @@
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+def day_number(date):
+    """Returns a date as a day count since the epoch."""
+    return int(pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype('int64'))
+
+def day_date(day):
+    """Returns the date of a day count since the epoch."""
+    return np.datetime64(int(day), 'D').astype(object)
+
+class ActivityIndex:
+    """One bit per participant per day, set when the participant has a daily entry that day.
+
+    Each participant's days are a Python int whose bit i stands for day
+    `origin + i`. The index is immutable: `with_day` returns a new index that
+    shares every other participant's bitmap.
+    """
+    __slots__ = ('origin', 'bits')
+
+    def __init__(self, origin, bits):
+        self.origin = origin
+        self.bits = bits  # participant ID -> int bitmap
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Builds the index from the daily lines of a ledger frame."""
+        daily = frame[frame['Source'] == 'daily'] if not frame.empty else frame
+        if daily.empty:
+            return cls(day_number(datetime.now().date()), {})
+        days = pd.to_datetime(daily['Date']).to_numpy().astype('datetime64[D]').astype('int64')
+        pids = daily['Participant ID'].to_numpy(dtype='int64')
+        origin = int(days.min())
+        order = np.lexsort((days, pids))
+        pids, offsets = pids[order], days[order] - origin
+        unique, starts = np.unique(pids, return_index=True)
+        bits = {}
+        for pid, participant_offsets in zip(unique.tolist(), np.split(offsets, starts[1:])):
+            row = np.zeros(participant_offsets[-1] + 1, dtype=bool)
+            row[participant_offsets] = True
+            bits[pid] = int.from_bytes(np.packbits(row, bitorder='little').tobytes(), 'little')
+        return cls(origin, bits)
+
+    def with_day(self, participant_id, day, active):
+        """Returns the index with one participant's bit for day set or cleared."""
+        origin, bits = self.origin, dict(self.bits)
+        if day < origin:
+            # A day before the first one seen: move the origin back and shift every bitmap.
+            shift = origin - day
+            bits = {pid: value << shift for pid, value in bits.items()}
+            origin = day
+        mask = 1 << (day - origin)
+        value = bits.get(participant_id, 0)
+        value = value | mask if active else value & ~mask
+        if value:
+            bits[participant_id] = value
+        else:
+            bits.pop(participant_id, None)
+        return ActivityIndex(origin, bits)
+
+    # --- Queries ---
+
+    def _offset(self, date):
+        return day_number(date) - self.origin
+
+    def _range(self, participant_id, start, end):
+        """Returns the participant's bits for days start..end (inclusive) and the number of days."""
+        first, last = max(self._offset(start), 0), self._offset(end)
+        if last < first:
+            return 0, max(0, self._offset(end) - self._offset(start) + 1)
+        span = last - first + 1
+        value = (self.bits.get(participant_id, 0) >> first) & ((1 << span) - 1)
+        return value, self._offset(end) - self._offset(start) + 1
+
+    def last_active(self, participant_id):
+        """Returns the latest date the participant was active, or None."""
+        value = self.bits.get(participant_id, 0)
+        return day_date(self.origin + value.bit_length() - 1) if value else None
+
+    def current_streak(self, participant_id, today=None):
+        """Returns the run of active days ending on the latest active day, or 0 if that was before yesterday."""
+        value = self.bits.get(participant_id, 0)
+        if not value:
+            return 0
+        last = value.bit_length() - 1
+        if self._offset(today or datetime.now().date()) - last > 1:
+            return 0
+        # The highest clear bit below `last` ends the run.
+        gaps = ~value & ((1 << (last + 1)) - 1)
+        return last + 1 - gaps.bit_length()
+
+    def longest_streak(self, participant_id):
+        """Returns the longest run of consecutive active days."""
+        value = self.bits.get(participant_id, 0)
+        length = 0
+        while value:
+            # Each step shortens every run of set bits by one.
+            value &= value >> 1
+            length += 1
+        return length
+
+    def attendance(self, participant_id, start, end):
+        """Returns the share of days from start to end (inclusive) the participant was active."""
+        value, days = self._range(participant_id, start, end)
+        return value.bit_count() / days if days > 0 else 0.0
+
+    def active_count(self, date):
+        """Returns how many participants were active on a date."""
+        return len(self.active_on(date))
+
+    def active_on(self, date):
+        """Returns the IDs of the participants active on a date."""
+        offset = self._offset(date)
+        if offset < 0:
+            return set()
+        return {pid for pid, value in self.bits.items() if value >> offset & 1}
+
+    def active_dates(self):
+        """Returns every date on which anyone was active, latest first."""
+        union = 0
+        for value in self.bits.values():
+            union |= value
+        offsets = np.flatnonzero(np.unpackbits(
+            np.frombuffer(union.to_bytes((union.bit_length() + 7) // 8, 'little'), dtype=np.uint8), bitorder='little'
+        ))
+        return [day_date(self.origin + int(offset)) for offset in offsets[::-1]]
+
+    def days(self, participant_id, start, end):
+        """Returns one bool per day from start to end (inclusive): whether the participant was active."""
+        count = self._offset(end) - self._offset(start) + 1
+        if count <= 0:
+            return np.zeros(0, dtype=bool)
+        lead = max(0, -self._offset(start))
+        value, _ = self._range(participant_id, start, end)
+        active = np.unpackbits(
+            np.frombuffer(value.to_bytes((count + 7) // 8, 'little'), dtype=np.uint8), bitorder='little'
+        )[:count - lead].astype(bool)
+        return np.concatenate([np.zeros(lead, dtype=bool), active])
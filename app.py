@@ -1,41 +1,47 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
-import pandas as pd
 
-from config import APP_TITLE, DEFAULT_PARTICIPANTS
+import metrics
+import profiling
+from config import APP_TITLE, TENANT_QUERY_PARAM
+from data_manager import unit_of_work
 from auth import initialize_auth_state, login_user, logout_user
-from data_manager import load_data, save_data, initialize_month
-from systems import AchievementSystem, ChallengeSystem, StreakSystem
+from dataset import pin_snapshot, release_snapshot
+from ranking import get_ranking, get_group_rollup, get_challenge_stats, rank_baseline, PERIODS, RANK_BASELINES
+from cube import get_cube
+from systems import tenant_services
+from tenants import session_tenant
 from ui import (
-    display_leaderboard, display_analytics, display_badges, 
+    display_leaderboard, display_group_standings, display_analytics, display_badges, 
     display_achievements, display_challenges,
     display_admin_dashboard, display_entry_management, 
-    display_badge_management, display_challenge_management
+    display_badge_management, display_challenge_management,
+    display_participant_management
 )
+from ui.widgets import participant_picker
 
 st.set_page_config(page_title=APP_TITLE, layout="wide")
+metrics.start_exporter()
 
+@profiling.timed()
 def initialize_session_state():
     """Initializes all necessary session state variables."""
     initialize_auth_state()
-    if 'df' not in st.session_state:
-        st.session_state.df = load_data()
-    if 'achievement_system' not in st.session_state:
-        st.session_state.achievement_system = AchievementSystem()
-    if 'challenge_system' not in st.session_state:
-        st.session_state.challenge_system = ChallengeSystem()
-    if 'streak_system' not in st.session_state:
-        st.session_state.streak_system = StreakSystem()
     if 'user' not in st.session_state:
         st.session_state.user = None
 
-def calculate_cumulative_points(df, filter_mode):
-    # ... (Add the calculate_cumulative_points function here)
-    return pd.DataFrame() # Placeholder
-
-def main():
+def main(services):
     """Main function to run the Streamlit application."""
-    initialize_session_state()
+    # Participants, badges, the systems and the dataset are shared by every session of the tenant.
+    registry = services.registry
+    # Every reader in this rerun sees the same dataset version.
+    services.dataset.refresh(registry)
+    snapshot = pin_snapshot(services.dataset)
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        metrics.touch_session(ctx.session_id)
+    metrics.DATASET_ROWS.set(snapshot.size)
 
     st.title(f"📊 {APP_TITLE}")
 
@@ -51,14 +57,12 @@ def main():
         st.session_state.show_admin_login = True
         # Reset the input to allow re-triggering if needed
         st.query_params.clear()
+        if st.session_state.tenant:
+            st.query_params[TENANT_QUERY_PARAM] = st.session_state.tenant
 
     # --- User Selection ---
     if not st.session_state.admin:
-        st.session_state.user = st.selectbox(
-            "Select Your Name",
-            DEFAULT_PARTICIPANTS,
-            key="user_select"
-        )
+        st.session_state.user = participant_picker(registry, "Select Your Name", key="user_select")
 
     # --- Admin Login/Logout ---
     if st.session_state.show_admin_login:
@@ -76,12 +80,12 @@ def main():
     tabs = ["Leaderboard", "Analytics", "Badges", "Achievements", "Challenges"]
     if st.session_state.admin:
         tabs.insert(1, "Admin Dashboard")
-        tabs += ["Add/Edit Entries", "Manage Badges", "Manage Challenges"]
+        tabs += ["Add/Edit Entries", "Manage Badges", "Manage Challenges", "Manage Participants"]
 
     icons = ["🏅", "📈", "🎖️", "🏆", "⚔️"]
     if st.session_state.admin:
         icons.insert(1, "📊")
-        icons += ["➕", "🏅", "⚔️"]
+        icons += ["➕", "🏅", "⚔️", "👥"]
 
     current_tab = st.tabs([f"{icon} {tab}" for icon, tab in zip(icons, tabs)])
 
@@ -89,38 +93,70 @@ def main():
     with current_tab[0]:
         filter_mode = st.radio(
             "Time Period:",
-            ["This Month", "This Week", "All Time"],
+            PERIODS,
             horizontal=True,
             key="leaderboard_time_filter"
         )
-        cumulative_df = calculate_cumulative_points(st.session_state.df, filter_mode)
-        display_leaderboard(cumulative_df, st.session_state.df)
+        ranking = get_ranking(snapshot, filter_mode, registry)
+        movement_since = st.radio(
+            "Rank movement since:",
+            list(RANK_BASELINES),
+            format_func=RANK_BASELINES.get,
+            horizontal=True,
+            key="leaderboard_movement"
+        )
+        baseline = rank_baseline(snapshot, filter_mode, movement_since, registry.names)
+        display_leaderboard(ranking, snapshot, get_cube(snapshot), services.badges, baseline)
+        if services.groups.groups:
+            display_group_standings(get_group_rollup(snapshot, filter_mode, registry, services.groups), services.groups)
 
     analytics_tab_index = 2 if st.session_state.admin else 1
     with current_tab[analytics_tab_index]:
-        display_analytics(st.session_state.df, st.session_state.achievement_system, st.session_state.challenge_system)
+        display_analytics(
+            snapshot, registry, services.achievements, services.challenges,
+            snapshot.activity, get_cube(snapshot), snapshot.sketches
+        )
 
     badges_tab_index = 3 if st.session_state.admin else 2
     with current_tab[badges_tab_index]:
-        display_badges()
+        display_badges(registry, services.badges)
 
     achievements_tab_index = 4 if st.session_state.admin else 3
     with current_tab[achievements_tab_index]:
-        display_achievements(st.session_state.achievement_system)
+        display_achievements(services.achievements, registry)
 
     challenges_tab_index = 5 if st.session_state.admin else 4
     with current_tab[challenges_tab_index]:
-        display_challenges(st.session_state.challenge_system)
+        display_challenges(
+            services.challenges, registry,
+            None if st.session_state.admin else st.session_state.user,
+            get_challenge_stats(snapshot)
+        )
 
     if st.session_state.admin:
         with current_tab[1]:
-            display_admin_dashboard(st.session_state.df)
+            display_admin_dashboard(snapshot)
         with current_tab[6]:
-            display_entry_management(st.session_state.df, st.session_state.streak_system)
+            display_entry_management(snapshot.activity, registry, services.streaks)
         with current_tab[7]:
-            display_badge_management()
+            display_badge_management(registry, services.badges, services.streaks)
         with current_tab[8]:
-            display_challenge_management(st.session_state.challenge_system)
+            display_challenge_management(services.challenges, registry, services.streaks)
+        with current_tab[9]:
+            display_participant_management(registry, services.groups)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # A session's first rerun includes bootstrapping the services in a fresh process.
+    first_render = 'first_render_done' not in st.session_state
+    st.session_state.first_render_done = True
+    with profiling.rerun(), metrics.rerun(first_render):
+        initialize_session_state()
+        tenant = session_tenant()
+        if tenant is None:
+            st.error("This leaderboard does not exist. Check the link you were given.")
+            st.stop()
+        with tenant_services(tenant) as services, unit_of_work():
+            try:
+                main(services)
+            finally:
+                release_snapshot()
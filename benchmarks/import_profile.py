@@ -0,0 +1,64 @@
+
+"""Measures cold-start import cost of the app modules.
+
+Run from the repository root:
+
+    python benchmarks/import_profile.py [--runs 5] [--top 15]
+
+Each run imports the app's modules in a fresh interpreter with
+``-X importtime`` so results reflect a worker restart, not a warm rerun.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ['config', 'data_manager', 'auth', 'systems', 'ui']
+
+def run_once():
+    """Imports the app modules in a fresh interpreter and returns {module: cumulative_us}."""
+    env = dict(os.environ)
+    env.setdefault('ADMIN_HASH', 'benchmark')
+    code = '; '.join(f'import {module}' for module in APP_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            # Nested imports keep their indentation; top-level ones have none.
+            timings[name[1:].rstrip()] = int(cumulative)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    totals = [sum(run.get(module, 0) for module in APP_MODULES) for run in runs]
+    print(f"App import time (median of {args.runs}): {statistics.median(totals) / 1000:.1f} ms")
+
+    heavy = ('plotly.express', 'matplotlib', 'dotenv')
+    loaded = sorted({name.strip() for run in runs for name in run} & set(heavy))
+    print(f"Heavy modules imported at startup: {', '.join(loaded) or 'none'}")
+
+    medians = {
+        name: statistics.median(run.get(name, 0) for run in runs)
+        for name in runs[0]
+        if not name.startswith(' ')
+    }
+    print(f"\nTop {args.top} top-level imports by cumulative time:")
+    for name, micros in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+if __name__ == '__main__':
+    main()
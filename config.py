@@ -2,12 +2,15 @@
 import os
 from dotenv import load_dotenv
 
+# Fills in settings missing from the environment; never overrides them.
 load_dotenv()
 
 # --- General Settings ---
 APP_TITLE = "Monthly Leaderboard"
 
 # --- Participants ---
+# Seeds the default leaderboard's participant registry on first run (tenants
+# start empty); afterwards participants are managed from the admin UI.
 DEFAULT_PARTICIPANTS = [
     'Eman', 'Nader', 'Desha', 'Youssef', 'Menna', 'Gasser', 'Hager', 'Sondos',
     'Schrödinger', 'Khaled'
@@ -25,12 +28,38 @@ CATEGORIES = {
 }
 
 # --- File Paths ---
-DATA_FILE = 'leaderboard_data.csv'
+# Stores keyed by participant ID. They are created from the name-keyed files of
+# Sarsor-LB.py (LEGACY_FILES) on first run; those files are never rewritten, so
+# the legacy app keeps working on them.
+DATA_FILE = 'ledger.csv'
+DATA_CACHE_FILE = '.ledger.cache.parquet'  # Parsed entries, reused while the data file is unchanged
 BADGES_FILE = 'badges.json'
-PARTICIPANT_BADGES_FILE = 'participant_badges.json'
-ACHIEVEMENT_FILE = 'achievements.json'
-STREAKS_FILE = 'streaks_data.json'
-CHALLENGES_FILE = 'challenges.json'
+PARTICIPANT_BADGES_FILE = 'participant_badges_by_id.json'
+ACHIEVEMENT_FILE = 'achievements_by_id.json'
+STREAKS_FILE = 'streaks_data_by_id.json'
+CHALLENGES_FILE = 'challenges_by_id.json'
+CHALLENGES_JOURNAL_FILE = 'challenges_by_id.journal.jsonl'
+PARTICIPANTS_FILE = 'participants.json'
+GROUPS_FILE = 'groups.json'
+RANK_HISTORY_FILE = 'rank_history.json'  # Rankings frozen at the last daily and weekly boundaries
+LEGACY_FILES = {
+    DATA_FILE: 'leaderboard_data.csv',
+    PARTICIPANT_BADGES_FILE: 'participant_badges.json',
+    ACHIEVEMENT_FILE: 'achievements.json',
+    STREAKS_FILE: 'streaks_data.json',
+    CHALLENGES_FILE: 'challenges.json'
+}
+LEGACY_BACKUP_DIR = 'legacy_backup'  # Copies of the legacy files, taken when they are first migrated
+
+# --- Tenants ---
+# One process can host many leaderboards. Each tenant keeps the files above in
+# TENANTS_DIR/<name> and is selected with ?tenant=<name>; without the query
+# parameter they live in the working directory.
+TENANTS_DIR = os.getenv('TENANTS_DIR', 'tenants')
+TENANT_QUERY_PARAM = 'tenant'
+# Estimated memory of loaded tenants before the least recently used ones are evicted
+TENANT_CACHE_BYTES = int(os.getenv('TENANT_CACHE_MB', '1024')) * 2**20
+TENANT_IDLE_SECONDS = 30 * 60  # Tenants unused for this long are evicted and reloaded on their next visit
 
 # --- Admin ---
 ADMIN_HASH = os.getenv('ADMIN_HASH')
@@ -38,6 +67,42 @@ if not ADMIN_HASH:
     raise ValueError("Admin hash not configured in environment variables")
 ADMIN_CODE = "admin"
 
+# --- Leaderboard ---
+LEADERBOARD_PAGE_SIZE = 25
+LEADERBOARD_NEIGHBOUR_RADIUS = 5  # Rows shown above and below the user in "Jump to my rank"
+PARTICIPANT_SEARCH_LIMIT = 20  # Options shown by the participant search pickers
+AGGREGATION_CHUNK_ROWS = 100_000  # Rows aggregated at a time when ranking All Time
+ANALYTICS_RADAR_LIMIT = 10  # Participants drawn on the category profile chart
+ANALYTICS_DEFAULT_PARTICIPANTS = 10  # All-time leaders preselected in the analytics participant filter
+
+# --- Dataset ---
+DATASET_COMPACTION_THRESHOLD = 256  # Keyed changes kept in a snapshot overlay before it is compacted
+DATA_TAIL_CHECK_BYTES = 4096  # Bytes before the last read offset compared to detect a rewritten data file
+DATE_FALLBACK_REPORT_LIMIT = 20  # Non-ISO dates listed on the admin dashboard
+SKETCH_K = 200  # Top-level size of the entry score quantile sketches; rank error is about 1.7 / SKETCH_K
+
+# --- Ledger ---
+# Every row of the entries file is a ledger line tagged with where its points
+# came from; Ref names the challenge or punishment for non-daily lines.
+LEDGER_SOURCES = {
+    'daily': 'Daily Points',
+    'challenge': 'Challenge Points',
+    'punishment': 'Punishment Points'
+}
+
+# --- Challenges ---
+CHALLENGE_JOURNAL_COMPACTION = 500  # Journaled challenge changes replayed on load before challenges.json is rewritten
+
+# --- Profiling ---
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+PROFILING_HISTORY = 200  # Number of recent reruns kept for the performance panel
+
+# --- Metrics ---
+METRICS_FILE = os.getenv('METRICS_FILE')  # Rewritten every METRICS_INTERVAL seconds when set
+METRICS_PORT = os.getenv('METRICS_PORT')  # Serves /metrics on localhost when set
+METRICS_INTERVAL = 15  # Seconds between metrics file rewrites
+METRICS_SESSION_TIMEOUT = 300  # Seconds without a rerun before a session counts as inactive
+
 # --- Badges ---
 BADGES = {
     "🏆 Top Performer": "Awarded for consistently high performance",
@@ -93,6 +158,13 @@ STREAK_BADGES = {
     30: '🔥 Monthly Master'
 }
 
+# Awarded when a daily entry scores at or above this share of the month's entries
+PERCENTILE_BADGES = {
+    0.99: '💎 Top 1% Day',
+    0.9: '📊 Top 10% Day'
+}
+PERCENTILE_MIN_ENTRIES = 50  # Entries a month needs before percentile badges are awarded
+
 # --- Achievements ---
 ACHIEVEMENTS = {
     "performance": {
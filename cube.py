@@ -0,0 +1,149 @@
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import metrics
+from config import CATEGORIES
+from dataset import query_cache
+from profiling import timed
+
+MEASURES = list(CATEGORIES) + ['Base Points', 'Bonus Points', 'Total Points', 'Entries']
+_SUMMED = MEASURES[:-1]
+
+def month_ordinal(date):
+    """Returns the number of months between January 1970 and a date's month."""
+    date = pd.Timestamp(date)
+    return (date.year - 1970) * 12 + date.month - 1
+
+class AggregateCube:
+    """Ledger sums per participant, month and measure, held in one dense NumPy array.
+
+    `values[p, m, k]` is the sum of measure k over participant `ids[p]`'s
+    lines in month `first_month + m`; the Entries measure counts daily lines.
+    A cube is never modified: apply_changes returns an updated copy.
+    """
+    __slots__ = ('ids', 'rows', 'first_month', 'values')
+
+    def __init__(self, ids, first_month, values):
+        self.ids = ids
+        self.rows = {pid: row for row, pid in enumerate(ids)}
+        self.first_month = first_month
+        self.values = values
+
+    @classmethod
+    @timed()
+    def from_frame(cls, frame):
+        if frame.empty:
+            return cls([], month_ordinal(datetime.now()), np.zeros((0, 1, len(MEASURES))))
+        dates = pd.to_datetime(frame['Date'])
+        months = ((dates.dt.year - 1970) * 12 + dates.dt.month - 1).to_numpy()
+        ids, rows = np.unique(frame['Participant ID'].to_numpy(dtype='int64'), return_inverse=True)
+        first_month = int(months.min())
+        columns = months - first_month
+        values = np.zeros((len(ids), int(columns.max()) + 1, len(MEASURES)))
+        lines = np.column_stack([
+            frame.reindex(columns=_SUMMED, fill_value=0).fillna(0).to_numpy(dtype='float64'),
+            (frame['Source'] == 'daily').to_numpy(dtype='float64')
+        ])
+        np.add.at(values, (rows, columns), lines)
+        return cls(ids.tolist(), first_month, values)
+
+    @timed()
+    def apply_changes(self, changes):
+        """Returns the cube after keyed row changes, without regrouping the ledger."""
+        ids, first_month, values = list(self.ids), self.first_month, self.values.copy()
+        rows = dict(self.rows)
+        for old_rows, new_row in changes:
+            deltas = [(row, -1) for row in old_rows]
+            if new_row is not None:
+                deltas.append((new_row, 1))
+            for row, sign in deltas:
+                pid, month = row['Participant ID'], month_ordinal(row['Date'])
+                if pid not in rows:
+                    rows[pid] = len(ids)
+                    ids.append(pid)
+                    values = np.concatenate([values, np.zeros((1, *values.shape[1:]))])
+                if month < first_month:
+                    values = np.concatenate([np.zeros((len(ids), first_month - month, len(MEASURES))), values], axis=1)
+                    first_month = month
+                elif month - first_month >= values.shape[1]:
+                    extra = month - first_month - values.shape[1] + 1
+                    values = np.concatenate([values, np.zeros((len(ids), extra, len(MEASURES)))], axis=1)
+                line = [row.get(measure, 0) or 0 for measure in _SUMMED] + [row['Source'] == 'daily']
+                values[rows[pid], month - first_month] += sign * np.asarray(line, dtype='float64')
+        return AggregateCube(ids, first_month, values)
+
+    # --- Axes ---
+
+    @property
+    def months(self):
+        """Returns the month axis as Periods."""
+        start = pd.Period(year=1970 + self.first_month // 12, month=self.first_month % 12 + 1, freq='M')
+        return [start + offset for offset in range(self.values.shape[1])]
+
+    def _column(self, month):
+        """Returns the month axis position of a Period or date, or None when outside the cube."""
+        column = month_ordinal(month.start_time if isinstance(month, pd.Period) else month) - self.first_month
+        return column if 0 <= column < self.values.shape[1] else None
+
+    # --- Slices ---
+
+    def monthly(self, measure):
+        """Returns a participants × months array of one measure."""
+        return self.values[:, :, MEASURES.index(measure)]
+
+    def month_over_month(self, measure='Total Points'):
+        """Returns the change of a measure from each month to the next, participants × (months - 1)."""
+        return np.diff(self.monthly(measure), axis=1)
+
+    def category_profile(self, participant_id, month):
+        """Returns each category's average share of its maximum over a participant's daily entries in a month."""
+        column = self._column(month)
+        if participant_id not in self.rows or column is None:
+            return {category: 0.0 for category in CATEGORIES}
+        cell = self.values[self.rows[participant_id], column]
+        entries = cell[-1]
+        return {
+            category: cell[k] / (maximum * entries) if entries else 0.0
+            for k, (category, maximum) in enumerate(CATEGORIES.items())
+        }
+
+    def leaders(self, measure, month, count):
+        """Returns the top (participant ID, value) pairs of a measure in a month."""
+        column = self._column(month)
+        if column is None or not self.ids:
+            return []
+        scores = self.values[:, column, MEASURES.index(measure)]
+        order = np.argsort(-scores, kind='stable')[:count]
+        return [(self.ids[row], scores[row]) for row in order if scores[row] > 0]
+
+    def declining(self, months=3, measure='Total Points'):
+        """Returns the IDs of participants whose monthly totals fell for `months` consecutive complete months."""
+        last = month_ordinal(datetime.now()) - self.first_month  # the current, incomplete month
+        columns = np.arange(last - months, last)
+        if not self.ids:
+            return set()
+        window = np.zeros((len(self.ids), months))
+        inside = (columns >= 0) & (columns < self.values.shape[1])
+        window[:, inside] = self.monthly(measure)[:, columns[inside]]
+        falling = (np.diff(window, axis=1) < 0).all(axis=1)
+        return {self.ids[row] for row in np.flatnonzero(falling)}
+
+def get_cube(snapshot):
+    """Returns the tenant's cached AggregateCube for a dataset snapshot.
+
+    A cube one keyed write behind is updated from that write's delta.
+    """
+    cache = query_cache()
+    cached = cache.get('cube')
+    if cached is not None and cached[0] == snapshot.version:
+        metrics.CACHE_HITS.inc(cache='cube')
+        return cached[1]
+    if cached is not None and snapshot.changes is not None and cached[0] == snapshot.parent_version:
+        metrics.CACHE_HITS.inc(cache='cube_delta')
+        cube = cached[1].apply_changes(snapshot.changes)
+    else:
+        metrics.CACHE_MISSES.inc(cache='cube')
+        cube = AggregateCube.from_frame(snapshot.frame)
+    cache['cube'] = (snapshot.version, cube)
+    return cube
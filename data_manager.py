@@ -1,94 +1,497 @@
 
 import pandas as pd
+import csv
+import hashlib
+import io
 import json
 import os
+import shutil
+import threading
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 import streamlit as st
 from config import (
     DATA_FILE, PARTICIPANT_BADGES_FILE, ACHIEVEMENT_FILE, STREAKS_FILE, 
-    CHALLENGES_FILE, CATEGORIES, DEFAULT_PARTICIPANTS
+    CHALLENGES_FILE, CHALLENGES_JOURNAL_FILE, PARTICIPANTS_FILE, CATEGORIES, DATA_TAIL_CHECK_BYTES,
+    DATA_CACHE_FILE, DATE_FALLBACK_REPORT_LIMIT, RANK_HISTORY_FILE, GROUPS_FILE, LEGACY_FILES, LEGACY_BACKUP_DIR
 )
+from profiling import span, timed
+from metrics import BYTES_READ, BYTES_WRITTEN, STORE_SAVES, CACHE_HITS, CACHE_MISSES, DATE_PARSE_FALLBACKS
 
 # --- Data Loading ---
 
-def load_data():
-    """Loads the main leaderboard data from a CSV file."""
+# Raw Date values of the last parsed entries that needed mixed-format parsing, per data file.
+_date_fallbacks = {}
+
+def date_fallbacks():
+    """Returns the non-ISO dates found when the current tenant's entries were last parsed."""
+    return _date_fallbacks.get(data_path(DATA_FILE), [])
+
+def _parse_dates(raw):
+    """Parses ISO dates vectorized, falling back to mixed-format inference only for the rows that fail."""
+    dates = pd.to_datetime(raw, format='%Y-%m-%d', errors='coerce')
+    failed = dates.isna() & raw.notna()
+    if failed.any():
+        dates[failed] = pd.to_datetime(raw[failed], format='mixed', errors='coerce')
+        DATE_PARSE_FALLBACKS.inc(int(failed.sum()))
+        _date_fallbacks[data_path(DATA_FILE)] = raw[failed].astype(str).head(DATE_FALLBACK_REPORT_LIMIT).tolist()
+    return dates
+
+# Score columns every entry has; files written before a column existed get zeros.
+SCORE_COLUMNS = ['Base Points', 'Bonus Points', 'Total Points'] + list(CATEGORIES)
+# Lines appended by keyed edits: 'set' replaces the earlier lines under the
+# same key and 'delete' removes them; plain entries leave it empty.
+LEDGER_OP = 'Op'
+
+def _with_score_columns(df):
+    """Adds any missing score column, filled with zeros."""
+    missing = [column for column in SCORE_COLUMNS if column not in df.columns]
+    return df.assign(**{column: 0 for column in missing}) if missing else df
+
+def _prepare_entries(df):
+    """Derives the typed Date, Month and Ref columns of freshly parsed entries."""
+    df['Date'] = _parse_dates(df['Date'])
+    df['Month'] = df['Date'].dt.to_period('M')
+    if 'Ref' in df.columns:
+        df['Ref'] = df['Ref'].fillna('')
+    if LEDGER_OP in df.columns:
+        df[LEDGER_OP] = df[LEDGER_OP].fillna('')
+    return df
+
+def _parse_entries(content, parsed):
+    """Parses the bytes of the data file, reusing the cached result for identical content.
+
+    parsed holds the fingerprint and frame of the content last parsed or
+    found on disk; the on-disk cache is checked when it does not match. The
+    cache is a parquet file tagged with the fingerprint, so reading it never
+    runs code stored in the data directory.
+    """
+    fingerprint = _hash_bytes(content).hex()
+    if parsed.get('fingerprint') == fingerprint:
+        CACHE_HITS.inc(cache='parsed_entries')
+        return parsed['frame']
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _date_fallbacks.pop(data_path(DATA_FILE), None)
+    cache_path = data_path(DATA_CACHE_FILE)
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if metadata.get(b'fingerprint') == fingerprint.encode():
+            df = pq.read_table(cache_path).to_pandas()
+            CACHE_HITS.inc(cache='parsed_entries')
+            parsed.update(fingerprint=fingerprint, frame=df)
+            return df
+    except Exception:
+        # A missing, stale or unreadable cache only costs a parse.
+        pass
+
+    CACHE_MISSES.inc(cache='parsed_entries')
+    df = _prepare_entries(pd.read_csv(io.BytesIO(content), dtype={'Ref': str}))
+    parsed.update(fingerprint=fingerprint, frame=df)
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'fingerprint': fingerprint.encode()})
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pa.ArrowException):
+        # A read-only data directory only costs a parse on the next cold start.
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+@timed()
+def load_data(parsed=None):
+    """Loads the main leaderboard data from a CSV file.
+
+    parsed is the caller's in-memory parse cache (see _parse_entries); by
+    default nothing is kept in memory.
+    """
+    path = data_path(DATA_FILE)
     try:
-        if os.path.exists(DATA_FILE):
-            df = pd.read_csv(DATA_FILE)
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-            df['Month'] = df['Date'].dt.to_period('M')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                content = f.read()
+            BYTES_READ.inc(len(content), store=DATA_FILE)
+            # A trailing partial line is being appended right now; it is read on the next reload.
+            content = content[:content.rfind(b'\n') + 1] or content
+            df = _with_score_columns(_parse_entries(content, {} if parsed is None else parsed))
+            _remember_data_file(stat, len(content))
             return df
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
     
     return pd.DataFrame(columns=[
-        'Name', 'Date', 'Month', 'Base Points', 'Bonus Points', 'Total Points'
+        'Participant ID', 'Name', 'Date', 'Month', 'Source', 'Ref', 'Base Points', 'Bonus Points', 'Total Points'
     ] + list(CATEGORIES.keys()))
 
+# --- Incremental Reload ---
+
+# Identity of each tenant's DATA_FILE as last read or written by this process.
+_data_files = {}
+
+def _tail_digest(f, offset):
+    """Digests the bytes just before offset; a rewrite of the file almost surely changes them."""
+    start = max(0, offset - DATA_TAIL_CHECK_BYTES)
+    f.seek(start)
+    return _hash_bytes(f.read(offset - start))
+
+def _remember_data_file(stat, offset):
+    path = data_path(DATA_FILE)
+    with open(path, 'rb') as f:
+        columns = next(csv.reader([f.readline().decode('utf-8')]), [])
+        tail = _tail_digest(f, offset)
+    _data_files[path] = {
+        'inode': stat.st_ino,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'offset': offset,
+        'columns': columns,
+        'tail': tail
+    }
+
+@timed()
+def read_data_appends():
+    """Returns the entries appended to DATA_FILE since this process last read or wrote it.
+
+    Returns an empty frame when nothing was appended, and None when the file
+    was replaced, truncated or rewritten, in which case it must be reloaded.
+    """
+    path = data_path(DATA_FILE)
+    state = _data_files.get(path)
+    if not os.path.exists(path):
+        return None if state is not None else pd.DataFrame()
+    stat = os.stat(path)
+    if state is None or stat.st_ino != state['inode'] or stat.st_size < state['offset']:
+        return None
+    if stat.st_size == state['size'] and stat.st_mtime_ns == state['mtime']:
+        return pd.DataFrame()
+
+    with open(path, 'rb') as f:
+        if _tail_digest(f, state['offset']) != state['tail']:
+            return None
+        f.seek(state['offset'])
+        chunk = f.read(stat.st_size - state['offset'])
+    BYTES_READ.inc(len(chunk), store=DATA_FILE)
+    chunk = chunk[:chunk.rfind(b'\n') + 1]
+    if not chunk:
+        return pd.DataFrame()
+
+    df = pd.read_csv(io.BytesIO(chunk), header=None, names=state['columns'], dtype={'Ref': str})
+    _remember_data_file(stat, state['offset'] + len(chunk))
+    return _with_score_columns(_prepare_entries(df))
+
 def load_json_data(file_path: str, default_data=None):
-    """Loads data from a JSON file."""
+    """Loads data from a JSON file, or the version staged by the current unit of work."""
+    staged = _staged()
+    if staged is not None and file_path in staged:
+        return staged[file_path][0]
     if default_data is None:
         default_data = {}
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
+    with span(f"load_json_data[{file_path}]"):
+        try:
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    content = f.read()
+                    _content_hashes[file_path] = (_hash(content), _file_identity(os.fstat(f.fileno())))
+                BYTES_READ.inc(len(content.encode('utf-8')), store=file_path)
+                return json.loads(content)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return default_data
         return default_data
-    return default_data
 
 # --- Data Saving ---
 
+@timed()
 def save_data(df):
     """Saves the main leaderboard data to a CSV file."""
+    # Names live in the participant registry; entries only store the ID.
+    df = df.drop(columns=['Name'], errors='ignore')
     if 'Date' in df.columns:
         df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
-    df.to_csv(DATA_FILE, index=False)
+    if 'Source' in df.columns and LEDGER_OP not in df.columns:
+        # Keeps the column in the header, so edits can be appended.
+        df = df.assign(**{LEDGER_OP: ''})
+    path = data_path(DATA_FILE)
+    df.to_csv(path, index=False)
+    stat = os.stat(path)
+    _remember_data_file(stat, stat.st_size)
+    BYTES_WRITTEN.inc(stat.st_size, store=DATA_FILE)
+    STORE_SAVES.inc(store=DATA_FILE)
+
+@timed()
+def append_data(rows):
+    """Appends entries to the CSV file without rewriting the existing rows."""
+    path = data_path(DATA_FILE)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        save_data(pd.DataFrame(rows))
+        return
+    with open(path, 'r', newline='') as f:
+        header = next(csv.reader(f))
+    df = pd.DataFrame(rows).drop(columns=['Name'], errors='ignore')
+    if not set(df.columns) <= set(header):
+        # Appending would drop the new columns: rewrite the file with all of them once.
+        merged = pd.concat([pd.read_csv(path, dtype={'Ref': str}), df], ignore_index=True)
+        scores = [column for column in SCORE_COLUMNS if column in merged.columns]
+        merged[scores] = merged[scores].fillna(0)
+        save_data(merged)
+        return
+    df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+    content = df.reindex(columns=header).to_csv(header=False, index=False)
+    with open(path, 'a', newline='') as f:
+        before = os.fstat(f.fileno())
+        f.write(content)
+        f.flush()
+        after = os.fstat(f.fileno())
+    # Skip our own rows on the next incremental reload, unless another writer
+    # appended rows we have not read yet; then both are read back together.
+    state = _data_files.get(path)
+    if state is not None and state['inode'] == before.st_ino and state['offset'] == before.st_size:
+        _remember_data_file(after, after.st_size)
+    BYTES_WRITTEN.inc(len(content.encode('utf-8')), store=DATA_FILE)
+    STORE_SAVES.inc(store=DATA_FILE)
+
+def save_json_data(file_path: str, data, lock=None):
+    """Saves data to a JSON file, deferring the write while a unit of work is active.
+
+    lock is the RWLock guarding data when it is shared between sessions; a
+    deferred write serializes data under its read lock.
+    """
+    staged = _staged()
+    if staged is not None:
+        staged[file_path] = (data, lock)
+    else:
+        write_json_data(file_path, data)
+
+def write_json_data(file_path: str, data):
+    """Writes data to a JSON file atomically.
+
+    Skipped when the content is unchanged and the file is still the one this
+    process last read or wrote, so changes made by another process are
+    always overwritten.
+    """
+    with span(f"save_json_data[{file_path}]"):
+        content = json.dumps(data, indent=2)
+        digest = _hash(content)
+        known = _content_hashes.get(file_path)
+        if known is not None and known[0] == digest and known[1] == _current_identity(file_path):
+            return
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        identity = _file_identity(os.stat(tmp_path))
+        os.replace(tmp_path, file_path)
+        _content_hashes[file_path] = (digest, identity)
+    BYTES_WRITTEN.inc(len(content.encode('utf-8')), store=file_path)
+    STORE_SAVES.inc(store=file_path)
+
+# --- Unit of Work ---
+
+# (digest, file identity) of the content last read from or written to each JSON file.
+_content_hashes = {}
+_unit = threading.local()
+
+def _file_identity(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _current_identity(file_path):
+    try:
+        return _file_identity(os.stat(file_path))
+    except FileNotFoundError:
+        return None
 
-def save_json_data(file_path: str, data):
-    """Saves data to a JSON file."""
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+def _hash(content):
+    return _hash_bytes(content.encode('utf-8'))
+
+def _hash_bytes(content):
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+def _staged():
+    return getattr(_unit, 'staged', None)
+
+@contextmanager
+def unit_of_work():
+    """Defers JSON saves made in this thread and flushes each changed file once on exit.
+
+    Loads inside the unit see the staged data, so a store can be loaded,
+    changed and saved several times at the cost of one write.
+    """
+    if _staged() is not None:
+        yield
+        return
+    _unit.staged = {}
+    try:
+        yield
+    finally:
+        staged, _unit.staged = _unit.staged, None
+        with span("unit_of_work.flush"):
+            for file_path, (data, lock) in staged.items():
+                with lock.read() if lock is not None else nullcontext():
+                    write_json_data(file_path, data)
+
+def in_unit_of_work(func):
+    """Wraps func so that it sees this thread's unit of work and tenant when run on another thread.
+
+    Used to load stores on a thread pool while the unit still holds staged saves.
+    """
+    staged, directory = _staged(), tenant_dir()
+
+    def wrapper(*args, **kwargs):
+        previous = _staged()
+        _unit.staged = staged
+        try:
+            with tenant_scope(directory):
+                return func(*args, **kwargs)
+        finally:
+            _unit.staged = previous
+    return wrapper
+
+# --- Tenants ---
+
+_tenant = threading.local()
+
+def tenant_dir():
+    """Returns the data directory of the tenant this thread works for; '' is the working directory."""
+    return getattr(_tenant, 'directory', '')
+
+def data_path(file_name):
+    """Returns where one of the config file names lives for this thread's tenant."""
+    return os.path.join(tenant_dir(), file_name)
+
+@contextmanager
+def tenant_scope(directory):
+    """Reads and writes every store under directory for the calls made in this thread."""
+    previous = tenant_dir()
+    _tenant.directory = directory
+    try:
+        yield
+    finally:
+        _tenant.directory = previous
+
+# --- Journals ---
+
+def load_journal(file_path):
+    """Loads the records of a JSON-lines journal, ignoring a torn final line."""
+    records = []
+    with span(f"load_journal[{file_path}]"):
+        if not os.path.exists(file_path):
+            return records
+        with open(file_path, 'r') as f:
+            content = f.read()
+        BYTES_READ.inc(len(content.encode('utf-8')), store=file_path)
+        for line in content.splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+def append_journal(file_path, record):
+    """Appends one record to a JSON-lines journal."""
+    line = json.dumps(record) + '\n'
+    with open(file_path, 'a') as f:
+        f.write(line)
+    BYTES_WRITTEN.inc(len(line.encode('utf-8')), store=file_path)
+
+def clear_journal(file_path):
+    """Empties a journal after its records were compacted into the main file."""
+    if os.path.exists(file_path):
+        os.remove(file_path)
 
 # --- Data Initialization ---
 
-def initialize_month():
-    """Creates a new DataFrame for the current month with default participants."""
+def initialize_month(participant_ids):
+    """Creates a new DataFrame for the current month with the given participants."""
     current_date = pd.Timestamp(datetime.now().date()).strftime('%Y-%m-%d')
     new_month = pd.Period(datetime.now(), freq='M')
     return pd.DataFrame([{
-        'Name': name,
+        'Participant ID': pid,
         'Date': current_date,
         'Month': new_month,
+        'Source': 'daily',
+        'Ref': '',
         'Base Points': 0,
         'Bonus Points': 0,
         'Total Points': 0,
         **{k: 0 for k in CATEGORIES}
-    } for name in DEFAULT_PARTICIPANTS])
+    } for pid in participant_ids])
 
 # --- Specific Data Loaders/Savers ---
 
+def load_participants():
+    return load_json_data(data_path(PARTICIPANTS_FILE), default_data={'next_id': 1, 'participants': {}})
+
+def save_participants(data):
+    save_json_data(data_path(PARTICIPANTS_FILE), data)
+
+def load_groups():
+    return load_json_data(data_path(GROUPS_FILE), default_data={'next_id': 1, 'groups': {}, 'members': {}})
+
+def save_groups(data):
+    save_json_data(data_path(GROUPS_FILE), data)
+
 def load_badges():
-    return load_json_data(PARTICIPANT_BADGES_FILE, default_data={})
+    return load_json_data(data_path(PARTICIPANT_BADGES_FILE), default_data={})
 
-def save_badges(badges_data):
-    save_json_data(PARTICIPANT_BADGES_FILE, badges_data)
+def save_badges(badges_data, lock=None):
+    save_json_data(data_path(PARTICIPANT_BADGES_FILE), badges_data, lock)
 
 def load_achievements():
-    return load_json_data(ACHIEVEMENT_FILE, default_data={})
+    return load_json_data(data_path(ACHIEVEMENT_FILE), default_data={})
 
-def save_achievements(data):
-    save_json_data(ACHIEVEMENT_FILE, data)
+def save_achievements(data, lock=None):
+    save_json_data(data_path(ACHIEVEMENT_FILE), data, lock)
 
 def load_streaks_data():
-    return load_json_data(STREAKS_FILE, default_data={"participants": {}, "milestones_awarded": {}})
+    return load_json_data(data_path(STREAKS_FILE), default_data={"participants": {}, "milestones_awarded": {}})
+
+def save_streaks_data(streaks_data, lock=None):
+    save_json_data(data_path(STREAKS_FILE), streaks_data, lock)
+
+def load_rank_history():
+    return load_json_data(data_path(RANK_HISTORY_FILE), default_data={})
 
-def save_streaks_data(streaks_data):
-    save_json_data(STREAKS_FILE, streaks_data)
+def save_rank_history(data):
+    save_json_data(data_path(RANK_HISTORY_FILE), data)
 
 def load_challenges():
-    return load_json_data(CHALLENGES_FILE, default_data={'challenges': {}, 'pending': {}})
+    return load_json_data(data_path(CHALLENGES_FILE), default_data={'challenges': {}, 'pending': {}})
 
 def save_challenges(data):
-    save_json_data(CHALLENGES_FILE, data)
+    # Written immediately: the challenge journal is cleared right after compaction.
+    write_json_data(data_path(CHALLENGES_FILE), data)
+
+def load_challenge_journal():
+    return load_journal(data_path(CHALLENGES_JOURNAL_FILE))
+
+def append_challenge_journal(record):
+    append_journal(data_path(CHALLENGES_JOURNAL_FILE), record)
+
+def clear_challenge_journal():
+    clear_journal(data_path(CHALLENGES_JOURNAL_FILE))
+
+# --- Legacy Stores ---
+
+def load_legacy_data():
+    """Loads the name-keyed entries file of Sarsor-LB.py, or None when there is none."""
+    path = data_path(LEGACY_FILES[DATA_FILE])
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        content = f.read()
+    BYTES_READ.inc(len(content), store=LEGACY_FILES[DATA_FILE])
+    return _with_score_columns(_prepare_entries(pd.read_csv(io.BytesIO(content), dtype={'Ref': str})))
+
+def load_legacy_json(file_name, default_data=None):
+    """Loads the name-keyed file the store file_name is migrated from."""
+    return load_json_data(data_path(LEGACY_FILES[file_name]), default_data)
+
+def backup_legacy_files():
+    """Copies the legacy files into LEGACY_BACKUP_DIR, keeping an existing backup."""
+    backup_dir = data_path(LEGACY_BACKUP_DIR)
+    for file_name in LEGACY_FILES.values():
+        source, target = data_path(file_name), os.path.join(backup_dir, file_name)
+        if os.path.exists(source) and not os.path.exists(target):
+            os.makedirs(backup_dir, exist_ok=True)
+            shutil.copy2(source, target)
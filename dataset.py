@@ -0,0 +1,467 @@
+
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CATEGORIES, DATASET_COMPACTION_THRESHOLD
+from data_manager import LEDGER_OP, load_data, save_data, append_data, read_data_appends, load_challenges
+from activity import ActivityIndex, day_date, day_number
+from sketch import EntrySketches
+from profiling import timed
+
+if int(pd.__version__.split('.')[0]) < 3:
+    # With copy-on-write, a frame derived from a published version can be
+    # modified without writing through to the shared snapshot.
+    pd.set_option('mode.copy_on_write', True)
+
+# --- Entry Keys ---
+
+def entry_key(participant_id, date, source='daily', ref=''):
+    """Returns the key identifying one ledger line: participant, day number, source and reference."""
+    day = pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype('int64')
+    return int(participant_id), int(day), source, ref
+
+def key_of(entry):
+    """Returns the entry_key of a row."""
+    return entry_key(entry['Participant ID'], entry['Date'], entry['Source'], entry['Ref'])
+
+def _key_columns(frame):
+    """Returns the entry key of every row in frame, as four columns."""
+    days = pd.to_datetime(frame['Date']).to_numpy().astype('datetime64[D]').astype('int64')
+    ids = frame['Participant ID'].to_numpy(dtype='int64')
+    return [ids, days, frame['Source'].to_numpy(), frame['Ref'].to_numpy()]
+
+def _index_rows(frame):
+    """Maps every entry key in frame to the positions of its rows."""
+    if frame.empty:
+        return {}
+    return pd.Series(np.arange(len(frame))).groupby(_key_columns(frame), sort=False).indices
+
+def resolve_ledger(frame):
+    """Applies the lines appended by keyed edits and returns the entries they leave, without the op column.
+
+    Under each key, the lines before its last 'set' or 'delete' line are
+    superseded; a 'set' line itself stays, a 'delete' line does not.
+    """
+    if LEDGER_OP not in frame.columns:
+        return frame
+    ops = frame[LEDGER_OP].to_numpy()
+    edited = ops != ''
+    if not edited.any():
+        return frame.drop(columns=LEDGER_OP)
+    positions = np.arange(len(frame))
+    last_edit = pd.Series(np.where(edited, positions, -1)).groupby(_key_columns(frame), sort=False).transform('max')
+    last_edit = last_edit.to_numpy()
+    keep = (positions > last_edit) | ((positions == last_edit) & (ops == 'set'))
+    return frame[keep].drop(columns=LEDGER_OP).reset_index(drop=True)
+
+def ledger_row(participant_id, date, source, ref, points):
+    """Builds a non-daily ledger line carrying points outside the base and bonus columns."""
+    date = pd.Timestamp(date)
+    return {
+        'Participant ID': participant_id,
+        'Date': date,
+        'Month': date.to_period('M'),
+        'Source': source,
+        'Ref': ref,
+        **{category: 0 for category in CATEGORIES},
+        'Base Points': 0,
+        'Bonus Points': 0,
+        'Total Points': points
+    }
+
+def migrate_to_ledger(frame):
+    """Tags legacy rows as daily lines and adds the awards recorded only in the challenges file."""
+    frame = frame.assign(Source='daily', Ref='')
+    awards = [
+        ledger_row(record['participant'], record['date'], 'challenge', name, record['points'])
+        for name, challenge in load_challenges().get('challenges', {}).items()
+        for record in challenge.get('completed', [])
+    ]
+    if awards:
+        frame = pd.concat([frame, pd.DataFrame(awards)], ignore_index=True)
+    return frame
+
+# --- Snapshots ---
+
+class _RowIndex:
+    """Positions of a compacted base frame's rows by day and by participant."""
+    __slots__ = ('days', 'order', 'sorted_days', 'participants')
+
+    def __init__(self, frame):
+        if frame.empty:
+            self.days = np.empty(0, dtype='int64')
+            self.participants = {}
+        else:
+            self.days = pd.to_datetime(frame['Date']).to_numpy().astype('datetime64[D]').astype('int64')
+            self.participants = pd.Series(np.arange(len(frame))).groupby(
+                frame['Participant ID'].to_numpy(dtype='int64'), sort=False
+            ).indices
+        self.order = np.argsort(self.days, kind='stable')
+        self.sorted_days = self.days[self.order]
+
+class Snapshot:
+    """One immutable, numbered version of the entries dataset.
+
+    A snapshot is a compacted base frame plus an overlay of rows written by
+    key since then. Keyed reads go through the indexes and `rows_between`
+    materializes only the rows it returns; `frame` materializes the full
+    table on first access. `totals` holds every participant's
+    all-time Total Points, `activity` their active days and `sketches` the
+    distribution of daily scores; all are kept up to date by each write.
+    """
+    __slots__ = (
+        'version', 'base', 'base_index', 'row_index', 'overlay', 'hidden', 'parent_version', 'changes',
+        'totals', 'activity', 'sketches', '_frame'
+    )
+
+    def __init__(
+        self, version, base, base_index, row_index, overlay, hidden, totals, activity, sketches,
+        parent_version=None, changes=None
+    ):
+        self.version = version
+        self.base = base
+        self.base_index = base_index
+        self.row_index = row_index
+        self.overlay = overlay  # key -> row dict, for keys written since compaction
+        self.hidden = hidden  # keys whose base rows were replaced or deleted
+        self.parent_version = parent_version
+        # [(old rows, new row or None)] relative to parent_version; None when unknown.
+        self.changes = changes
+        self.totals = totals  # participant ID -> all-time Total Points
+        self.activity = activity
+        self.sketches = sketches
+        self._frame = None
+
+    @classmethod
+    def compacted(cls, version, frame, parent_version=None, changes=None, totals=None, activity=None):
+        # Sketches are always rebuilt, dropping the scores of replaced lines.
+        frame = frame.reset_index(drop=True)
+        if totals is None:
+            totals = frame.groupby('Participant ID')['Total Points'].sum().to_dict() if not frame.empty else {}
+        if activity is None:
+            activity = ActivityIndex.from_frame(frame)
+        snapshot = cls(
+            version, frame, _index_rows(frame), _RowIndex(frame), {}, frozenset(), totals, activity,
+            EntrySketches.from_frame(frame), parent_version, changes
+        )
+        snapshot._frame = frame
+        return snapshot
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            frame = self.base
+            if self.hidden:
+                positions = [p for key in self.hidden for p in self.base_index.get(key, ())]
+                frame = frame.drop(index=positions)
+            if self.overlay:
+                frame = pd.concat([frame, pd.DataFrame(list(self.overlay.values()))], ignore_index=True)
+            self._frame = frame
+        return self._frame
+
+    @property
+    def pending_changes(self):
+        return len(self.overlay) + len(self.hidden)
+
+    @property
+    def size(self):
+        """Returns the number of rows, without materializing them."""
+        hidden_rows = sum(len(self.base_index[key]) for key in self.hidden)
+        return len(self.base) - hidden_rows + len(self.overlay)
+
+    def date_bounds(self):
+        """Returns the (first, last) entry dates, or None when there are no entries.
+
+        A day whose base rows were all deleted since compaction may still bound the range.
+        """
+        days = list(self.row_index.sorted_days[[0, -1]]) if len(self.base) else []
+        days += [day_number(row['Date']) for row in self.overlay.values()]
+        if not days:
+            return None
+        return pd.Timestamp(day_date(min(days))), pd.Timestamp(day_date(max(days)))
+
+    def rows_between(self, start=None, end=None, participants=None):
+        """Returns the rows dated from start up to but excluding end, optionally of some participants only.
+
+        Either bound may be None. Base rows are found through the day and
+        participant indexes, so only the returned rows are materialized.
+        """
+        index = self.row_index
+        first = -np.inf if start is None else day_number(start)
+        last = np.inf if end is None else day_number(end)
+        if participants is None:
+            low = 0 if start is None else np.searchsorted(index.sorted_days, first)
+            high = len(index.order) if end is None else np.searchsorted(index.sorted_days, last)
+            positions = index.order[low:high]
+        else:
+            participants = set(participants)
+            positions = [index.participants[pid] for pid in participants if pid in index.participants]
+            positions = np.concatenate(positions) if positions else np.empty(0, dtype='int64')
+            days = index.days[positions]
+            positions = positions[(days >= first) & (days < last)]
+        if self.hidden:
+            hidden = [p for key in self.hidden for p in self.base_index[key]]
+            positions = positions[~np.isin(positions, hidden)]
+        frame = self.base.take(np.sort(positions))
+        overlay = [
+            row for (pid, day, _, _), row in self.overlay.items()
+            if first <= day < last and (participants is None or pid in participants)
+        ]
+        if overlay:
+            frame = pd.concat([frame, pd.DataFrame(overlay)], ignore_index=True)
+        return frame
+
+    def chunks(self, chunk_rows):
+        """Yields every row in frames of at most chunk_rows rows, without materializing the whole table."""
+        hidden = np.sort([p for key in self.hidden for p in self.base_index[key]])
+        for start in range(0, len(self.base), chunk_rows):
+            chunk = self.base.iloc[start:start + chunk_rows]
+            dropped = hidden[(hidden >= start) & (hidden < start + chunk_rows)]
+            if len(dropped):
+                chunk = chunk.drop(index=chunk.index[dropped - start])
+            yield chunk
+        if self.overlay:
+            yield pd.DataFrame(list(self.overlay.values()))
+
+    def rows(self, key):
+        """Returns every row stored under key, oldest first."""
+        if key in self.overlay:
+            return [self.overlay[key]]
+        if key in self.hidden:
+            return []
+        return [self.base.iloc[p].to_dict() for p in self.base_index.get(key, ())]
+
+    def get(self, key):
+        """Returns the latest row stored under key, or None."""
+        rows = self.rows(key)
+        return rows[-1] if rows else None
+
+    def total_of(self, participant_id):
+        """Returns a participant's all-time Total Points."""
+        return self.totals.get(participant_id, 0)
+
+    def total_change(self, participant_id):
+        """Returns a participant's (previous, current) all-time total across this version's changes.
+
+        When the changes are unknown the previous total is reported as 0.
+        """
+        current = self.total_of(participant_id)
+        if self.changes is None:
+            return 0, current
+        delta = 0
+        for old_rows, new_row in self.changes:
+            delta -= sum(row['Total Points'] for row in old_rows if row['Participant ID'] == participant_id)
+            if new_row is not None and new_row['Participant ID'] == participant_id:
+                delta += new_row['Total Points']
+        return current - delta, current
+
+    def with_rows(self, writes):
+        """Returns the next version after applying (key, row) writes in order.
+
+        A row of None removes its key.
+        """
+        overlay = dict(self.overlay)
+        hidden = set(self.hidden)
+        totals = dict(self.totals)
+        activity = self.activity
+        sketches = self.sketches
+        changes = []
+        for key, row in writes:
+            if key in overlay:
+                old_rows = [overlay[key]]
+            elif key in hidden:
+                old_rows = []
+            else:
+                old_rows = [self.base.iloc[p].to_dict() for p in self.base_index.get(key, ())]
+            if row is None:
+                overlay.pop(key, None)
+            else:
+                overlay[key] = row
+            if key in self.base_index:
+                hidden.add(key)
+            for old_row in old_rows:
+                totals[old_row['Participant ID']] -= old_row['Total Points']
+            if row is not None:
+                totals[row['Participant ID']] = totals.get(row['Participant ID'], 0) + row['Total Points']
+            participant_id, day, source, _ = key
+            if source == 'daily':
+                activity = activity.with_day(participant_id, day, row is not None)
+                for old_row in old_rows:
+                    sketches = sketches.without_value(day, old_row['Total Points'])
+                if row is not None:
+                    sketches = sketches.with_value(day, row['Total Points'])
+            changes.append((old_rows, row))
+        return Snapshot(
+            self.version + 1, self.base, self.base_index, self.row_index, overlay, frozenset(hidden), totals,
+            activity, sketches, parent_version=self.version, changes=changes
+        )
+
+class DatasetStore:
+    """Process-wide holder of the current dataset snapshot.
+
+    Readers take `current` without locking and keep that snapshot for the
+    whole rerun. Writers are serialized, build a new snapshot from the latest
+    version and publish it with a single reference swap, so readers never
+    observe a partially applied change. `queries` holds the results derived
+    from its snapshots (rankings, the cube), shared by every session.
+    """
+    def __init__(self, frame, parsed=None):
+        self._write_lock = threading.Lock()
+        self._current = Snapshot.compacted(1, frame)
+        self.queries = {}
+        self.queries_lock = threading.Lock()  # serializes read-modify-write updates of `queries`
+        self._parsed = parsed if parsed is not None else {}  # load_data's parse cache for the data file
+        self._row_bytes = frame.memory_usage(deep=True).sum() / len(frame) if len(frame) else 0
+
+    def footprint(self):
+        """Estimates the memory held by the dataset, its indexes and cached queries, in bytes."""
+        snapshot = self._current
+        # The key index, bitmaps, sketches, rankings and cube all grow with the
+        # ledger; counting them as a second copy of the frame keeps this cheap.
+        rows = 2 * (len(snapshot.base) + len(snapshot.overlay)) + len(self._parsed.get('frame', ()))
+        return self._row_bytes * rows
+
+    @property
+    def current(self):
+        return self._current
+
+    def _swap(self, snapshot):
+        if snapshot.pending_changes > DATASET_COMPACTION_THRESHOLD:
+            snapshot = Snapshot.compacted(
+                snapshot.version, snapshot.frame, snapshot.parent_version, snapshot.changes,
+                snapshot.totals, snapshot.activity
+            )
+        self._current = snapshot
+        return snapshot
+
+    @timed()
+    def refresh(self, registry):
+        """Picks up entries other processes appended to the data file.
+
+        Appended lines are applied as keyed writes, so the new version carries
+        their delta. A rewritten or replaced file is reloaded in full.
+        """
+        with self._write_lock:
+            appended = read_data_appends()
+            if appended is None:
+                base = self._current
+                frame = resolve_ledger(load_data(self._parsed))
+                return self._swap(Snapshot.compacted(base.version + 1, registry.attach_names(frame)))
+            if appended.empty:
+                return self._current
+            writes = []
+            for row in registry.attach_names(appended).to_dict('records'):
+                op = row.pop(LEDGER_OP, '')
+                writes.append((key_of(row), None if op == 'delete' else row))
+            return self._swap(self._current.with_rows(writes))
+
+    @timed()
+    def publish(self, update, persist=True):
+        """Publishes update(current frame) as the next version and returns its snapshot."""
+        with self._write_lock:
+            base = self._current
+            frame = update(base.frame)
+            if persist:
+                save_data(frame)
+            return self._swap(Snapshot.compacted(base.version + 1, frame))
+
+    # --- Keyed Access ---
+
+    def get(self, key):
+        """Returns the current row for an entry_key, or None."""
+        return self._current.get(key)
+
+    @timed()
+    def modify(self, key, change, persist=True):
+        """Replaces the rows under key with change(latest row or None) and returns the new snapshot.
+
+        A change returning None deletes the key. The new row, or a 'delete'
+        line for a deleted key, is appended to the data file; a replacement is
+        tagged 'set' so loading drops the lines it supersedes.
+        """
+        with self._write_lock:
+            base = self._current
+            old_rows = base.rows(key)
+            row = change(old_rows[-1] if old_rows else None)
+            if row is None and not old_rows:
+                return base
+            snapshot = base.with_rows([(key, row)])
+            if persist:
+                if not old_rows:
+                    append_data([row])
+                elif row is None:
+                    append_data([{**old_rows[-1], LEDGER_OP: 'delete'}])
+                else:
+                    append_data([{**row, LEDGER_OP: 'set'}])
+            return self._swap(snapshot)
+
+    def upsert(self, entry, persist=True):
+        """Inserts entry or replaces the line stored under the same key."""
+        return self.modify(key_of(entry), lambda _: entry, persist)
+
+    def delete(self, key, persist=True):
+        """Deletes the entries stored under key."""
+        return self.modify(key, lambda _: None, persist)
+
+def load_dataset_store(registry):
+    """Loads the entries file into a new dataset store, migrating a legacy file to the ledger.
+
+    Lines superseded by keyed edits are compacted out of the file here, once per load.
+    """
+    parsed = {}
+    frame = load_data(parsed)
+    if 'Source' not in frame.columns:
+        frame = migrate_to_ledger(frame)
+        save_data(frame)
+    else:
+        resolved = resolve_ledger(frame)
+        if len(resolved) < len(frame) or LEDGER_OP not in frame.columns:
+            save_data(resolved)
+        frame = resolved
+    return DatasetStore(registry.attach_names(frame), parsed)
+
+# --- Session Helpers ---
+
+def pin_snapshot(store):
+    """Pins the store's current version for this session's rerun."""
+    st.session_state.dataset_store = store
+    st.session_state.snapshot = store.current
+    return st.session_state.snapshot
+
+def release_snapshot():
+    """Unpins the store at the end of a rerun, so an idle session does not keep an evicted tenant in memory."""
+    st.session_state.pop('dataset_store', None)
+    st.session_state.pop('snapshot', None)
+
+def query_cache():
+    """Returns the query cache of the store pinned for this rerun."""
+    return st.session_state.dataset_store.queries
+
+def query_lock():
+    """Returns the lock serializing read-modify-write updates of the pinned store's query cache."""
+    return st.session_state.dataset_store.queries_lock
+
+def publish(update, persist=True):
+    """Publishes a new version from this session and pins it for the rest of the rerun."""
+    st.session_state.snapshot = st.session_state.dataset_store.publish(update, persist)
+    return st.session_state.snapshot
+
+def get(key):
+    """Returns the row stored under key in the pinned snapshot, or None."""
+    return st.session_state.snapshot.get(key)
+
+def modify(key, change):
+    """Applies a keyed change from this session and pins the resulting version."""
+    st.session_state.snapshot = st.session_state.dataset_store.modify(key, change)
+    return st.session_state.snapshot
+
+def upsert(entry):
+    """Upserts an entry from this session and pins the resulting version."""
+    st.session_state.snapshot = st.session_state.dataset_store.upsert(entry)
+    return st.session_state.snapshot
+
+def delete(key):
+    """Deletes an entry from this session and pins the resulting version."""
+    st.session_state.snapshot = st.session_state.dataset_store.delete(key)
+    return st.session_state.snapshot
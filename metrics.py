@@ -0,0 +1,192 @@
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_FILE, METRICS_INTERVAL, METRICS_PORT, METRICS_SESSION_TIMEOUT
+
+# Recording only touches in-memory dicts under a short lock; rendering the
+# exposition text happens on the exporter thread, never during a rerun.
+_lock = threading.Lock()
+_registry = []
+
+def _escape(value):
+    """Escapes a label value for the exposition format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+# --- Metric Types ---
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self.values = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float('inf')], counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+# --- Application Metrics ---
+
+RERUNS = Counter('sarsor_reruns_total', 'Script reruns.')
+RERUN_SECONDS = Histogram(
+    'sarsor_rerun_seconds', 'Wall-clock duration of a full script rerun.',
+    [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+)
+FIRST_RENDER_SECONDS = Histogram(
+    'sarsor_first_render_seconds', 'Duration of the first rerun of a browser session, including bootstrap.',
+    [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+STORE_LOAD_SECONDS = Histogram(
+    'sarsor_store_load_seconds', 'Time to load one data store while bootstrapping the services.',
+    [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5]
+)
+CACHE_HITS = Counter('sarsor_cache_hits_total', 'Cache lookups served from memory.')
+CACHE_MISSES = Counter('sarsor_cache_misses_total', 'Cache lookups that had to recompute.')
+BYTES_READ = Counter('sarsor_bytes_read_total', 'Bytes read from disk by data_manager.')
+BYTES_WRITTEN = Counter('sarsor_bytes_written_total', 'Bytes written to disk by data_manager.')
+DATE_PARSE_FALLBACKS = Counter('sarsor_date_parse_fallbacks_total', 'Entry dates that were not ISO formatted.')
+STORE_SAVES = Counter('sarsor_store_saves_total', 'Saves per data store file.')
+ACTIVE_SESSIONS = Gauge('sarsor_active_sessions', 'Browser sessions seen within the session timeout.')
+DATASET_ROWS = Gauge('sarsor_dataset_rows', 'Rows in the most recently rendered leaderboard dataset.')
+TENANTS_LOADED = Gauge('sarsor_tenants_loaded', 'Leaderboards held in the tenant cache.')
+TENANT_CACHE_BYTES = Gauge('sarsor_tenant_cache_bytes', 'Estimated memory of the leaderboards in the tenant cache.')
+TENANT_EVICTIONS = Counter('sarsor_tenant_evictions_total', 'Leaderboards dropped from the tenant cache.')
+
+_session_last_seen = {}
+
+def touch_session(session_id):
+    """Marks a browser session as active."""
+    _session_last_seen[session_id] = time.monotonic()
+
+def _refresh_active_sessions():
+    cutoff = time.monotonic() - METRICS_SESSION_TIMEOUT
+    for session_id, last_seen in list(_session_last_seen.items()):
+        if last_seen < cutoff:
+            _session_last_seen.pop(session_id, None)
+    ACTIVE_SESSIONS.set(len(_session_last_seen))
+
+@contextmanager
+def rerun(first_render=False):
+    """Observes the duration of one script rerun; first_render marks a session's first."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        RERUNS.inc()
+        RERUN_SECONDS.observe(elapsed)
+        if first_render:
+            FIRST_RENDER_SECONDS.observe(elapsed)
+
+# --- Exposition ---
+
+def render():
+    """Renders all metrics in the Prometheus text exposition format."""
+    _refresh_active_sessions()
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(path=METRICS_FILE):
+    """Atomically rewrites the metrics exposition file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _file_writer_loop():
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            write_metrics_file()
+        except OSError:
+            pass
+
+_exporter_started = False
+
+def start_exporter():
+    """Starts the background metrics exporters once per process."""
+    global _exporter_started
+    with _lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    if METRICS_FILE:
+        threading.Thread(target=_file_writer_loop, name='metrics-file', daemon=True).start()
+    if METRICS_PORT:
+        server = ThreadingHTTPServer(('127.0.0.1', int(METRICS_PORT)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
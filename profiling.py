@@ -0,0 +1,114 @@
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from config import PROFILING_ENABLED, PROFILING_HISTORY
+
+# Each entry is the list of (span name, seconds) recorded during one rerun.
+_history = deque(maxlen=PROFILING_HISTORY)
+_local = threading.local()
+
+# --- Spans ---
+
+class _NullSpan:
+    """No-op span used when no rerun is being profiled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'spans', 'start')
+
+    def __init__(self, name, spans):
+        self.name = name
+        self.spans = spans
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.spans.append((self.name, time.perf_counter() - self.start))
+        return False
+
+def span(name):
+    """Returns a context manager timing a block within the current rerun."""
+    spans = getattr(_local, 'spans', None)
+    if spans is None:
+        return _NULL_SPAN
+    return _Span(name, spans)
+
+def timed(name=None):
+    """Decorator recording every call of the wrapped function as a span."""
+    def decorator(func):
+        if not PROFILING_ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            spans = getattr(_local, 'spans', None)
+            if spans is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                spans.append((span_name, time.perf_counter() - start))
+        return wrapper
+    return decorator
+
+@contextmanager
+def rerun(name='rerun'):
+    """Collects the spans of one script rerun into the history ring buffer."""
+    if not PROFILING_ENABLED:
+        yield
+        return
+    spans = []
+    _local.spans = spans
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - start))
+        _local.spans = None
+        _history.append(spans)
+
+# --- Reporting ---
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def recorded_reruns():
+    """Returns the number of reruns currently held in the history buffer."""
+    return len(_history)
+
+def summary():
+    """Returns per-span call counts and p50/p95 latencies over recent reruns."""
+    durations = {}
+    for spans in list(_history):
+        for name, seconds in spans:
+            durations.setdefault(name, []).append(seconds)
+
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append({
+            'Span': name,
+            'Calls': len(values),
+            'p50 (ms)': round(_percentile(values, 50) * 1000, 2),
+            'p95 (ms)': round(_percentile(values, 95) * 1000, 2),
+            'Total (ms)': round(sum(values) * 1000, 2)
+        })
+    return sorted(rows, key=lambda row: row['Total (ms)'], reverse=True)
+
+def reset():
+    """Clears the recorded rerun history."""
+    _history.clear()
@@ -0,0 +1,404 @@
+
+from datetime import datetime
+import pandas as pd
+import metrics
+from config import AGGREGATION_CHUNK_ROWS, LEDGER_SOURCES
+from data_manager import load_rank_history, save_rank_history
+from dataset import query_cache, query_lock
+from profiling import timed
+
+SOURCE_COLUMNS = list(LEDGER_SOURCES.values())
+RANKING_COLUMNS = [
+    'Participant ID', 'Name', 'Rank', 'Base Points', 'Bonus Points', 'Challenge Points', 'Punishment Points', 'Total Points'
+]
+
+# --- Aggregation ---
+
+POINT_COLUMNS = ['Base Points', 'Bonus Points', 'Total Points']
+TOTAL_COLUMNS = POINT_COLUMNS + SOURCE_COLUMNS + ['Entries']
+
+PERIODS = ['This Month', 'This Week', 'All Time']  # Leaderboard time filters
+
+def period_bounds(filter_mode, today=None):
+    """Returns the (start, end) dates of a time filter as seen on `today`; None leaves a side open."""
+    today = pd.Timestamp(today or datetime.now().date())
+    if filter_mode == 'This Week':
+        return today - pd.Timedelta(days=6), today + pd.Timedelta(days=1)
+    elif filter_mode == 'This Month':
+        return today.replace(day=1), None
+    return None, None
+
+def in_period(date, filter_mode):
+    """Returns whether a single entry date falls inside the selected time period."""
+    start, end = period_bounds(filter_mode)
+    date = pd.Timestamp(date)
+    return (start is None or date >= start) and (end is None or date < end)
+
+def get_filtered_dataframe(df, filter_mode, today=None):
+    """Returns the rows of df that fall inside the selected time period."""
+    start, end = period_bounds(filter_mode, today)
+    if start is None:
+        return df
+    dates = pd.to_datetime(df['Date'])
+    mask = dates >= start
+    if end is not None:
+        mask &= dates < end
+    return df[mask]
+
+def aggregate_points(df):
+    """Sums the ledger per participant ID in one pass, with per-source subtotals and entry counts."""
+    if df.empty:
+        return pd.DataFrame(columns=TOTAL_COLUMNS, index=pd.Index([], name='Participant ID'))
+    by_source = df.groupby(['Participant ID', 'Source'], sort=False).agg(
+        **{column: (column, 'sum') for column in POINT_COLUMNS},
+        Entries=('Total Points', 'size')
+    )
+    # The remaining work is on the participants × sources result, not the ledger.
+    totals = by_source.groupby(level='Participant ID', sort=False).sum()
+    per_source = by_source['Total Points'].unstack(fill_value=0)
+    per_source = per_source.reindex(columns=list(LEDGER_SOURCES), fill_value=0).rename(columns=LEDGER_SOURCES)
+    return totals.join(per_source)[TOTAL_COLUMNS]
+
+@timed()
+def aggregate_snapshot(snapshot, end=None, chunk_rows=AGGREGATION_CHUNK_ROWS):
+    """Aggregates the rows of a snapshot dated before end (or all of them) like aggregate_points, chunk by chunk.
+
+    Partial sums are merged after each chunk, so the working memory is
+    bounded by the chunk size and the number of participants rather than by
+    the length of the history.
+    """
+    totals = aggregate_points(pd.DataFrame())
+    for chunk in snapshot.chunks(chunk_rows):
+        if end is not None:
+            chunk = chunk[pd.to_datetime(chunk['Date']) < end]
+        partial = aggregate_points(chunk)
+        if not totals.empty:
+            partial = pd.concat([totals, partial]).groupby(level='Participant ID', sort=False).sum()
+        totals = partial
+    return totals
+
+def rank_totals(totals, participant_names):
+    """Ranks per-participant totals by Total Points."""
+    if totals.empty:
+        return pd.DataFrame(columns=RANKING_COLUMNS)
+    ranked = totals.reset_index()
+    ranked['Name'] = ranked['Participant ID'].map(participant_names)
+    ranked['Rank'] = ranked['Total Points'].rank(method='min', ascending=False).astype(int)
+    return ranked.sort_values(['Rank', 'Name'], kind='stable')[RANKING_COLUMNS].reset_index(drop=True)
+
+@timed()
+def calculate_cumulative_points(df, participant_names):
+    """Aggregates entries into per-participant totals ranked by Total Points."""
+    return rank_totals(aggregate_points(df), participant_names)
+
+# --- Cached Ranking ---
+
+class Ranking:
+    """A ranked leaderboard with O(1) participant-to-position lookups."""
+    def __init__(self, totals, participant_names):
+        self.totals = totals
+        self.frame = rank_totals(totals, participant_names)
+        self.positions = pd.Index(self.frame['Participant ID'])
+        self.min_total = self.frame['Total Points'].min() if len(self.frame) else 0
+        self.max_total = self.frame['Total Points'].max() if len(self.frame) else 0
+
+    @classmethod
+    def from_entries(cls, df, participant_names):
+        return cls(aggregate_points(df), participant_names)
+
+    @timed()
+    def apply_changes(self, changes, filter_mode, participant_names):
+        """Returns the ranking after keyed row changes, without re-aggregating the entries."""
+        totals = self.totals.copy()
+        for old_rows, new_row in changes:
+            deltas = [(row, -1) for row in old_rows]
+            if new_row is not None:
+                deltas.append((new_row, 1))
+            for row, sign in deltas:
+                if not in_period(row['Date'], filter_mode):
+                    continue
+                values = [sign * row[column] for column in POINT_COLUMNS]
+                values += [sign * row['Total Points'] if source == row['Source'] else 0 for source in LEDGER_SOURCES]
+                values.append(sign)
+                pid = row['Participant ID']
+                if pid in totals.index:
+                    totals.loc[pid] = totals.loc[pid].to_numpy() + values
+                else:
+                    totals.loc[pid] = values
+        return Ranking(totals[totals['Entries'] > 0], participant_names)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def top(self, k):
+        """Returns the top k rows."""
+        return self.frame.iloc[:k]
+
+    def page(self, page_number, page_size):
+        """Returns the rows of a 1-based page."""
+        start = (page_number - 1) * page_size
+        return self.frame.iloc[start:start + page_size]
+
+    def page_count(self, page_size):
+        return max(1, -(-len(self.frame) // page_size))
+
+    def position_of(self, participant_id):
+        """Returns the 0-based position of a participant, or None when unranked."""
+        if participant_id is None or participant_id not in self.positions:
+            return None
+        return self.positions.get_loc(participant_id)
+
+    def neighbours(self, participant_id, radius):
+        """Returns the rows surrounding a participant's position."""
+        position = self.position_of(participant_id)
+        if position is None:
+            return self.frame.iloc[:0]
+        return self.frame.iloc[max(0, position - radius):position + radius + 1]
+
+def get_ranking(snapshot, filter_mode, registry):
+    """Returns the tenant's cached Ranking for a dataset snapshot.
+
+    A cached ranking one keyed write behind is updated from that write's
+    delta; anything older is recomputed from the entries.
+    """
+    cache = query_cache().setdefault('ranking', {})
+    key = (snapshot.version, datetime.now().date(), registry.version)
+    entry = cache.get(filter_mode)
+    if entry is not None and entry[0] == key:
+        metrics.CACHE_HITS.inc(cache='ranking')
+        return entry[1]
+
+    if entry is not None and snapshot.changes is not None and entry[0] == (snapshot.parent_version, *key[1:]):
+        # One keyed write since the cached version: apply its delta.
+        metrics.CACHE_HITS.inc(cache='ranking_delta')
+        ranking = entry[1].apply_changes(snapshot.changes, filter_mode, registry.names)
+    else:
+        metrics.CACHE_MISSES.inc(cache='ranking')
+        start, end = period_bounds(filter_mode)
+        if start is None and end is None:
+            ranking = Ranking(aggregate_snapshot(snapshot), registry.names)
+        else:
+            ranking = Ranking.from_entries(snapshot.rows_between(start, end), registry.names)
+    cache[filter_mode] = (key, ranking)
+    return ranking
+
+# --- Group Rollups ---
+
+GROUP_COLUMNS = ['Group', 'Rank', 'Members', 'Entries', 'Total Points', 'Average Points']
+
+class GroupRollup:
+    """Per-group totals for one period, rolled up through every ancestor of each participant's group.
+
+    Built from a Ranking's participant totals; a keyed write then updates only
+    the written participant's group and its ancestors.
+    """
+    def __init__(self, totals, members):
+        self.totals = totals  # group ID -> (Total Points, Entries), including every subgroup
+        self.members = members  # group ID -> participants assigned anywhere below it
+
+    @classmethod
+    @timed()
+    def from_ranking(cls, ranking, groups):
+        totals, members = {}, {}
+        for gid in groups.group_of.values():
+            for ancestor in groups.ancestors(gid):
+                members[ancestor] = members.get(ancestor, 0) + 1
+        participant_totals = ranking.totals
+        for pid, points, entries in zip(
+            participant_totals.index, participant_totals['Total Points'], participant_totals['Entries']
+        ):
+            gid = groups.group_of.get(pid)
+            if gid is None:
+                continue
+            for ancestor in groups.ancestors(gid):
+                total, count = totals.get(ancestor, (0, 0))
+                totals[ancestor] = (total + points, count + entries)
+        return cls(totals, members)
+
+    def apply_changes(self, changes, filter_mode, groups):
+        """Returns the rollup after keyed row changes, touching only the ancestors of each written participant."""
+        totals = dict(self.totals)
+        for old_rows, new_row in changes:
+            deltas = [(row, -1) for row in old_rows]
+            if new_row is not None:
+                deltas.append((new_row, 1))
+            for row, sign in deltas:
+                gid = groups.group_of.get(row['Participant ID'])
+                if gid is None or not in_period(row['Date'], filter_mode):
+                    continue
+                for ancestor in groups.ancestors(gid):
+                    total, count = totals.get(ancestor, (0, 0))
+                    totals[ancestor] = (total + sign * row['Total Points'], count + sign)
+        return GroupRollup(totals, self.members)
+
+    def standings(self, groups, parent=None):
+        """Returns the subgroups of parent (or the top-level groups) ranked by Total Points."""
+        rows = []
+        for gid in groups.children(parent):
+            total, entries = self.totals.get(gid, (0, 0))
+            members = self.members.get(gid, 0)
+            rows.append({
+                'Group': groups.groups[gid]['name'],
+                'Members': members,
+                'Entries': int(entries),
+                'Total Points': int(total),
+                'Average Points': total / members if members else 0.0
+            })
+        table = pd.DataFrame(rows, columns=[column for column in GROUP_COLUMNS if column != 'Rank'])
+        table['Rank'] = table['Total Points'].rank(method='min', ascending=False).astype(int)
+        return table.sort_values(['Rank', 'Group'], kind='stable')[GROUP_COLUMNS].reset_index(drop=True)
+
+def get_group_rollup(snapshot, filter_mode, registry, groups):
+    """Returns the tenant's cached GroupRollup for a snapshot and time filter.
+
+    A rollup one keyed write behind is updated from that write's delta;
+    otherwise it is rebuilt from the cached participant ranking.
+    """
+    cache = query_cache().setdefault('group_rollup', {})
+    key = (snapshot.version, datetime.now().date(), registry.version, groups.version)
+    entry = cache.get(filter_mode)
+    if entry is not None and entry[0] == key:
+        metrics.CACHE_HITS.inc(cache='group_rollup')
+        return entry[1]
+
+    if entry is not None and snapshot.changes is not None and entry[0] == (snapshot.parent_version, *key[1:]):
+        metrics.CACHE_HITS.inc(cache='group_rollup_delta')
+        rollup = entry[1].apply_changes(snapshot.changes, filter_mode, groups)
+    else:
+        metrics.CACHE_MISSES.inc(cache='group_rollup')
+        rollup = GroupRollup.from_ranking(get_ranking(snapshot, filter_mode, registry), groups)
+    cache[filter_mode] = (key, rollup)
+    return rollup
+
+# --- Rank Movement ---
+
+RANK_BASELINES = {'daily': 'Yesterday', 'weekly': 'Last Week'}
+
+def baseline_boundary(baseline, today=None):
+    """Returns the start of the current day or week: the boundary a baseline ranking is frozen at."""
+    today = pd.Timestamp(today or datetime.now().date())
+    return today if baseline == 'daily' else today - pd.Timedelta(days=today.weekday())
+
+def _frozen_ranks(snapshot, boundary, participant_names):
+    """Returns {filter: {participant ID: rank}} for every period as it stood just before boundary."""
+    previous_day = boundary - pd.Timedelta(days=1)
+    ranks = {}
+    for filter_mode in PERIODS:
+        start, _ = period_bounds(filter_mode, previous_day)
+        if start is None:
+            totals = aggregate_snapshot(snapshot, end=boundary)
+        else:
+            totals = aggregate_points(snapshot.rows_between(start, boundary))
+        ranked = rank_totals(totals, participant_names)
+        ranks[filter_mode] = {str(pid): int(rank) for pid, rank in zip(ranked['Participant ID'], ranked['Rank'])}
+    return ranks
+
+def _stored_baseline(baseline, boundary):
+    """Returns the baseline frozen at boundary, or None; holds the query lock."""
+    cache = query_cache()
+    record = cache.get('rank_history', {}).get(baseline)
+    if record is None or record['boundary'] != boundary:
+        # Another process may have frozen this boundary already.
+        cache['rank_history'] = load_rank_history()
+        record = cache['rank_history'].get(baseline)
+    if record is None or record['boundary'] != boundary or set(PERIODS) - set(record['ranks']):
+        return None
+    return record
+
+@timed()
+def rank_baseline(snapshot, filter_mode, baseline, participant_names):
+    """Returns {participant ID: rank} for a filter as it stood at the last daily or weekly boundary.
+
+    The first call past a boundary freezes every period's standings from the
+    entries dated before it and persists them in rank_history.json. Later
+    calls, sessions and restarts read them back without recomputing, so
+    entries backdated afterwards do not move the baseline.
+    """
+    boundary = str(baseline_boundary(baseline).date())
+    with query_lock():
+        record = _stored_baseline(baseline, boundary)
+    if record is None:
+        metrics.CACHE_MISSES.inc(cache='rank_baseline')
+        # Aggregated outside the lock; a baseline another session froze meanwhile wins.
+        ranks = _frozen_ranks(snapshot, pd.Timestamp(boundary), participant_names)
+        with query_lock():
+            record = _stored_baseline(baseline, boundary)
+            if record is None:
+                cache = query_cache()
+                record = {'boundary': boundary, 'ranks': ranks}
+                cache['rank_history'] = {**cache['rank_history'], baseline: record}
+                save_rank_history(cache['rank_history'])
+    else:
+        metrics.CACHE_HITS.inc(cache='rank_baseline')
+    return {int(pid): rank for pid, rank in record['ranks'][filter_mode].items()}
+
+def rank_movement(rows, baseline_ranks):
+    """Returns a label per row: places gained or lost since the baseline, or "new"."""
+    def label(pid, rank):
+        previous = baseline_ranks.get(pid)
+        if previous is None:
+            return "🆕 new"
+        change = previous - rank
+        return f"▲{change}" if change > 0 else f"▼{-change}" if change < 0 else "–"
+    return [label(pid, rank) for pid, rank in zip(rows['Participant ID'], rows['Rank'])]
+
+# --- Challenge Stats ---
+
+def challenge_counts(df):
+    """Returns {(challenge, participant ID): (lines, points)} over the challenge lines of the ledger."""
+    awards = df[df['Source'] == 'challenge']
+    grouped = awards.groupby(['Ref', 'Participant ID'])['Total Points'].agg(['size', 'sum'])
+    return {key: (int(lines), points) for key, lines, points in zip(grouped.index, grouped['size'], grouped['sum'])}
+
+def apply_challenge_changes(counts, changes):
+    """Returns the challenge counts after keyed row changes."""
+    counts = dict(counts)
+    for old_rows, new_row in changes:
+        deltas = [(row, -1) for row in old_rows]
+        if new_row is not None:
+            deltas.append((new_row, 1))
+        for row, sign in deltas:
+            if row['Source'] != 'challenge':
+                continue
+            key = (row['Ref'], row['Participant ID'])
+            lines, points = counts.get(key, (0, 0))
+            lines, points = lines + sign, points + sign * row['Total Points']
+            if lines:
+                counts[key] = (lines, points)
+            else:
+                counts.pop(key, None)
+    return counts
+
+def challenge_stats(counts):
+    """Returns completions, participants and points awarded per challenge."""
+    stats = {}
+    for (ref, _), (lines, points) in counts.items():
+        completions, participants, total = stats.get(ref, (0, 0, 0))
+        stats[ref] = (completions + lines, participants + 1, total + points)
+    return pd.DataFrame(
+        list(stats.values()), index=pd.Index(list(stats), name='Ref'), columns=['Completions', 'Participants', 'Points']
+    )
+
+def get_challenge_stats(snapshot):
+    """Returns the tenant's cached challenge stats for a dataset snapshot.
+
+    Stats one keyed write behind are updated from that write's delta.
+    """
+    cache = query_cache()
+    cached = cache.get('challenge_stats')
+    if cached is not None and cached[0] == snapshot.version:
+        metrics.CACHE_HITS.inc(cache='challenge_stats')
+        return cached[1]
+    if cached is not None and snapshot.changes is not None and cached[0] == snapshot.parent_version:
+        metrics.CACHE_HITS.inc(cache='challenge_stats_delta')
+        counts = apply_challenge_changes(cached[2], snapshot.changes)
+    else:
+        metrics.CACHE_MISSES.inc(cache='challenge_stats')
+        counts = challenge_counts(snapshot.frame)
+    stats = challenge_stats(counts)
+    cache['challenge_stats'] = (snapshot.version, stats, counts)
+    return stats
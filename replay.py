@@ -0,0 +1,210 @@
+
+"""Rebuilds milestones, streaks, streak badges and achievements from the entry history.
+
+Run from the repository root with the app's environment, while the app is
+stopped (running sessions keep their own copy of the stores):
+
+    python replay.py [--workers 8] [--dry-run] [--tenant NAME]
+
+Participants are partitioned across a process pool; the badges, streaks and
+achievements stores are written once at the end. With --dry-run nothing is
+written and the differences from the current stores are printed instead.
+Badges that no rule awards (those given by hand) are kept. --tenant replays
+one tenant's leaderboard instead of the default one.
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import numpy as np
+import pandas as pd
+from config import MILESTONE_TIERS, STREAK_BADGES, ACHIEVEMENTS, PARTICIPANTS_FILE
+from data_manager import (
+    load_data, load_participants, load_badges, save_badges, load_achievements, save_achievements,
+    load_streaks_data, save_streaks_data, unit_of_work, tenant_scope, data_path
+)
+from dataset import migrate_to_ledger, resolve_ledger
+from systems.achievement_system import CRITERIA_ARGUMENTS
+from tenants import tenant_directory
+
+# --- History ---
+
+def build_partitions(df, partition_count):
+    """Splits the ledger into per-participant histories, grouped into partitions."""
+    days = pd.to_datetime(df['Date']).to_numpy().astype('datetime64[D]').astype('int64')
+    ledger = pd.DataFrame({
+        'pid': df['Participant ID'].to_numpy(dtype='int64'),
+        'day': days,
+        'daily': (df['Source'] == 'daily').to_numpy(),
+        'points': df['Total Points'].to_numpy()
+    })
+    totals = ledger.groupby('pid')['points'].sum()
+    # Like the live ActivityIndex, only daily lines make a day active.
+    active_days = ledger.loc[ledger['daily'], ['pid', 'day']].drop_duplicates().sort_values(['pid', 'day'])
+    daily = ledger[ledger['daily']].groupby(['pid', 'day'])['points'].sum().reset_index()
+
+    active_by_pid = _split_by_pid(active_days['pid'].to_numpy(), active_days['day'].to_numpy())
+    daily_by_pid = _split_by_pid(daily['pid'].to_numpy(), daily[['day', 'points']].to_numpy())
+    histories = [
+        (
+            int(pid), int(total), active_by_pid.get(pid, np.empty(0, dtype='int64')),
+            daily_by_pid.get(pid, np.empty((0, 2), dtype='int64'))
+        )
+        for pid, total in totals.items()
+    ]
+    return [histories[i::partition_count] for i in range(partition_count) if histories[i::partition_count]]
+
+def _split_by_pid(pids, values):
+    """Splits rows sorted by participant into {pid: rows}."""
+    unique, starts = np.unique(pids, return_index=True)
+    return dict(zip(unique.tolist(), np.split(values, starts[1:])))
+
+# --- Rules ---
+
+def replay_participant(total, active_days, daily, today):
+    """Recomputes one participant's milestones, streak record, streak badges and achievement counts."""
+    milestones = [tier for tier, threshold in MILESTONE_TIERS.items() if total >= threshold]
+    if not len(active_days):
+        # Only challenge or punishment lines: no streak and no daily achievements.
+        return milestones, None, [], {}
+
+    # Length of the run of consecutive active days ending on each active day.
+    run_starts = np.flatnonzero(np.diff(active_days, prepend=active_days[0] - 2) != 1)
+    positions = np.arange(len(active_days))
+    streak_at = positions - run_starts[np.searchsorted(run_starts, positions, side='right') - 1] + 1
+    longest = int(streak_at.max())
+    current = int(streak_at[-1]) if today - active_days[-1] <= 1 else 0
+    streak = {
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_activity_date': str(np.datetime64(int(active_days[-1]), 'D'))
+    }
+    streak_badges = [badge for days, badge in STREAK_BADGES.items() if longest >= days]
+
+    achievements = {}
+    if len(daily):
+        # Each criterion depends on one value, so it is checked once per distinct value.
+        # No configured category is checked against the daily rank, so it is not computed.
+        values = {'points': daily[:, 1], 'streak': streak_at[np.searchsorted(active_days, daily[:, 0])]}
+        for category, rules in ACHIEVEMENTS.items():
+            distinct = Counter(values[CRITERIA_ARGUMENTS[category]].tolist())
+            for achievement, details in rules.items():
+                count = sum(n for value, n in distinct.items() if details['criteria'](value))
+                if count:
+                    achievements.setdefault(category, {})[achievement] = count
+    return milestones, streak, streak_badges, achievements
+
+def replay_partition(histories, today):
+    """Replays every participant of one partition; runs in a worker process."""
+    return {
+        pid: replay_participant(total, active_days, daily, today)
+        for pid, total, active_days, daily in histories
+    }
+
+# --- Stores ---
+
+def rebuild_stores(results, badges, streaks_data):
+    """Returns new badges, streaks and achievements stores from the replay results.
+
+    Badges that a rule awarded before the replay are replaced; any other
+    badge is kept.
+    """
+    rule_badges = set(MILESTONE_TIERS) | set(STREAK_BADGES.values())
+    old_milestones = streaks_data.get('milestones_awarded', {})
+    new_badges = {}
+    for key, awarded in badges.items():
+        managed = rule_badges | set(old_milestones.get(key, []))
+        kept = [badge for badge in awarded if badge not in managed]
+        if kept:
+            new_badges[key] = kept
+    new_streaks = {'participants': {}, 'milestones_awarded': {}}
+    new_achievements = {}
+    for pid, (milestones, streak, streak_badges, achievements) in sorted(results.items()):
+        key = str(pid)
+        earned = [badge for badge in milestones + streak_badges if badge not in new_badges.get(key, [])]
+        if earned:
+            new_badges[key] = new_badges.get(key, []) + earned
+        if milestones:
+            new_streaks['milestones_awarded'][key] = milestones
+        if streak is not None:
+            new_streaks['participants'][key] = streak
+        if achievements:
+            new_achievements[key] = achievements
+    return new_badges, new_streaks, new_achievements
+
+def describe_changes(old, new, names):
+    """Returns one line per participant whose badges, streaks or achievements change."""
+    old_badges, old_streaks, old_achievements = old
+    new_badges, new_streaks, new_achievements = new
+    keys = set(old_badges) | set(new_badges) | set(old_streaks['participants']) | set(new_streaks['participants'])
+    keys |= set(old_achievements) | set(new_achievements)
+    lines = []
+    for key in sorted(keys, key=int):
+        changes = []
+        before, after = old_badges.get(key, []), new_badges.get(key, [])
+        changes += [f'+{badge}' for badge in after if badge not in before]
+        changes += [f'-{badge}' for badge in before if badge not in after]
+        before = old_streaks['participants'].get(key, {})
+        after = new_streaks['participants'].get(key, {})
+        for field in ('current_streak', 'longest_streak'):
+            if before.get(field) != after.get(field):
+                changes.append(f'{field} {before.get(field)} -> {after.get(field)}')
+        before, after = old_achievements.get(key, {}), new_achievements.get(key, {})
+        for category in sorted(set(before) | set(after)):
+            for achievement in sorted(set(before.get(category, {})) | set(after.get(category, {}))):
+                old_count = before.get(category, {}).get(achievement, 0)
+                new_count = after.get(category, {}).get(achievement, 0)
+                if old_count != new_count:
+                    changes.append(f'{achievement} {old_count} -> {new_count}')
+        if changes:
+            lines.append(f"{names.get(key, key)} ({key}): {', '.join(changes)}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--dry-run', action='store_true', help='print the changes instead of writing them')
+    parser.add_argument('--tenant', default='', help='tenant whose leaderboard is replayed')
+    args = parser.parse_args()
+
+    directory = tenant_directory(args.tenant)
+    if directory is None:
+        sys.exit(f'No tenant named {args.tenant!r}.')
+    with tenant_scope(directory):
+        replay(args)
+
+def replay(args):
+    """Replays the current tenant's history, then writes the stores or prints the changes."""
+    if not os.path.exists(data_path(PARTICIPANTS_FILE)):
+        sys.exit('No participant registry yet: start the app once to migrate the stores to participant IDs.')
+    df = load_data()
+    if 'Source' not in df.columns:
+        df = migrate_to_ledger(df)
+    df = resolve_ledger(df)
+    names = {key: record['name'] for key, record in load_participants().get('participants', {}).items()}
+    today = int(np.datetime64(date.today(), 'D').astype('int64'))
+
+    results = {}
+    if not df.empty:
+        partitions = build_partitions(df, max(1, args.workers) * 4)
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for partial in pool.map(replay_partition, partitions, [today] * len(partitions)):
+                results.update(partial)
+
+    old = load_badges(), load_streaks_data(), load_achievements()
+    new = rebuild_stores(results, old[0], old[1])
+    changes = describe_changes(old, new, names)
+    print(f'Replayed {len(results)} participants; {len(changes)} with changes.')
+    if args.dry_run:
+        for line in changes:
+            print(f'  {line}')
+        return
+    with unit_of_work():
+        save_badges(new[0])
+        save_streaks_data(new[1])
+        save_achievements(new[2])
+
+if __name__ == '__main__':
+    main()
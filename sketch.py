@@ -0,0 +1,268 @@
+
+import math
+import random
+import numpy as np
+import pandas as pd
+from config import SKETCH_K
+
+# --- Queries ---
+# Shared by QuantileSketch and SketchDifference: both expose n and
+# _weighted(), the retained values in order with their cumulative weights.
+
+def _rank(sketch, value):
+    """Returns the estimated fraction of values less than or equal to value."""
+    if sketch.n <= 0:
+        return 0.0
+    values, cumulative = sketch._weighted()
+    position = np.searchsorted(values, value, side='right')
+    return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+def _midrank(sketch, value):
+    """Returns the estimated fraction of values below value, counting values equal to it as half below.
+
+    Unlike rank, values tied with many others do not all rank at the top.
+    """
+    if sketch.n <= 0:
+        return 0.0
+    values, cumulative = sketch._weighted()
+    cumulative = np.concatenate([[0.0], cumulative])
+    below = cumulative[np.searchsorted(values, value, side='left')]
+    at_or_below = cumulative[np.searchsorted(values, value, side='right')]
+    return float((below + at_or_below) / 2 / cumulative[-1])
+
+def _quantile(sketch, q):
+    """Returns the estimated q-quantile, or None for an empty sketch."""
+    if sketch.n <= 0:
+        return None
+    values, cumulative = sketch._weighted()
+    position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+    return float(values[min(position, len(values) - 1)])
+
+def _histogram(sketch, edges):
+    """Returns the estimated number of values in each [edges[i], edges[i + 1]) bin."""
+    if sketch.n <= 0:
+        return np.zeros(len(edges) - 1)
+    values, cumulative = sketch._weighted()
+    below = np.concatenate([[0.0], cumulative])[np.searchsorted(values, edges, side='left')]
+    return np.diff(below) * sketch.n / cumulative[-1]
+
+class QuantileSketch:
+    """A mergeable KLL quantile sketch.
+
+    Items are kept in levels; an item at level h stands for 2**h inserted
+    values. A full level is sorted and every other item is promoted, so the
+    sketch keeps O(k log(n / k)) items and ranks are within about 1.7 / k of
+    exact with high probability.
+    """
+    __slots__ = ('k', 'levels', 'n')
+
+    def __init__(self, k=SKETCH_K):
+        self.k = k
+        self.levels = [[]]
+        self.n = 0
+
+    @classmethod
+    def from_values(cls, values, k=SKETCH_K):
+        """Builds a sketch from many values at once."""
+        sketch = cls(k)
+        sketch.levels[0] = list(values)
+        sketch.n = len(sketch.levels[0])
+        sketch._compress()
+        return sketch
+
+    def copy(self):
+        sketch = QuantileSketch(self.k)
+        sketch.levels = [list(level) for level in self.levels]
+        sketch.n = self.n
+        return sketch
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller buffers; the top level holds k items.
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items = np.sort(np.asarray(items, dtype='float64'))
+                # An odd item out stays behind so the promoted half is exact in weight.
+                kept = items[:len(items) % 2].tolist()
+                promoted = items[len(kept) + random.getrandbits(1)::2]
+                self.levels[level] = kept
+                self.levels[level + 1].extend(promoted.tolist())
+            level += 1
+
+    def update(self, value):
+        """Adds one value."""
+        self.levels[0].append(float(value))
+        self.n += 1
+        if len(self.levels[0]) > self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        """Returns a new sketch summarizing both sketches' values."""
+        merged = QuantileSketch(max(self.k, other.k))
+        merged.levels = [
+            (self.levels[h] if h < len(self.levels) else []) + (other.levels[h] if h < len(other.levels) else [])
+            for h in range(max(len(self.levels), len(other.levels)))
+        ]
+        merged.n = self.n + other.n
+        merged._compress()
+        return merged
+
+    def _weighted(self):
+        """Returns the retained items in order with their cumulative weights."""
+        values = np.concatenate([np.asarray(level, dtype='float64') for level in self.levels])
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    # --- Queries ---
+
+    rank = _rank
+    midrank = _midrank
+    quantile = _quantile
+    histogram = _histogram
+
+class SketchDifference:
+    """The values summarized by one sketch minus those of another.
+
+    Used for scores that were recorded and later replaced or deleted: the
+    removed sketch's items count with negative weight, so every query sees
+    only the values still present, within the error of both sketches.
+    """
+    __slots__ = ('added', 'removed')
+
+    def __init__(self, added, removed):
+        self.added = added
+        self.removed = removed
+
+    @property
+    def n(self):
+        return self.added.n - self.removed.n
+
+    def _weighted(self):
+        added, added_cumulative = self.added._weighted()
+        removed, removed_cumulative = self.removed._weighted()
+        values = np.concatenate([added, removed])
+        weights = np.concatenate([np.diff(added_cumulative, prepend=0.0), -np.diff(removed_cumulative, prepend=0.0)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        # One point per distinct value, so a removed value cancels the one it was recorded as.
+        last = np.append(values[1:] != values[:-1], True)
+        values, cumulative = values[last], cumulative[last]
+        # Sketch error can take a running count below zero, down again or above the total.
+        cumulative = np.clip(np.maximum.accumulate(cumulative), 0.0, self.n)
+        kept = np.diff(cumulative, prepend=0.0) > 0
+        return values[kept], cumulative[kept]
+
+    # --- Queries ---
+
+    rank = _rank
+    midrank = _midrank
+    quantile = _quantile
+    histogram = _histogram
+
+class EntrySketches:
+    """Quantile sketches of daily entry scores, one per day, merged on demand into periods.
+
+    Immutable like the snapshot holding it: `with_value` and `without_value`
+    copy only the sketch of the day written. A replaced or deleted score is
+    recorded in a per-day sketch of removed scores, which queries subtract.
+    Whole-month merges are cached per index.
+    """
+    __slots__ = ('days', 'removed', '_months')
+
+    def __init__(self, days, removed=None, months=None):
+        self.days = days  # day number -> QuantileSketch
+        self.removed = removed or {}  # day number -> QuantileSketch of scores since removed
+        self._months = months or {}
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Builds the sketches from the daily lines of a ledger frame."""
+        if frame.empty:
+            return cls({})
+        daily = frame[frame['Source'] == 'daily']
+        days = pd.to_datetime(daily['Date']).to_numpy().astype('datetime64[D]').astype('int64')
+        scores = daily['Total Points'].to_numpy(dtype='float64')
+        order = np.argsort(days, kind='stable')
+        days, scores = days[order], scores[order]
+        unique, starts = np.unique(days, return_index=True)
+        return cls({
+            day: QuantileSketch.from_values(values)
+            for day, values in zip(unique.tolist(), np.split(scores, starts[1:]))
+        })
+
+    def with_value(self, day, value):
+        """Returns the sketches with one more score recorded on day."""
+        days = {**self.days, day: _updated(self.days.get(day), value)}
+        return EntrySketches(days, self.removed, self._months_except(day))
+
+    def without_value(self, day, value):
+        """Returns the sketches with one score recorded on day removed."""
+        removed = {**self.removed, day: _updated(self.removed.get(day), value)}
+        return EntrySketches(self.days, removed, self._months_except(day))
+
+    def _months_except(self, day):
+        month = _month_of(day)
+        return {m: parts for m, parts in self._months.items() if m != month}
+
+    def _month_parts(self, month, days):
+        """Returns the (recorded, removed or None) sketches of a whole month."""
+        if month not in self._months:
+            removed = [self.removed[day] for day in days if day in self.removed]
+            self._months[month] = (_merge(self.days[day] for day in days), _merge(removed) if removed else None)
+        return self._months[month]
+
+    def month(self, day):
+        """Returns one sketch of every score in the month containing day."""
+        month = _month_of(day)
+        return _difference([self._month_parts(month, [d for d in self.days if _month_of(d) == month])])
+
+    def period(self, start=None, end=None):
+        """Returns one sketch of every score from day start to day end (inclusive); None leaves a side open."""
+        by_month = {}
+        for day in self.days:
+            by_month.setdefault(_month_of(day), []).append(day)
+        parts = []
+        for month, days in by_month.items():
+            first, last = _month_bounds(month)
+            if (start is None or start <= first) and (end is None or last <= end):
+                parts.append(self._month_parts(month, days))
+            else:
+                parts.extend(
+                    (self.days[day], self.removed.get(day))
+                    for day in days if (start is None or day >= start) and (end is None or day <= end)
+                )
+        return _difference(parts)
+
+def _merge(sketches):
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged = merged.merge(sketch)
+    return merged
+
+def _difference(parts):
+    """Returns one sketch of (recorded, removed or None) sketch pairs: the recorded scores minus the removed ones."""
+    removed = [part for _, part in parts if part is not None]
+    added = _merge(part for part, _ in parts)
+    return SketchDifference(added, _merge(removed)) if removed else added
+
+def _updated(sketch, value):
+    """Returns a copy of sketch, or a new sketch, with value added."""
+    sketch = sketch.copy() if sketch is not None else QuantileSketch()
+    sketch.update(value)
+    return sketch
+
+def _month_of(day):
+    return int(np.datetime64(day, 'D').astype('datetime64[M]').astype('int64'))
+
+def _month_bounds(month):
+    """Returns the first and last day numbers of a month number."""
+    first = np.datetime64(month, 'M').astype('datetime64[D]').astype('int64')
+    last = np.datetime64(month + 1, 'M').astype('datetime64[D]').astype('int64') - 1
+    return int(first), int(last)
@@ -2,3 +2,7 @@
 from .achievement_system import AchievementSystem
 from .challenge_system import ChallengeSystem
 from .streak_system import StreakSystem
+from .participant_registry import ParticipantRegistry
+from .group_registry import GroupRegistry
+from .badge_store import BadgeStore
+from .services import Services, tenant_services
@@ -1,33 +1,53 @@
 
+import copy
 from data_manager import load_achievements, save_achievements
+from profiling import timed
 from config import ACHIEVEMENTS, BADGE_LEVELS, BADGE_CATEGORIES
+from .shared import SharedService, reads, writes
 
-class AchievementSystem:
+# The value each category's criteria are checked against.
+CRITERIA_ARGUMENTS = {'performance': 'points', 'rank': 'rank', 'streak': 'streak'}
+
+def earned_achievements(points, rank, streak):
+    """Yields the (category, achievement) pairs whose criteria are met."""
+    arguments = {'points': points, 'rank': rank, 'streak': streak}
+    for category, achievements in ACHIEVEMENTS.items():
+        for achievement, details in achievements.items():
+            if category in CRITERIA_ARGUMENTS and details['criteria'](arguments[CRITERIA_ARGUMENTS[category]]):
+                yield category, achievement
+
+class AchievementSystem(SharedService):
+    @timed()
     def __init__(self):
+        super().__init__()
         self.achievements = ACHIEVEMENTS
         self.badge_levels = BADGE_LEVELS
         self.badge_categories = BADGE_CATEGORIES
         self.data = load_achievements()
 
+    @reads
+    def get(self, participant):
+        """Returns a copy of a participant's achievement counts by category."""
+        return copy.deepcopy(self.data.get(str(participant), {}))
+
+    @timed()
+    @writes
     def check_achievements(self, participant, points, rank, streak):
         """Checks all achievement criteria for a participant."""
-        for category, achievements in self.achievements.items():
-            for achievement, details in achievements.items():
-                if category == 'performance' and details['criteria'](points):
-                    self.award_badge(participant, category, achievement)
-                elif category == 'rank' and details['criteria'](rank):
-                    self.award_badge(participant, category, achievement)
-                elif category == 'streak' and details['criteria'](streak):
-                    self.award_badge(participant, category, achievement)
+        for category, achievement in earned_achievements(points, rank, streak):
+            self.award_badge(participant, category, achievement)
 
+    @timed()
+    @writes
     def award_badge(self, participant, category, achievement):
         """Awards a badge to a participant and saves the data."""
-        if participant not in self.data:
-            self.data[participant] = {}
-        if category not in self.data[participant]:
-            self.data[participant][category] = {}
-        if achievement not in self.data[participant][category]:
-            self.data[participant][category][achievement] = 0
+        key = str(participant)
+        if key not in self.data:
+            self.data[key] = {}
+        if category not in self.data[key]:
+            self.data[key][category] = {}
+        if achievement not in self.data[key][category]:
+            self.data[key][category][achievement] = 0
         
-        self.data[participant][category][achievement] += 1
-        save_achievements(self.data)
+        self.data[key][category][achievement] += 1
+        save_achievements(self.data, self.lock)
@@ -0,0 +1,48 @@
+
+from data_manager import load_badges, save_badges
+from profiling import timed
+from .shared import SharedService, reads, writes
+
+class BadgeStore(SharedService):
+    """The badges awarded to each participant, keyed by participant ID."""
+    @timed()
+    def __init__(self):
+        super().__init__()
+        self.data = load_badges()
+
+    def _save(self):
+        save_badges(self.data, self.lock)
+
+    @reads
+    def get(self, participant_id):
+        """Returns a copy of a participant's badges."""
+        return list(self.data.get(str(participant_id), []))
+
+    @reads
+    def all(self):
+        """Returns a copy of every participant's badges, keyed by integer ID."""
+        return {int(key): list(badges) for key, badges in self.data.items() if badges}
+
+    @timed()
+    @writes
+    def award(self, participant_id, badge):
+        """Awards a badge; returns False if the participant already has it."""
+        badges = self.data.setdefault(str(participant_id), [])
+        if badge in badges:
+            return False
+        badges.append(badge)
+        self._save()
+        return True
+
+    @timed()
+    @writes
+    def remove(self, participant_id, badge):
+        """Removes a badge; returns False if the participant does not have it."""
+        key = str(participant_id)
+        if badge not in self.data.get(key, []):
+            return False
+        self.data[key].remove(badge)
+        if not self.data[key]:
+            del self.data[key]
+        self._save()
+        return True
@@ -1,72 +1,215 @@
 
 from datetime import datetime
-from data_manager import load_challenges, save_challenges
+from data_manager import load_challenges, save_challenges, load_challenge_journal, append_challenge_journal, clear_challenge_journal
+from config import CHALLENGE_JOURNAL_COMPACTION
+from profiling import timed
+from .shared import SharedService, reads, writes
 
-class ChallengeSystem:
+class ChallengeSystem(SharedService):
+    """Challenges with set-based membership and per-participant reverse indexes.
+
+    Every change is appended to a journal; challenges.json is only rewritten
+    when the journal is compacted. Journal records carry a sequence number,
+    so replaying a journal over a newer challenges.json skips what it already
+    contains.
+    """
+    @timed()
     def __init__(self):
+        super().__init__()
         data = load_challenges()
-        self.challenges = data.get('challenges', {})
-        self.pending_requests = data.get('pending', {})
+        self.seq = data.get('seq', 0)
+        self.challenges = {}
+        self.pending_requests = {}
+        self.joined_by = {}
+        self.completed_by = {}
+        self.pending_by = {}
+        for name, challenge in data.get('challenges', {}).items():
+            self._add(name, challenge.get('description', ''), challenge.get('bonus_points', 0))
+            for participant in challenge.get('participants', []):
+                self._join(participant, name)
+            for record in challenge.get('completed', []):
+                self._complete(name, record)
+        for name, participants in data.get('pending', {}).items():
+            for participant in participants:
+                self._request(participant, name)
+
+        self.journal_length = 0
+        for record in load_challenge_journal():
+            if record['seq'] > self.seq:
+                self._apply(record)
+                self.seq = record['seq']
+                self.journal_length += 1
+        if self.journal_length >= CHALLENGE_JOURNAL_COMPACTION:
+            self._compact()
+
+    # --- Indexes ---
+
+    def _add(self, name, description, bonus_points):
+        self.challenges[name] = {
+            'name': name,
+            'description': description,
+            'bonus_points': bonus_points,
+            'participants': set(),
+            'completed': []
+        }
+
+    def _remove(self, name):
+        challenge = self.challenges.pop(name)
+        for participant in challenge['participants']:
+            self.joined_by[participant].discard(name)
+        for record in challenge['completed']:
+            self.completed_by[record['participant']].discard(name)
+        for participant in self.pending_requests.pop(name, ()):
+            self.pending_by[participant].discard(name)
+
+    def _request(self, participant, name):
+        self.pending_requests.setdefault(name, set()).add(participant)
+        self.pending_by.setdefault(participant, set()).add(name)
+
+    def _unrequest(self, participant, name):
+        self.pending_requests[name].discard(participant)
+        if not self.pending_requests[name]:
+            del self.pending_requests[name]
+        self.pending_by[participant].discard(name)
+
+    def _join(self, participant, name):
+        self.challenges[name]['participants'].add(participant)
+        self.joined_by.setdefault(participant, set()).add(name)
+
+    def _complete(self, name, record):
+        self.challenges[name]['completed'].append(record)
+        self.completed_by.setdefault(record['participant'], set()).add(name)
+
+    def _apply(self, record):
+        """Applies one journal record to the in-memory state."""
+        op, name = record['op'], record['challenge']
+        if op == 'add':
+            self._add(name, record['description'], record['bonus_points'])
+        elif op == 'remove':
+            self._remove(name)
+        elif op == 'request':
+            self._request(record['participant'], name)
+        elif op == 'reject':
+            self._unrequest(record['participant'], name)
+        elif op == 'approve':
+            participant = record['participant']
+            self._unrequest(participant, name)
+            if name in self.challenges:
+                self._complete(name, {'participant': participant, 'points': record['points'], 'date': record['date']})
+
+    # --- Persistence ---
+
+    @timed()
+    def _record(self, op, challenge_name, **fields):
+        """Applies a change, appends it to the journal and compacts when the journal is long."""
+        self.seq += 1
+        record = {'seq': self.seq, 'op': op, 'challenge': challenge_name, **fields}
+        self._apply(record)
+        append_challenge_journal(record)
+        self.journal_length += 1
+        if self.journal_length >= CHALLENGE_JOURNAL_COMPACTION:
+            self._compact()
 
-    def _save(self):
-        """Saves the current state of challenges and pending requests."""
+    @timed()
+    def _compact(self):
+        """Writes the full state to challenges.json and empties the journal."""
         save_challenges({
-            'challenges': self.challenges,
-            'pending': self.pending_requests
+            'seq': self.seq,
+            'challenges': {
+                name: {**challenge, 'participants': sorted(challenge['participants'])}
+                for name, challenge in self.challenges.items()
+            },
+            'pending': {name: sorted(participants) for name, participants in self.pending_requests.items()}
         })
+        clear_challenge_journal()
+        self.journal_length = 0
 
-    def add_challenge(self, name, description, bonus_points):
-        """Adds a new challenge."""
-        if name not in self.challenges:
-            self.challenges[name] = {
+    # --- Queries ---
+
+    @reads
+    def joined(self, participant):
+        """Returns the names of the challenges a participant has joined."""
+        return frozenset(self.joined_by.get(participant, ()))
+
+    @reads
+    def completed(self, participant):
+        """Returns the names of the challenges a participant has completed."""
+        return frozenset(self.completed_by.get(participant, ()))
+
+    @reads
+    def pending_for(self, participant):
+        """Returns the names of the challenges a participant is waiting to join."""
+        return frozenset(self.pending_by.get(participant, ()))
+
+    @reads
+    def view(self):
+        """Returns a copy of every challenge with its participants and pending requests."""
+        return [
+            {
                 'name': name,
-                'description': description,
-                'bonus_points': bonus_points,
-                'participants': [],
-                'completed': []
+                'description': challenge['description'],
+                'bonus_points': challenge['bonus_points'],
+                'participants': list(challenge['participants']),
+                'pending': list(self.pending_requests.get(name, ()))
             }
-            self._save()
-            return True
-        return False
+            for name, challenge in self.challenges.items()
+        ]
+
+    @reads
+    def pending_list(self):
+        """Returns (challenge name, participant, bonus points) for every pending request."""
+        return sorted(
+            (name, participant, self.challenges[name]['bonus_points'] if name in self.challenges else 0)
+            for name, participants in self.pending_requests.items()
+            for participant in participants
+        )
+
+    # --- Mutations ---
+
+    @timed()
+    @writes
+    def add_challenge(self, name, description, bonus_points):
+        """Adds a new challenge."""
+        if name in self.challenges:
+            return False
+        self._record('add', name, description=description, bonus_points=bonus_points)
+        return True
 
+    @timed()
+    @writes
     def remove_challenge(self, challenge_name):
         """Removes a challenge and its pending requests."""
-        if challenge_name in self.challenges:
-            del self.challenges[challenge_name]
-            if challenge_name in self.pending_requests:
-                del self.pending_requests[challenge_name]
-            self._save()
-            return True
-        return False
+        if challenge_name not in self.challenges:
+            return False
+        self._record('remove', challenge_name)
+        return True
 
+    @timed()
+    @writes
     def request_join(self, participant, challenge_name):
         """Allows a participant to request to join a challenge."""
-        if challenge_name not in self.pending_requests:
-            self.pending_requests[challenge_name] = []
-        if participant not in self.pending_requests[challenge_name]:
-            self.pending_requests[challenge_name].append(participant)
-            self._save()
-            return True
-        return False
+        if challenge_name not in self.challenges or challenge_name in self.pending_for(participant):
+            return False
+        self._record('request', challenge_name, participant=participant)
+        return True
 
+    @timed()
+    @writes
     def approve_request(self, participant, challenge_name, points):
         """Approves a participant's request to join a challenge."""
-        if challenge_name in self.pending_requests and participant in self.pending_requests[challenge_name]:
-            self.pending_requests[challenge_name].remove(participant)
-            if challenge_name in self.challenges:
-                self.challenges[challenge_name]['completed'].append({
-                    'participant': participant,
-                    'points': points,
-                    'date': datetime.now().strftime('%Y-%m-%d')
-                })
-            self._save()
-            return True
-        return False
+        if challenge_name not in self.pending_for(participant):
+            return False
+        self._record(
+            'approve', challenge_name,
+            participant=participant, points=points, date=datetime.now().strftime('%Y-%m-%d')
+        )
+        return True
 
+    @timed()
+    @writes
     def reject_request(self, participant, challenge_name):
         """Rejects a participant's request to join a challenge."""
-        if challenge_name in self.pending_requests and participant in self.pending_requests[challenge_name]:
-            self.pending_requests[challenge_name].remove(participant)
-            self._save()
-            return True
-        return False
+        if challenge_name not in self.pending_for(participant):
+            return False
+        self._record('reject', challenge_name, participant=participant)
+        return True
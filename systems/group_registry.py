@@ -0,0 +1,102 @@
+
+from data_manager import load_groups, save_groups
+from profiling import timed
+from .shared import SharedService, writes
+
+class GroupRegistry(SharedService):
+    """Nested participant groups, such as cohort → team, and each participant's group.
+
+    Like the participant registry, writers replace `groups` and `group_of`
+    instead of mutating them, so readers can use either without the lock.
+    """
+    @timed()
+    def __init__(self):
+        super().__init__()
+        data = load_groups()
+        self.next_id = data.get('next_id', 1)
+        self.groups = {
+            int(gid): {'name': group['name'], 'parent': group.get('parent')}
+            for gid, group in data.get('groups', {}).items()
+        }
+        self.group_of = {int(pid): gid for pid, gid in data.get('members', {}).items()}
+
+    def _save(self):
+        save_groups({
+            'next_id': self.next_id,
+            'groups': {str(gid): group for gid, group in self.groups.items()},
+            'members': {str(pid): gid for pid, gid in self.group_of.items()}
+        })
+
+    # --- Lookups ---
+
+    def ancestors(self, gid):
+        """Returns gid followed by its parent, grandparent and so on up to a top-level group."""
+        chain = []
+        while gid is not None:
+            chain.append(gid)
+            gid = self.groups[gid]['parent']
+        return chain
+
+    def path(self, gid):
+        """Returns a group's display path, e.g. "Cohort A / Team 1"."""
+        return " / ".join(self.groups[a]['name'] for a in reversed(self.ancestors(gid)))
+
+    def children(self, gid=None):
+        """Returns the subgroups of gid, or the top-level groups, ordered by name."""
+        return sorted(
+            (child for child, group in self.groups.items() if group['parent'] == gid),
+            key=lambda child: self.groups[child]['name']
+        )
+
+    # --- Mutations ---
+
+    @timed()
+    @writes
+    def add(self, name, parent=None):
+        """Adds a group and returns its ID, or None if the name is empty or taken under the same parent."""
+        name = name.strip()
+        if not name or (parent is not None and parent not in self.groups):
+            return None
+        if any(group['name'] == name and group['parent'] == parent for group in self.groups.values()):
+            return None
+        gid = self.next_id
+        self.next_id += 1
+        self.groups = {**self.groups, gid: {'name': name, 'parent': parent}}
+        self._save()
+        return gid
+
+    @timed()
+    @writes
+    def assign(self, pid, gid):
+        """Places a participant in a group; a gid of None removes them from their group."""
+        if gid is not None and gid not in self.groups:
+            return False
+        group_of = dict(self.group_of)
+        if gid is None:
+            group_of.pop(pid, None)
+        else:
+            group_of[pid] = gid
+        self.group_of = group_of
+        self._save()
+        return True
+
+    @timed()
+    @writes
+    def remove(self, gid):
+        """Removes a group; its subgroups and members move up to its parent."""
+        if gid not in self.groups:
+            return False
+        parent = self.groups[gid]['parent']
+        self.groups = {
+            other: {**group, 'parent': parent} if group['parent'] == gid else group
+            for other, group in self.groups.items() if other != gid
+        }
+        group_of = {}
+        for pid, member_of in self.group_of.items():
+            if member_of == gid:
+                member_of = parent
+            if member_of is not None:
+                group_of[pid] = member_of
+        self.group_of = group_of
+        self._save()
+        return True
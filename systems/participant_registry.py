@@ -0,0 +1,179 @@
+
+import os
+from data_manager import (
+    load_participants, save_participants, save_data, save_badges, save_achievements, save_streaks_data,
+    save_challenges, load_legacy_data, load_legacy_json, backup_legacy_files, data_path, tenant_dir
+)
+from config import (
+    DEFAULT_PARTICIPANTS, PARTICIPANTS_FILE, PARTICIPANT_BADGES_FILE, ACHIEVEMENT_FILE, STREAKS_FILE,
+    CHALLENGES_FILE
+)
+from profiling import timed
+from .participant_search import ParticipantSearchIndex
+from .shared import SharedService, writes
+
+class ParticipantRegistry(SharedService):
+    """Assigns compact integer IDs to participants; stores reference IDs, not names.
+
+    Writers replace `names` and `active` instead of mutating them, so readers
+    can use either without taking the lock.
+    """
+    @timed()
+    def __init__(self):
+        super().__init__()
+        first_run = not os.path.exists(data_path(PARTICIPANTS_FILE))
+        data = load_participants()
+        self.next_id = data.get('next_id', 1)
+        self.names = {}
+        self.ids_by_name = {}
+        self.active = set()
+        for pid, record in data.get('participants', {}).items():
+            pid = int(pid)
+            self.names[pid] = record['name']
+            self.ids_by_name[record['name']] = pid
+            if record.get('active', True):
+                self.active.add(pid)
+        self._search_index = None
+        self._search_version = None
+
+        if first_run:
+            # Only the default leaderboard starts with the configured roster; a
+            # new tenant starts empty, apart from names found in its legacy stores.
+            if not tenant_dir():
+                for name in DEFAULT_PARTICIPANTS:
+                    self._add(name)
+            migrate_legacy_stores(self)
+            self._save()
+
+    def _save(self):
+        save_participants({
+            'next_id': self.next_id,
+            'participants': {
+                str(pid): {'name': name, 'active': pid in self.active}
+                for pid, name in self.names.items()
+            }
+        })
+
+    def _add(self, name):
+        pid = self.next_id
+        self.next_id += 1
+        self.names = {**self.names, pid: name}
+        self.ids_by_name = {**self.ids_by_name, name: pid}
+        self.active = self.active | {pid}
+        return pid
+
+    def intern(self, name):
+        """Returns the ID for a name, registering it without saving if it is new."""
+        pid = self.ids_by_name.get(name)
+        return pid if pid is not None else self._add(name)
+
+    # --- Lookups ---
+
+    def id_of(self, name):
+        """Returns the ID registered for a display name, or None."""
+        return self.ids_by_name.get(name)
+
+    def name_of(self, pid):
+        """Returns the display name for an ID."""
+        return self.names.get(pid, f"#{pid}")
+
+    def active_ids(self):
+        """Returns active participant IDs ordered by display name."""
+        return sorted(self.active, key=self.names.__getitem__)
+
+    def search(self, query, limit, candidates=None):
+        """Returns up to limit participant IDs whose names match query."""
+        index, version = self._search_index, self.version
+        if self._search_version != version:
+            # version is read before names, so the index is never older than its version.
+            index = ParticipantSearchIndex(self.names)
+            self._search_index, self._search_version = index, version
+        return index.search(query, limit, candidates)
+
+    # --- Mutations ---
+
+    @timed()
+    @writes
+    def add(self, name):
+        """Registers a new participant and returns its ID, or None if the name is taken."""
+        name = name.strip()
+        if not name or name in self.ids_by_name:
+            return None
+        pid = self._add(name)
+        self._save()
+        return pid
+
+    @timed()
+    @writes
+    def rename(self, pid, new_name):
+        """Renames a participant; returns False if the new name is taken."""
+        new_name = new_name.strip()
+        if pid not in self.names or not new_name or new_name in self.ids_by_name:
+            return False
+        ids_by_name = dict(self.ids_by_name)
+        del ids_by_name[self.names[pid]]
+        ids_by_name[new_name] = pid
+        self.names = {**self.names, pid: new_name}
+        self.ids_by_name = ids_by_name
+        self._save()
+        return True
+
+    @timed()
+    @writes
+    def set_active(self, pid, active):
+        """Activates or deactivates a participant. Inactive participants keep their history."""
+        if pid not in self.names:
+            return False
+        self.active = self.active | {pid} if active else self.active - {pid}
+        self._save()
+        return True
+
+    # --- Entries ---
+
+    def attach_names(self, df):
+        """Returns df with its Name column derived from Participant ID."""
+        if 'Participant ID' not in df.columns:
+            # Entries written before the registry existed only carry names.
+            with self.lock.write():
+                ids = {name: self.intern(name) for name in df['Name'].unique()}
+                self.version += 1
+                self._save()
+            df = df.assign(**{'Participant ID': df['Name'].map(ids).astype('int64')})
+        return df.assign(Name=df['Participant ID'].map(self.names))
+
+def _intern_keys(registry, mapping):
+    """Rewrites a name-keyed mapping to be keyed by participant ID strings."""
+    interned = {}
+    for name, value in mapping.items():
+        interned[str(registry.intern(name))] = value
+    return interned
+
+def migrate_legacy_stores(registry):
+    """Creates the ID-keyed stores from the name-keyed files of Sarsor-LB.py. Runs once, when the registry is created.
+
+    The legacy files are copied to LEGACY_BACKUP_DIR and left as they are,
+    so the legacy app keeps reading and writing them by name.
+    """
+    backup_legacy_files()
+    df = load_legacy_data()
+    if df is not None and not df.empty:
+        save_data(registry.attach_names(df))
+
+    save_badges(_intern_keys(registry, load_legacy_json(PARTICIPANT_BADGES_FILE)))
+    save_achievements(_intern_keys(registry, load_legacy_json(ACHIEVEMENT_FILE)))
+
+    streaks = load_legacy_json(STREAKS_FILE, {"participants": {}, "milestones_awarded": {}})
+    streaks['participants'] = _intern_keys(registry, streaks.get('participants', {}))
+    streaks['milestones_awarded'] = _intern_keys(registry, streaks.get('milestones_awarded', {}))
+    save_streaks_data(streaks)
+
+    challenges = load_legacy_json(CHALLENGES_FILE, {'challenges': {}, 'pending': {}})
+    for challenge in challenges.get('challenges', {}).values():
+        for record in challenge.get('completed', []):
+            record['participant'] = registry.intern(record['participant'])
+        challenge['participants'] = [registry.intern(name) for name in challenge.get('participants', [])]
+    challenges['pending'] = {
+        challenge_name: [registry.intern(name) for name in names]
+        for challenge_name, names in challenges.get('pending', {}).items()
+    }
+    save_challenges(challenges)
@@ -0,0 +1,57 @@
+
+from bisect import bisect_left
+from heapq import nlargest
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ParticipantSearchIndex:
+    """Prefix and trigram index over participant names, built once per registry version."""
+    def __init__(self, names):
+        # Every word of a name is indexed, so "mar" finds both "Maria" and "Ana Martin".
+        self.prefix_keys = sorted(
+            (word, pid)
+            for pid, name in names.items()
+            for word in {name.casefold(), *name.casefold().split()}
+        )
+        self.trigrams = {}
+        for pid, name in names.items():
+            for gram in _trigrams(name.casefold()):
+                self.trigrams.setdefault(gram, set()).add(pid)
+
+    def prefix_matches(self, query, limit, candidates=None):
+        """Returns up to limit IDs with a name or word starting with query."""
+        matches = []
+        seen = set()
+        start = bisect_left(self.prefix_keys, (query,))
+        for word, pid in self.prefix_keys[start:]:
+            if not word.startswith(query):
+                break
+            if pid in seen or (candidates is not None and pid not in candidates):
+                continue
+            seen.add(pid)
+            matches.append(pid)
+            if len(matches) == limit:
+                break
+        return matches
+
+    def fuzzy_matches(self, query, limit, candidates=None, exclude=()):
+        """Returns up to limit IDs ranked by the number of trigrams shared with query."""
+        scores = {}
+        for gram in _trigrams(query):
+            for pid in self.trigrams.get(gram, ()):
+                scores[pid] = scores.get(pid, 0) + 1
+        ranked = (
+            (score, pid) for pid, score in scores.items()
+            if pid not in exclude and (candidates is None or pid in candidates)
+        )
+        return [pid for _, pid in nlargest(limit, ranked)]
+
+    def search(self, query, limit, candidates=None):
+        """Returns the best matching IDs: prefix hits first, then fuzzy hits."""
+        query = query.strip().casefold()
+        matches = self.prefix_matches(query, limit, candidates)
+        if len(matches) < limit and len(query) >= 2:
+            matches += self.fuzzy_matches(query, limit - len(matches), candidates, exclude=set(matches))
+        return matches
@@ -0,0 +1,70 @@
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import streamlit as st
+from dataset import load_dataset_store
+from data_manager import in_unit_of_work, tenant_scope
+from metrics import STORE_LOAD_SECONDS
+from profiling import timed
+from tenants import TenantCache, tenant_directory
+from .participant_registry import ParticipantRegistry
+from .group_registry import GroupRegistry
+from .badge_store import BadgeStore
+from .achievement_system import AchievementSystem
+from .challenge_system import ChallengeSystem
+from .streak_system import StreakSystem
+
+def _timed_load(store, load, *args):
+    """Returns a pool task that runs load(*args) and observes its duration."""
+    @in_unit_of_work
+    def task():
+        start = time.perf_counter()
+        try:
+            return load(*args)
+        finally:
+            STORE_LOAD_SECONDS.observe(time.perf_counter() - start, store=store)
+    return task
+
+class Services:
+    """The domain services and dataset store shared by every session of one tenant.
+
+    Stores are loaded from the current thread's tenant directory.
+    """
+    @timed()
+    def __init__(self):
+        # The registry is created first: on its first run it migrates name-keyed stores to IDs.
+        self.registry = ParticipantRegistry()
+
+        # The remaining stores are independent, so bootstrap takes as long as the slowest one.
+        with ThreadPoolExecutor(max_workers=6, thread_name_prefix='bootstrap') as pool:
+            dataset = pool.submit(_timed_load('entries', load_dataset_store, self.registry))
+            badges = pool.submit(_timed_load('badges', BadgeStore))
+            achievements = pool.submit(_timed_load('achievements', AchievementSystem))
+            challenges = pool.submit(_timed_load('challenges', ChallengeSystem))
+            streaks = pool.submit(_timed_load('streaks', lambda: StreakSystem(badges.result())))
+            groups = pool.submit(_timed_load('groups', GroupRegistry))
+            self.badges = badges.result()
+            self.streaks = streaks.result()
+            self.achievements = achievements.result()
+            self.challenges = challenges.result()
+            self.groups = groups.result()
+            self.dataset = dataset.result()
+
+def _load_tenant(name):
+    with tenant_scope(tenant_directory(name)):
+        return Services()
+
+@st.cache_resource
+def _tenant_cache():
+    return TenantCache(_load_tenant, lambda services: services.dataset.footprint())
+
+@contextmanager
+def tenant_services(name):
+    """Yields a tenant's services and runs the block in the tenant's directory.
+
+    The services come from the process-wide tenant cache, which loads them on
+    first use and may evict them once the block has finished.
+    """
+    with _tenant_cache().checkout(name) as services, tenant_scope(tenant_directory(name)):
+        yield services
@@ -0,0 +1,81 @@
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+class RWLock:
+    """Lets many threads read at once, or one thread write.
+
+    The writing thread may re-enter the lock and read while it writes.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            nested = self._writer == me
+            if not nested:
+                while self._writer is not None:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not nested:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+class SharedService:
+    """State shared by every session of the process, guarded by an RWLock.
+
+    `version` is bumped by every write, so sessions can cache views of it.
+    """
+    def __init__(self):
+        self.lock = RWLock()
+        self.version = 0
+
+def reads(method):
+    """Runs a SharedService method under the read lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def writes(method):
+    """Runs a SharedService method under the write lock and bumps the version."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                # Bumped only once the new state is in place: lock-free readers
+                # must never cache the old state under the new version.
+                self.version += 1
+    return wrapper
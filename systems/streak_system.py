@@ -1,102 +1,118 @@
 
-from datetime import datetime
-import pandas as pd
+from bisect import bisect_right
 import streamlit as st
-from data_manager import load_streaks_data, save_streaks_data, load_badges, save_badges
-from config import MILESTONE_TIERS, STREAK_BADGES
+from data_manager import load_streaks_data, save_streaks_data
+from config import MILESTONE_TIERS, STREAK_BADGES, PERCENTILE_BADGES, PERCENTILE_MIN_ENTRIES
 from utils import show_confetti
+from activity import day_number
+from profiling import timed
+from .shared import SharedService, writes
 
-class StreakSystem:
-    def __init__(self):
+# Milestone thresholds in ascending order, for finding the tiers a total change crosses.
+_MILESTONE_THRESHOLDS = sorted(MILESTONE_TIERS.values())
+_MILESTONE_NAMES = sorted(MILESTONE_TIERS, key=MILESTONE_TIERS.get)
+
+def percentile_badge(rank):
+    """Returns the badge of the highest percentile tier a rank reaches, or None."""
+    for threshold in sorted(PERCENTILE_BADGES, reverse=True):
+        if rank >= threshold:
+            return PERCENTILE_BADGES[threshold]
+    return None
+
+class StreakSystem(SharedService):
+    @timed()
+    def __init__(self, badges):
+        super().__init__()
+        self.badges = badges
         self.data = load_streaks_data()
 
+    @timed()
     def _save(self):
-        save_streaks_data(self.data)
+        save_streaks_data(self.data, self.lock)
 
-    def award_badge(self, participant_name, badge):
-        """Awards a badge to a participant.""" 
-        badges_data = load_badges()
-        if participant_name not in badges_data:
-            badges_data[participant_name] = []
-        if badge not in badges_data[participant_name]:
-            badges_data[participant_name].append(badge)
-            save_badges(badges_data)
+    @timed()
+    def award_badge(self, participant_id, badge):
+        """Awards a badge to a participant."""
+        self.badges.award(participant_id, badge)
 
-    def get_badges(self, participant_name):
+    @timed()
+    def get_badges(self, participant_id):
         """Gets all badges for a participant."""
-        badges_data = load_badges()
-        return badges_data.get(participant_name, [])
+        return self.badges.get(participant_id)
 
-    def check_milestones(self, participant_name):
-        """Checks for and awards milestone badges."""
+    @timed()
+    @writes
+    def check_milestones(self, participant_id, old_total, new_total):
+        """Awards the milestone badges whose thresholds a total change from old_total to new_total crossed."""
         milestones = self.data.get('milestones_awarded', {})
-        awarded = milestones.get(participant_name, [])
-        total_points = st.session_state.df[st.session_state.df['Name'] == participant_name]['Total Points'].sum()
+        awarded = milestones.get(str(participant_id), [])
         new_badges = []
 
-        for tier, threshold in MILESTONE_TIERS.items():
-            if total_points >= threshold and tier not in awarded:
-                self.award_badge(participant_name, tier)
+        start = bisect_right(_MILESTONE_THRESHOLDS, old_total)
+        end = bisect_right(_MILESTONE_THRESHOLDS, new_total)
+        for tier in _MILESTONE_NAMES[start:end]:
+            if tier not in awarded:
+                self.award_badge(participant_id, tier)
                 new_badges.append(tier)
                 awarded.append(tier)
         
         if new_badges:
-            milestones[participant_name] = awarded
+            milestones[str(participant_id)] = awarded
             self.data['milestones_awarded'] = milestones
             self._save()
         
         return new_badges
 
-    def check_streaks(self, participant_name):
-        """Checks for and awards streak badges."""
-        p_data = self.data['participants'].get(participant_name, {
+    @timed()
+    @writes
+    def check_streaks(self, participant_id, activity):
+        """Checks for and awards streak badges from the participant's activity bitmap."""
+        last_active = activity.last_active(participant_id)
+        if last_active is None:
+            return []
+
+        p_data = self.data['participants'].get(str(participant_id), {
             'current_streak': 0,
             'longest_streak': 0,
             'last_activity_date': None
         })
-        df = st.session_state.df[st.session_state.df['Name'] == participant_name]
-        if df.empty:
-            return []
-
-        dates = pd.to_datetime(df['Date']).dt.date.sort_values(ascending=False).unique()
-        if len(dates) == 0:
-            return []
-
-        today = datetime.now().date()
-        streak = 0
-        last_date = None
-
-        for d in dates:
-            if last_date is None:
-                if (today - d).days > 1:
-                    break
-                streak = 1
-                last_date = d
-            else:
-                if (last_date - d).days == 1:
-                    streak += 1
-                    last_date = d
-                else:
-                    break
-        
+        streak = activity.current_streak(participant_id)
         p_data['current_streak'] = streak
-        p_data['longest_streak'] = max(p_data.get('longest_streak', 0), streak)
-        p_data['last_activity_date'] = str(dates[0])
-        self.data['participants'][participant_name] = p_data
+        p_data['longest_streak'] = max(p_data.get('longest_streak', 0), activity.longest_streak(participant_id))
+        p_data['last_activity_date'] = str(last_active)
+        self.data['participants'][str(participant_id)] = p_data
         self._save()
 
         new_badges = []
         for days, badge in STREAK_BADGES.items():
-            if streak >= days and badge not in self.get_badges(participant_name):
-                self.award_badge(participant_name, badge)
+            if streak >= days and badge not in self.get_badges(participant_id):
+                self.award_badge(participant_id, badge)
                 new_badges.append(badge)
         
         return new_badges
 
-    def trigger_milestone_and_streak_checks(self, participant_name):
-        """Triggers all checks and shows confetti if new badges are awarded."""
-        new_milestones = self.check_milestones(participant_name)
-        new_streaks = self.check_streaks(participant_name)
-        if new_milestones or new_streaks:
+    @timed()
+    def check_percentiles(self, participant_id, snapshot):
+        """Awards percentile badges for the daily entries a write added, ranked against their month."""
+        new_badges = []
+        for _, row in snapshot.changes or ():
+            if row is None or row['Source'] != 'daily' or row['Participant ID'] != participant_id:
+                continue
+            month = snapshot.sketches.month(day_number(row['Date']))
+            if month.n < PERCENTILE_MIN_ENTRIES:
+                continue
+            # Ties share a midpoint rank, so a common top score does not earn the top badge.
+            badge = percentile_badge(month.midrank(row['Total Points']))
+            if badge is not None and self.badges.award(participant_id, badge):
+                new_badges.append(badge)
+        return new_badges
+
+    @timed()
+    def trigger_milestone_and_streak_checks(self, participant_id, snapshot):
+        """Triggers all checks for the snapshot a write produced and shows confetti if new badges are awarded."""
+        new_milestones = self.check_milestones(participant_id, *snapshot.total_change(participant_id))
+        new_streaks = self.check_streaks(participant_id, snapshot.activity)
+        new_percentiles = self.check_percentiles(participant_id, snapshot)
+        if new_milestones or new_streaks or new_percentiles:
             show_confetti()
-            st.experimental_rerun()
+            st.rerun()
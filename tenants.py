@@ -0,0 +1,118 @@
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import streamlit as st
+import metrics
+from config import TENANTS_DIR, TENANT_QUERY_PARAM, TENANT_CACHE_BYTES, TENANT_IDLE_SECONDS
+
+# Tenant names become directory names, so only plain names are accepted.
+TENANT_NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,63}')
+
+def tenant_directory(name):
+    """Returns a tenant's data directory, '' for the default tenant, or None when there is no such tenant."""
+    if not name:
+        return ''
+    if not TENANT_NAME.fullmatch(name):
+        return None
+    directory = os.path.join(TENANTS_DIR, name)
+    return directory if os.path.isdir(directory) else None
+
+def session_tenant():
+    """Returns the tenant selected by the page's query parameter, or None when it does not exist.
+
+    Switching tenants logs the session out and clears the picked
+    participant, which both belong to one leaderboard.
+    """
+    name = st.query_params.get(TENANT_QUERY_PARAM, '')
+    if tenant_directory(name) is None:
+        return None
+    if st.session_state.get('tenant', name) != name:
+        st.session_state.admin = False
+        st.session_state.user = None
+        st.session_state.pop('user_select', None)
+    st.session_state.tenant = name
+    return name
+
+class TenantCache:
+    """Process-wide LRU of loaded tenants, bounded by their estimated memory.
+
+    A tenant is loaded on its first use. After each checkout, tenants idle for
+    longer than idle_seconds are dropped, then the least recently used ones
+    while the total exceeds the budget; a tenant checked out by a running
+    rerun is never dropped. A dropped tenant is reloaded from its files on its
+    next visit.
+    """
+    def __init__(self, load, size, budget=TENANT_CACHE_BYTES, idle_seconds=TENANT_IDLE_SECONDS):
+        self._load = load  # tenant name -> value
+        self._size = size  # value -> estimated bytes
+        self.budget = budget
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # name -> {'value', 'users', 'last_used'}, least recently used first
+        self._loading = {}  # name -> lock held while the tenant loads, so it loads once
+
+    @contextmanager
+    def checkout(self, name):
+        """Yields a tenant's value, loading it if needed, and keeps it cached while in use."""
+        entry = self._acquire(name)
+        try:
+            yield entry['value']
+        finally:
+            with self._lock:
+                entry['users'] -= 1
+                entry['last_used'] = time.monotonic()
+                self._evict()
+
+    def _acquire(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                loading = self._loading.setdefault(name, threading.Lock())
+            else:
+                self._use(name, entry)
+                metrics.CACHE_HITS.inc(cache='tenant')
+                return entry
+        with loading:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    # Another session loaded it while this one waited.
+                    self._use(name, entry)
+                    return entry
+            metrics.CACHE_MISSES.inc(cache='tenant')
+            value = self._load(name)
+            with self._lock:
+                entry = {'value': value, 'users': 0, 'last_used': time.monotonic()}
+                self._entries[name] = entry
+                self._loading.pop(name, None)
+                self._use(name, entry)
+                return entry
+
+    def _use(self, name, entry):
+        entry['users'] += 1
+        entry['last_used'] = time.monotonic()
+        self._entries.move_to_end(name)
+
+    def _evict(self):
+        """Drops idle tenants, then the least recently used until the rest fit the budget; holds the lock."""
+        now = time.monotonic()
+        sizes = {name: self._size(entry['value']) for name, entry in self._entries.items()}
+        total = sum(sizes.values())
+        for name, entry in list(self._entries.items()):
+            if entry['users']:
+                continue
+            if now - entry['last_used'] > self.idle_seconds:
+                reason = 'idle'
+            elif total > self.budget:
+                reason = 'memory'
+            else:
+                continue
+            del self._entries[name]
+            total -= sizes[name]
+            metrics.TENANT_EVICTIONS.inc(reason=reason)
+        metrics.TENANTS_LOADED.set(len(self._entries))
+        metrics.TENANT_CACHE_BYTES.set(total)
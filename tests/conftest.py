@@ -0,0 +1,6 @@
+import os
+import sys
+
+# config refuses to import without an admin hash.
+os.environ.setdefault('ADMIN_HASH', 'test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,34 @@
+from datetime import date
+import pandas as pd
+from activity import ActivityIndex, day_number
+
+def _index():
+    return ActivityIndex.from_frame(pd.DataFrame({
+        'Participant ID': [1, 1, 1, 1, 1, 2, 2],
+        'Date': ['2026-10-01', '2026-10-02', '2026-10-03', '2026-10-05', '2026-10-06', '2026-10-06', '2026-10-06'],
+        'Source': ['daily'] * 6 + ['challenge']
+    }))
+
+def test_streaks_from_bitmaps():
+    index = _index()
+    assert index.longest_streak(1) == 3
+    assert index.current_streak(1, today=date(2026, 10, 7)) == 2
+    assert index.current_streak(1, today=date(2026, 10, 8)) == 0
+    assert index.last_active(1) == date(2026, 10, 6)
+    assert index.current_streak(3) == 0 and index.longest_streak(3) == 0
+
+def test_filling_a_gap_joins_the_runs():
+    index = _index().with_day(1, day_number('2026-10-04'), True)
+    assert index.longest_streak(1) == 6
+    assert index.current_streak(1, today=date(2026, 10, 6)) == 6
+    # An earlier day moves the origin back without losing later days.
+    index = index.with_day(2, day_number('2026-09-30'), True).with_day(1, day_number('2026-10-06'), False)
+    assert index.longest_streak(1) == 5 and index.last_active(1) == date(2026, 10, 5)
+    assert index.days(2, '2026-09-29', '2026-10-01').tolist() == [False, True, False]
+
+def test_daily_lookups():
+    index = _index()
+    assert index.active_on('2026-10-06') == {1, 2}
+    assert index.active_count('2026-10-04') == 0
+    assert index.active_dates()[:2] == [date(2026, 10, 6), date(2026, 10, 5)]
+    assert index.attendance(1, '2026-10-01', '2026-10-10') == 0.5
@@ -0,0 +1,20 @@
+from data_manager import load_challenge_journal, tenant_scope
+from systems import ChallengeSystem
+
+def test_approval_records_a_completion_and_survives_replay(tmp_path):
+    with tenant_scope(str(tmp_path)):
+        challenges = ChallengeSystem()
+        challenges.add_challenge('Run', 'run 5k', 15)
+        assert challenges.request_join(3, 'Run')
+        assert challenges.approve_request(3, 'Run', 15)
+        assert not challenges.approve_request(3, 'Run', 15)
+        journal = load_challenge_journal()
+        replayed = ChallengeSystem()
+
+    assert [record['op'] for record in journal] == ['add', 'request', 'approve']
+    for system in (challenges, replayed):
+        assert system.completed(3) == {'Run'}
+        # Approval completes the challenge; it does not enrol the participant.
+        assert system.joined(3) == frozenset() and system.pending_for(3) == frozenset()
+        assert system.view()[0]['participants'] == []
+        assert system.challenges['Run']['completed'][0]['points'] == 15
@@ -0,0 +1,28 @@
+import pandas as pd
+from cube import AggregateCube, MEASURES
+from config import DATA_FILE
+from data_manager import load_data, tenant_scope
+
+def test_cube_from_csv_without_category_columns(tmp_path):
+    (tmp_path / DATA_FILE).write_text(
+        'Participant ID,Date,Source,Ref,Base Points,Bonus Points,Total Points\n'
+        '1,2026-09-30,daily,,10,2,12\n'
+        '1,2026-10-01,daily,,5,0,5\n'
+        '2,2026-10-01,challenge,Run,0,0,15\n'
+    )
+    with tenant_scope(str(tmp_path)):
+        frame = load_data()
+    cube = AggregateCube.from_frame(frame)
+    assert cube.ids == [1, 2]
+    total = MEASURES.index('Total Points')
+    assert cube.values[:, :, total].tolist() == [[12.0, 5.0], [0.0, 15.0]]
+    assert not cube.values[:, :, :MEASURES.index('Base Points')].any()
+
+def test_cube_from_frame_missing_categories():
+    frame = pd.DataFrame({
+        'Participant ID': [3], 'Date': ['2026-10-05'], 'Source': ['daily'],
+        'Base Points': [7], 'Bonus Points': [0], 'Total Points': [7]
+    })
+    cube = AggregateCube.from_frame(frame)
+    assert cube.monthly('Total Points').tolist() == [[7.0]]
+    assert cube.monthly('Entries').tolist() == [[1.0]]
@@ -0,0 +1,75 @@
+import json
+import os
+import pickle
+import pyarrow.parquet as pq
+import data_manager
+from config import DATA_CACHE_FILE, DATA_FILE
+from data_manager import date_fallbacks, load_data, read_data_appends, tenant_scope
+
+ENTRIES = (
+    'Participant ID,Date,Source,Ref,Base Points,Bonus Points,Total Points\n'
+    '1,2026-10-01,daily,,10,0,10\n'
+)
+
+def test_load_data_survives_unwritable_parse_cache(tmp_path, monkeypatch):
+    (tmp_path / DATA_FILE).write_text(ENTRIES + '2,2026-10-02,daily,,7,0,7\n')
+
+    def refuse(*args, **kwargs):
+        raise PermissionError('read-only file system')
+    monkeypatch.setattr(pq, 'write_table', refuse)
+    with tenant_scope(str(tmp_path)):
+        frame = load_data()
+    assert frame['Total Points'].tolist() == [10, 7]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [DATA_FILE]
+
+def test_parse_cache_round_trips_without_unpickling(tmp_path, monkeypatch):
+    (tmp_path / DATA_FILE).write_text(ENTRIES)
+    (tmp_path / DATA_CACHE_FILE).write_bytes(pickle.dumps({'planted': True}))
+    with tenant_scope(str(tmp_path)):
+        parsed = load_data()
+        monkeypatch.setattr(data_manager.pd, 'read_csv', None)  # A second parse would fail.
+        cached = load_data()
+    assert cached.equals(parsed)
+    assert str(cached['Month'].dtype) == 'period[M]'
+
+def test_date_fallbacks_are_cleared_on_reparse(tmp_path):
+    path = tmp_path / DATA_FILE
+    path.write_text(ENTRIES + '2,10/02/2026,daily,,7,0,7\n')
+    with tenant_scope(str(tmp_path)):
+        load_data()
+        assert date_fallbacks() == ['10/02/2026']
+        path.write_text(ENTRIES)
+        load_data()
+        assert date_fallbacks() == []
+
+def test_unchanged_json_is_rewritten_after_another_process_changes_it(tmp_path):
+    path = str(tmp_path / 'store.json')
+    data_manager.write_json_data(path, {'a': 1})
+    written = os.stat(path)
+    data_manager.write_json_data(path, {'a': 1})
+    assert os.stat(path).st_mtime_ns == written.st_mtime_ns and os.stat(path).st_ino == written.st_ino
+
+    other = tmp_path / 'other.json'
+    other.write_text(json.dumps({'a': 2}))
+    os.replace(other, path)
+    data_manager.write_json_data(path, {'a': 1})
+    assert data_manager.load_json_data(path) == {'a': 1}
+
+def test_appended_lines_are_read_incrementally(tmp_path):
+    path = tmp_path / DATA_FILE
+    path.write_text(ENTRIES)
+    with tenant_scope(str(tmp_path)):
+        load_data()
+        assert read_data_appends().empty
+        with open(path, 'a') as f:
+            f.write('2,2026-10-02,daily,,7,0,7\n3,2026-10-02,daily,,5')
+        appended = read_data_appends()
+        assert appended['Participant ID'].tolist() == [2]
+        # The partial last line is read once it is complete.
+        with open(path, 'a') as f:
+            f.write(',0,5\n')
+        assert read_data_appends()['Total Points'].tolist() == [5]
+        assert read_data_appends().empty
+
+        path.write_text(ENTRIES.replace('10,0,10', '99,0,99') + '2,2026-10-02,daily,,7,0,7\n3,2026-10-02,daily,,5,0,5\n')
+        assert read_data_appends() is None
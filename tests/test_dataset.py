@@ -0,0 +1,75 @@
+import pandas as pd
+import dataset
+from config import CATEGORIES, DATA_FILE
+from data_manager import load_data, tenant_scope
+from dataset import DatasetStore, entry_key, resolve_ledger
+
+ZEROS = ',0' * len(CATEGORIES)
+ENTRIES = (
+    'Participant ID,Date,Month,Source,Ref,Base Points,Bonus Points,Total Points,' + ','.join(CATEGORIES) + ',Op\n'
+    '1,2026-10-01,2026-10,daily,,10,0,10' + ZEROS + ',\n'
+    '2,2026-10-01,2026-10,daily,,7,0,7' + ZEROS + ',\n'
+)
+
+def test_edits_are_appended_and_resolved_on_load(tmp_path):
+    path = tmp_path / DATA_FILE
+    path.write_text(ENTRIES)
+    with tenant_scope(str(tmp_path)):
+        store = DatasetStore(resolve_ledger(load_data()))
+        first = entry_key(1, '2026-10-01')
+        store.modify(first, lambda row: {**row, 'Bonus Points': 5, 'Total Points': 15})
+        store.delete(entry_key(2, '2026-10-01'))
+        reloaded = resolve_ledger(load_data())
+
+    lines = path.read_text().splitlines()
+    assert '\n'.join(lines[:3]) + '\n' == ENTRIES
+    assert [line.rsplit(',', 1)[1] for line in lines[3:]] == ['set', 'delete']
+    assert reloaded[['Participant ID', 'Total Points']].values.tolist() == [[1, 15]]
+    assert 'Op' not in reloaded.columns
+    assert store.current.totals[1] == 15
+
+def _store():
+    frame = pd.DataFrame({
+        'Participant ID': [1, 2], 'Date': pd.to_datetime(['2026-10-01', '2026-10-01']),
+        'Source': ['daily', 'daily'], 'Ref': ['', ''], 'Total Points': [10, 7]
+    })
+    return DatasetStore(frame)
+
+def test_readers_keep_their_snapshot_while_writers_publish():
+    store = _store()
+    pinned = store.current
+    key = entry_key(1, '2026-10-01')
+    store.modify(key, lambda row: {**row, 'Total Points': 15}, persist=False)
+    store.upsert({**store.get(key), 'Date': pd.Timestamp('2026-10-02'), 'Total Points': 4}, persist=False)
+    current = store.current
+
+    assert (pinned.version, current.version) == (1, 3)
+    assert pinned.frame['Total Points'].tolist() == [10, 7]
+    assert pinned.totals == {1: 10, 2: 7}
+    assert sorted(current.frame['Total Points'].tolist()) == [4, 7, 15]
+    assert current.totals == {1: 19, 2: 7}
+    assert current.parent_version == 2 and current.total_change(1) == (15, 19)
+
+def test_overlay_is_compacted_past_the_threshold(monkeypatch):
+    monkeypatch.setattr(dataset, 'DATASET_COMPACTION_THRESHOLD', 2)
+    store = _store()
+    for day in range(2, 5):
+        store.upsert({**store.get(entry_key(2, '2026-10-01')), 'Date': pd.Timestamp(f'2026-10-0{day}')}, persist=False)
+    current = store.current
+    assert current.overlay == {} and len(current.base) == 5
+    assert current.get(entry_key(2, '2026-10-04'))['Total Points'] == 7
+    assert current.totals[2] == 28
+
+def test_row_lookups_do_not_materialize_the_frame():
+    store = _store()
+    store.upsert({**store.get(entry_key(2, '2026-10-01')), 'Date': pd.Timestamp('2026-10-03')}, persist=False)
+    store.delete(entry_key(1, '2026-10-01'), persist=False)
+    snapshot = store.current
+
+    assert snapshot.size == 2
+    assert snapshot.date_bounds() == (pd.Timestamp('2026-10-01'), pd.Timestamp('2026-10-03'))
+    assert snapshot.rows_between('2026-10-01', '2026-10-02')['Participant ID'].tolist() == [2]
+    assert snapshot.rows_between('2026-10-02')['Date'].tolist() == [pd.Timestamp('2026-10-03')]
+    assert snapshot.rows_between(participants=[1]).empty
+    assert len(snapshot.rows_between(participants=[1, 2])) == 2
+    assert snapshot._frame is None
@@ -0,0 +1,44 @@
+import pandas as pd
+from data_manager import tenant_scope
+from ranking import GroupRollup, Ranking
+from systems import GroupRegistry
+
+def _line(pid, points):
+    return {'Participant ID': pid, 'Date': pd.Timestamp('2026-10-01'), 'Source': 'daily', 'Ref': '',
+            'Base Points': points, 'Bonus Points': 0, 'Total Points': points}
+
+def _groups(tmp_path):
+    with tenant_scope(str(tmp_path)):
+        groups = GroupRegistry()
+        cohort = groups.add('Cohort A')
+        red, blue = groups.add('Red', cohort), groups.add('Blue', cohort)
+        for pid, gid in ((1, red), (2, red), (3, blue), (4, cohort)):
+            groups.assign(pid, gid)
+    return groups, cohort, red, blue
+
+def test_rollups_include_every_subgroup(tmp_path):
+    groups, cohort, red, blue = _groups(tmp_path)
+    lines = [_line(1, 10), _line(2, 20), _line(3, 50), _line(4, 5), _line(9, 100)]
+    rollup = GroupRollup.from_ranking(Ranking.from_entries(pd.DataFrame(lines), {}), groups)
+    assert rollup.totals == {red: (30, 2), blue: (50, 1), cohort: (85, 4)}
+    assert rollup.members == {red: 2, blue: 1, cohort: 4}
+
+    standings = rollup.standings(groups, cohort)
+    assert standings[['Group', 'Rank', 'Total Points']].values.tolist() == [['Blue', 1, 50], ['Red', 2, 30]]
+    assert standings['Average Points'].tolist() == [50.0, 15.0]
+    assert groups.path(red) == 'Cohort A / Red'
+
+def test_rollup_deltas_touch_the_written_participants_ancestors(tmp_path):
+    groups, cohort, red, blue = _groups(tmp_path)
+    lines = [_line(1, 10), _line(3, 50)]
+    rollup = GroupRollup.from_ranking(Ranking.from_entries(pd.DataFrame(lines), {}), groups)
+    updated = rollup.apply_changes([([lines[0]], _line(1, 40)), ([], _line(2, 5)), ([lines[1]], None)], 'All Time', groups)
+    assert updated.totals == {red: (45, 2), blue: (0, 0), cohort: (45, 2)}
+    assert rollup.totals[cohort] == (60, 2)
+
+def test_removed_group_hands_members_to_its_parent(tmp_path):
+    groups, cohort, red, blue = _groups(tmp_path)
+    with tenant_scope(str(tmp_path)):
+        groups.remove(red)
+        assert GroupRegistry().group_of == {1: cohort, 2: cohort, 3: blue, 4: cohort}
+    assert groups.children(cohort) == [blue]
@@ -0,0 +1,39 @@
+import json
+import os
+from datetime import date
+from streamlit.testing.v1 import AppTest
+from config import DATA_FILE, LEGACY_BACKUP_DIR, LEGACY_FILES, PARTICIPANT_BADGES_FILE
+from dataset import load_dataset_store
+from systems import BadgeStore, ParticipantRegistry
+
+LEGACY_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Sarsor-LB.py')
+
+def _legacy_leaderboard():
+    at = AppTest.from_file(LEGACY_APP, default_timeout=30)
+    at.run()
+    return at.dataframe[0].value
+
+def test_legacy_app_still_loads_after_migration(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    today = date.today().isoformat()
+    (tmp_path / 'leaderboard_data.csv').write_text(
+        'Name,Date,Month,Base Points,Bonus Points,Total Points\n'
+        f'Eman,{today},{today[:7]},40,5,45\n'
+        f'Nader,{today},{today[:7]},70,0,70\n'
+    )
+    (tmp_path / 'participant_badges.json').write_text(json.dumps({'Nader': ['🏆 Top Performer']}))
+    before = _legacy_leaderboard()
+    legacy = {name: (tmp_path / name).read_bytes() for name in LEGACY_FILES.values() if (tmp_path / name).exists()}
+
+    registry = ParticipantRegistry()
+    frame = load_dataset_store(registry).current.frame
+    nader = registry.id_of('Nader')
+    assert frame.set_index('Participant ID')['Total Points'][nader] == 70
+    assert BadgeStore().get(nader) == ['🏆 Top Performer']
+    assert (tmp_path / DATA_FILE).exists() and (tmp_path / PARTICIPANT_BADGES_FILE).exists()
+
+    for name, content in legacy.items():
+        assert (tmp_path / name).read_bytes() == content
+        assert (tmp_path / LEGACY_BACKUP_DIR / name).read_bytes() == content
+    assert _legacy_leaderboard().equals(before)
+    assert before['Name'].tolist() == ['Nader', 'Eman']
@@ -0,0 +1,15 @@
+import metrics
+
+def test_label_values_are_escaped(monkeypatch):
+    # A private registry keeps the test counter out of the process exposition.
+    monkeypatch.setattr(metrics, '_registry', [])
+    counter = metrics.Counter('test_escaped_total', 'Escaping test.')
+    counter.inc(name='Ada "The" \\ Count\nof Lovelace')
+    assert counter.render()[-1] == 'test_escaped_total{name="Ada \\"The\\" \\\\ Count\\nof Lovelace"} 1'
+    assert 'test_escaped_total' in metrics.render()
+
+def test_reruns_are_counted_once():
+    before = metrics.RERUNS.values.get((), 0)
+    with metrics.rerun():
+        pass
+    assert metrics.RERUNS.values[()] == before + 1
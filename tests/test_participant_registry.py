@@ -0,0 +1,20 @@
+from config import DEFAULT_PARTICIPANTS
+from data_manager import tenant_scope
+from systems import ParticipantRegistry
+
+def test_default_leaderboard_is_seeded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert sorted(ParticipantRegistry().names.values()) == sorted(DEFAULT_PARTICIPANTS)
+
+def test_new_tenant_starts_empty(tmp_path):
+    with tenant_scope(str(tmp_path)):
+        registry = ParticipantRegistry()
+        assert registry.names == {}
+        assert ParticipantRegistry().names == {}
+
+def test_tenant_keeps_its_legacy_names(tmp_path):
+    (tmp_path / 'leaderboard_data.csv').write_text(
+        'Name,Date,Month,Base Points,Bonus Points,Total Points\nAda,2026-10-01,2026-10,10,0,10\n'
+    )
+    with tenant_scope(str(tmp_path)):
+        assert list(ParticipantRegistry().names.values()) == ['Ada']
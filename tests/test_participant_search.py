@@ -0,0 +1,22 @@
+from data_manager import tenant_scope
+from systems import ParticipantRegistry
+from systems.participant_search import ParticipantSearchIndex
+
+NAMES = {1: 'Maria', 2: 'Ana Martin', 3: 'Marwan', 4: 'Nader', 5: 'Schrödinger'}
+
+def test_prefixes_match_any_word_before_fuzzy_matches():
+    index = ParticipantSearchIndex(NAMES)
+    assert sorted(index.search('mar', 10)[:3]) == [1, 2, 3]
+    assert index.search(' MAR ', 2) == index.search('mar', 2) and len(index.search('mar', 2)) == 2
+    assert index.search('mar', 10, candidates={2, 4}) == [2]
+    # No prefix hit: shared trigrams still find a misspelt name.
+    assert index.search('shrodinger', 3)[0] == 5
+    assert index.search('x', 3) == []
+
+def test_registry_search_follows_renames(tmp_path):
+    with tenant_scope(str(tmp_path)):
+        registry = ParticipantRegistry()
+        eman = registry.add('Eman')
+        assert registry.search('em', 5) == [eman]
+        registry.rename(eman, 'Youssef')
+        assert registry.search('em', 5) == [] and registry.search('you', 5) == [eman]
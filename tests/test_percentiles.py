@@ -0,0 +1,57 @@
+import pandas as pd
+from config import PERCENTILE_BADGES
+from data_manager import tenant_scope
+from dataset import Snapshot, entry_key
+from sketch import EntrySketches, QuantileSketch
+from systems import BadgeStore, StreakSystem
+
+TOP_1, TOP_10 = PERCENTILE_BADGES[0.99], PERCENTILE_BADGES[0.9]
+
+def test_midrank_splits_ties():
+    sketch = QuantileSketch.from_values([1, 2, 2, 3])
+    assert sketch.rank(2) == 0.75
+    assert sketch.midrank(2) == 0.5
+    assert sketch.midrank(3) == 0.875
+
+class _Snapshot:
+    def __init__(self, frame, written):
+        self.sketches = EntrySketches.from_frame(frame)
+        self.changes = [([], row) for row in frame.to_dict('records') if row['Participant ID'] in written]
+
+def _month(scores):
+    return pd.DataFrame({
+        'Participant ID': range(1, len(scores) + 1),
+        'Date': ['2026-10-05'] * len(scores),
+        'Source': ['daily'] * len(scores),
+        'Total Points': scores
+    })
+
+def _awarded(frame, pid, tmp_path):
+    with tenant_scope(str(tmp_path)):
+        streaks = StreakSystem(BadgeStore())
+        return streaks.check_percentiles(pid, _Snapshot(frame, {pid}))
+
+def test_unique_top_score_is_top_one_percent(tmp_path):
+    frame = _month(list(range(1, 100)) + [150])
+    # Only the highest tier reached is awarded.
+    assert _awarded(frame, 100, tmp_path) == [TOP_1]
+
+def test_tied_top_scores_are_not_top_one_percent(tmp_path):
+    # Five participants share the maximum of 100 daily scores.
+    frame = _month(list(range(1, 96)) + [150] * 5)
+    assert _awarded(frame, 100, tmp_path) == [TOP_10]
+
+def test_replaced_scores_leave_the_month_sketch():
+    frame = _month(list(range(1, 100)) + [150]).assign(Ref='')
+    snapshot = Snapshot.compacted(1, frame)
+    key = entry_key(100, '2026-10-05')
+    assert snapshot.sketches.month(key[1]).rank(149) == 0.99
+
+    replaced = snapshot.with_rows([(key, {**snapshot.get(key), 'Total Points': 0})])
+    month = replaced.sketches.month(key[1])
+    assert month.n == 100
+    assert month.rank(149) == 1.0 and month.rank(0) == 0.01
+    assert month.quantile(1.0) == 99
+    deleted = replaced.with_rows([(key, None)]).sketches.period()
+    assert deleted.n == 99 and deleted.rank(0) == 0.0
+    assert deleted.histogram([0, 50, 200]).round().tolist() == [49, 50]
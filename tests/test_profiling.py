@@ -0,0 +1,21 @@
+import profiling
+
+def test_spans_are_recorded_per_rerun():
+    profiling.reset()
+
+    @profiling.timed('work')
+    def work():
+        with profiling.span('inner'):
+            pass
+
+    work()  # Outside a rerun: not recorded.
+    for _ in range(3):
+        with profiling.rerun():
+            work()
+    assert profiling.recorded_reruns() == 3
+    rows = {row['Span']: row for row in profiling.summary()}
+    assert sorted(rows) == ['inner', 'rerun', 'work']
+    assert rows['work']['Calls'] == 3
+    assert rows['rerun']['Total (ms)'] >= rows['work']['Total (ms)']
+    profiling.reset()
+    assert profiling.summary() == []
@@ -0,0 +1,121 @@
+import json
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+import ranking
+from config import CHALLENGES_FILE, RANK_HISTORY_FILE
+from data_manager import tenant_scope
+from dataset import DatasetStore, Snapshot, entry_key, ledger_row, migrate_to_ledger
+from ranking import (
+    Ranking, aggregate_points, aggregate_snapshot, apply_challenge_changes, challenge_counts, challenge_stats, rank_baseline
+)
+
+def _line(pid, ref, points, source='challenge'):
+    return {'Participant ID': pid, 'Date': pd.Timestamp('2026-10-01'), 'Source': source, 'Ref': ref, 'Total Points': points}
+
+def test_challenge_stats_follow_keyed_changes():
+    rows = [_line(1, 'Run', 10), _line(2, 'Run', 10), _line(1, 'Swim', 5), _line(1, '', 7, 'daily')]
+    counts = challenge_counts(pd.DataFrame(rows))
+    changes = [([rows[1]], None), ([], _line(3, 'Swim', 5)), ([rows[3]], _line(1, '', 9, 'daily'))]
+    updated = apply_challenge_changes(counts, changes)
+
+    expected = challenge_counts(pd.DataFrame([rows[0], rows[2], _line(3, 'Swim', 5)]))
+    assert updated == expected
+    stats = challenge_stats(updated)
+    assert stats.loc['Run'].tolist() == [1, 1, 10]
+    assert stats.loc['Swim'].tolist() == [2, 2, 10]
+
+def _daily(pid, day, base, bonus=0):
+    return {
+        'Participant ID': pid, 'Date': pd.Timestamp(day), 'Source': 'daily', 'Ref': '',
+        'Base Points': base, 'Bonus Points': bonus, 'Total Points': base + bonus
+    }
+
+def test_ledger_sources_add_up_to_the_total():
+    lines = [
+        _daily(1, '2026-10-01', 40, 5), _daily(1, '2026-10-02', 30),
+        ledger_row(1, '2026-10-02', 'challenge', 'Run', 15),
+        ledger_row(2, '2026-10-02', 'punishment', 'Late', -10), _daily(2, '2026-10-02', 50)
+    ]
+    totals = aggregate_points(pd.DataFrame(lines))
+    assert totals.loc[1].tolist() == [70, 5, 90, 75, 15, 0, 3]
+    assert totals.loc[2].tolist() == [50, 0, 40, 50, 0, -10, 2]
+
+    ranking = Ranking.from_entries(pd.DataFrame(lines[:3]), {1: 'Eman', 2: 'Nader'})
+    changes = [([], lines[3]), ([], lines[4]), ([lines[0]], None)]
+    updated = ranking.apply_changes(changes, 'All Time', {1: 'Eman', 2: 'Nader'})
+    assert updated.frame.equals(Ranking.from_entries(pd.DataFrame(lines[1:]), {1: 'Eman', 2: 'Nader'}).frame)
+
+def test_legacy_entries_gain_their_challenge_awards(tmp_path):
+    (tmp_path / CHALLENGES_FILE).write_text(json.dumps({'challenges': {
+        'Run': {'completed': [{'participant': 2, 'points': 15, 'date': '2026-10-02'}]}
+    }}))
+    legacy = pd.DataFrame([_daily(1, '2026-10-01', 40)]).drop(columns=['Source', 'Ref'])
+    with tenant_scope(str(tmp_path)):
+        ledger = migrate_to_ledger(legacy)
+    assert ledger[['Participant ID', 'Source', 'Ref', 'Total Points']].values.tolist() == [
+        [1, 'daily', '', 40], [2, 'challenge', 'Run', 15]
+    ]
+
+def test_all_time_aggregation_merges_chunks_with_the_overlay():
+    lines = [_daily(pid, f'2026-10-0{day}', 10 * pid + day) for pid in (1, 2, 3) for day in (1, 2, 3)]
+    snapshot = Snapshot.compacted(1, pd.DataFrame(lines)).with_rows([
+        (entry_key(1, '2026-10-02'), None),
+        (entry_key(2, '2026-10-03'), _daily(2, '2026-10-03', 50)),
+        (entry_key(4, '2026-10-03'), _daily(4, '2026-10-03', 5))
+    ])
+    expected = aggregate_points(snapshot.frame).sort_index()
+    assert aggregate_snapshot(snapshot, chunk_rows=2).sort_index().equals(expected)
+
+def test_all_time_aggregation_memory_is_bounded_by_the_chunk():
+    rows = 200_000
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'Participant ID': rng.integers(1, 100, rows), 'Date': pd.Timestamp('2026-01-01'),
+        'Source': rng.choice(['daily', 'challenge', 'punishment'], rows), 'Ref': '',
+        'Base Points': rng.integers(0, 100, rows), 'Bonus Points': rng.integers(0, 50, rows)
+    })
+    frame['Total Points'] = frame['Base Points'] + frame['Bonus Points']
+    snapshot = Snapshot.compacted(1, frame)
+
+    tracemalloc.start()
+    try:
+        totals = aggregate_snapshot(snapshot, chunk_rows=5_000)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < frame.memory_usage(deep=True).sum() / 10
+    assert totals.sort_index().equals(aggregate_points(frame).sort_index())
+
+def test_ranking_pages_and_neighbours():
+    lines = [_daily(pid, '2026-10-01', 10 * pid) for pid in range(1, 8)] + [_daily(8, '2026-10-01', 70)]
+    ranking = Ranking.from_entries(pd.DataFrame(lines), {pid: f'P{pid}' for pid in range(1, 9)})
+    assert len(ranking) == 8 and ranking.page_count(3) == 3
+    assert ranking.page(1, 3)['Participant ID'].tolist() == [7, 8, 6]
+    assert ranking.page(1, 3)['Rank'].tolist() == [1, 1, 3]
+    assert ranking.page(3, 3)['Participant ID'].tolist() == [2, 1]
+    assert ranking.position_of(1) == 7 and ranking.position_of(99) is None
+    assert ranking.neighbours(5, 1)['Participant ID'].tolist() == [6, 5, 4]
+    assert ranking.neighbours(99, 1).empty
+    assert Ranking.from_entries(pd.DataFrame(), {}).page_count(3) == 1
+
+def test_rank_baseline_is_frozen_at_the_boundary(tmp_path, monkeypatch):
+    today = pd.Timestamp.now().normalize()
+    yesterday = today - pd.Timedelta(days=1)
+    store = DatasetStore(pd.DataFrame([_daily(1, yesterday, 50), _daily(2, yesterday, 40), _daily(2, today, 90)]))
+    caches = [{}]
+    monkeypatch.setattr(ranking, 'query_cache', lambda: caches[-1])
+    monkeypatch.setattr(ranking, 'query_lock', threading.Lock)
+
+    with tenant_scope(str(tmp_path)):
+        assert rank_baseline(store.current, 'All Time', 'daily', {}) == {1: 1, 2: 2}
+        # A backdated entry changes yesterday's standings but not the frozen baseline.
+        store.upsert(_daily(3, yesterday, 99), persist=False)
+        assert rank_baseline(store.current, 'All Time', 'daily', {}) == {1: 1, 2: 2}
+
+        # Another process reads the persisted baseline back without aggregating.
+        caches.append({})
+        monkeypatch.setattr(ranking, '_frozen_ranks', None)
+        assert rank_baseline(store.current, 'This Week', 'daily', {}) == {1: 1, 2: 2}
+    assert json.loads((tmp_path / RANK_HISTORY_FILE).read_text())['daily']['boundary'] == str(today.date())
@@ -0,0 +1,35 @@
+import pandas as pd
+import replay
+from activity import day_number
+
+def _replay(df, today):
+    results = {}
+    for partition in replay.build_partitions(df, 2):
+        results.update(replay.replay_partition(partition, day_number(today)))
+    return results
+
+def test_only_daily_lines_make_a_day_active():
+    df = pd.DataFrame({
+        'Participant ID': [1, 1, 1, 2],
+        'Date': ['2026-10-01', '2026-10-02', '2026-10-03', '2026-10-02'],
+        'Source': ['daily', 'challenge', 'daily', 'punishment'],
+        'Total Points': [50, 15, 60, -10]
+    })
+    results = _replay(df, '2026-10-03')
+    assert results[1][1]['longest_streak'] == 1
+    assert results[1][1]['current_streak'] == 1
+    # No daily lines: no streak record at all.
+    assert results[2][1] is None
+    _, streaks, _ = replay.rebuild_stores(results, {}, {'participants': {}, 'milestones_awarded': {}})
+    assert list(streaks['participants']) == ['1']
+
+def test_achievements_counted_per_daily_line():
+    df = pd.DataFrame({
+        'Participant ID': [1, 1, 1],
+        'Date': ['2026-10-01', '2026-10-02', '2026-10-03'],
+        'Source': ['daily'] * 3,
+        'Total Points': [150, 20, 160]
+    })
+    achievements = _replay(df, '2026-10-03')[1][3]
+    assert achievements['performance'] == {'Perfect Score': 2}
+    assert achievements['streak'] == {'Consistency King': 1}
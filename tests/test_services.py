@@ -0,0 +1,25 @@
+import json
+import metrics
+from data_manager import tenant_scope
+from systems import Services
+
+def test_bootstrap_loads_migrated_stores_on_worker_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, '_registry', [])
+    load_seconds = metrics.Histogram('test_store_load_seconds', 'Store loads.', [1])
+    monkeypatch.setattr('systems.services.STORE_LOAD_SECONDS', load_seconds)
+    (tmp_path / 'leaderboard_data.csv').write_text(
+        'Name,Date,Month,Base Points,Bonus Points,Total Points\n'
+        'Eman,2026-10-01,2026-10,40,5,45\n'
+    )
+    (tmp_path / 'participant_badges.json').write_text(json.dumps({'Eman': ['🏆 Top Performer']}))
+    with tenant_scope(str(tmp_path)):
+        services = Services()
+
+    eman = services.registry.id_of('Eman')
+    # The workers see what the registry migrated before the pool started.
+    assert services.dataset.current.totals == {eman: 45}
+    assert services.badges.get(eman) == ['🏆 Top Performer']
+    assert services.streaks.badges is services.badges
+    assert sorted(dict(key)['store'] for key in load_seconds.values) == [
+        'achievements', 'badges', 'challenges', 'entries', 'groups', 'streaks'
+    ]
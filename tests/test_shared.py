@@ -0,0 +1,54 @@
+import threading
+from systems.shared import RWLock, SharedService, reads, writes
+
+class _Counter(SharedService):
+    def __init__(self):
+        super().__init__()
+        self.value = 0
+        self.seen = []
+
+    @writes
+    def bump(self):
+        self.seen.append(self.version)
+        self.value += 1
+        return self.read()
+
+    @reads
+    def read(self):
+        return self.value
+
+def test_version_is_bumped_after_the_write():
+    counter = _Counter()
+    assert counter.bump() == 1
+    assert counter.seen == [0] and counter.version == 1
+    assert counter.read() == 1 and counter.version == 1
+
+def test_writer_waits_for_readers():
+    lock = RWLock()
+    events = []
+    written = threading.Event()
+
+    def write():
+        with lock.write():
+            events.append('write')
+        written.set()
+
+    with lock.read():
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not written.wait(0.1)
+        events.append('read done')
+    writer.join(1)
+    assert events == ['read done', 'write']
+
+def test_writer_may_reenter_and_read():
+    lock = RWLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    # Fully released: another thread can take the write lock.
+    other = threading.Thread(target=lambda: lock.write().__enter__())
+    other.start()
+    other.join(1)
+    assert not other.is_alive()
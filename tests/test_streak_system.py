@@ -0,0 +1,26 @@
+import pandas as pd
+from data_manager import tenant_scope
+from dataset import DatasetStore, entry_key
+from systems import BadgeStore, StreakSystem
+
+def test_milestones_are_awarded_for_the_thresholds_crossed(tmp_path):
+    with tenant_scope(str(tmp_path)):
+        streaks = StreakSystem(BadgeStore())
+        assert streaks.check_milestones(1, 900, 5100) == ['First 1000', '5000 Club']
+        assert streaks.check_milestones(1, 5100, 5200) == []
+        # Dropping below a tier and crossing it again does not award it twice.
+        assert streaks.check_milestones(1, 4900, 5100) == []
+        # Already above a tier without its badge: only new crossings count.
+        assert streaks.check_milestones(2, 1500, 1600) == []
+        assert streaks.get_badges(1) == ['First 1000', '5000 Club']
+        assert streaks.data['milestones_awarded'] == {'1': ['First 1000', '5000 Club']}
+
+def test_running_totals_follow_keyed_writes():
+    store = DatasetStore(pd.DataFrame({
+        'Participant ID': [1, 1], 'Date': pd.to_datetime(['2026-10-01', '2026-10-02']),
+        'Source': ['daily', 'daily'], 'Ref': ['', ''], 'Total Points': [600, 300]
+    }))
+    snapshot = store.upsert({**store.get(entry_key(1, '2026-10-02')), 'Total Points': 500}, persist=False)
+    assert snapshot.total_change(1) == (900, 1100)
+    snapshot = store.delete(entry_key(1, '2026-10-01'), persist=False)
+    assert snapshot.total_change(1) == (1100, 500) and snapshot.totals == {1: 500}
@@ -0,0 +1,46 @@
+from tenants import TenantCache, tenant_directory
+
+def _cache(budget, idle_seconds=60):
+    loads = []
+    def load(name):
+        loads.append(name)
+        return name
+    return TenantCache(load, lambda value: 10, budget=budget, idle_seconds=idle_seconds), loads
+
+def _visit(cache, *names):
+    for name in names:
+        with cache.checkout(name):
+            pass
+
+def test_least_recently_used_tenant_is_evicted_over_budget():
+    cache, loads = _cache(budget=20)
+    _visit(cache, 'a', 'b', 'a', 'c')
+    assert list(cache._entries) == ['a', 'c']
+    _visit(cache, 'a', 'b')
+    assert loads == ['a', 'b', 'c', 'b']
+
+def test_tenant_in_use_is_never_evicted():
+    cache, loads = _cache(budget=10)
+    with cache.checkout('a') as value:
+        _visit(cache, 'b')
+        assert value == 'a' and list(cache._entries) == ['a']
+    # b was dropped instead; once released, a alone fits the budget.
+    assert list(cache._entries) == ['a']
+
+def test_idle_tenants_are_evicted(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('tenants.time.monotonic', lambda: clock[0])
+    cache, loads = _cache(budget=100, idle_seconds=60)
+    _visit(cache, 'a')
+    clock[0] = 30.0
+    _visit(cache, 'b')
+    clock[0] = 70.0
+    _visit(cache, 'b')
+    assert list(cache._entries) == ['b']
+
+def test_tenant_names_are_plain_directories(tmp_path, monkeypatch):
+    monkeypatch.setattr('tenants.TENANTS_DIR', str(tmp_path))
+    (tmp_path / 'club-1').mkdir()
+    assert tenant_directory('') == ''
+    assert tenant_directory('club-1') == str(tmp_path / 'club-1')
+    assert tenant_directory('missing') is None and tenant_directory('../club-1') is None
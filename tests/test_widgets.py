@@ -0,0 +1,26 @@
+from streamlit.testing.v1 import AppTest
+from config import PARTICIPANT_SEARCH_LIMIT
+
+def _picker_app():
+    import streamlit as st
+    from systems import ParticipantRegistry
+    from ui.widgets import participant_multi_picker, participant_picker
+
+    registry = ParticipantRegistry()
+    for number in range(50):
+        registry.add(f'Runner {number:02}')
+    last = registry.id_of('Runner 49')
+    if 'single' not in st.session_state:
+        st.session_state.single = last
+    participant_picker(registry, 'One', key='single')
+    participant_multi_picker(registry, 'Many', key='many', default=[last])
+
+def test_pickers_never_send_more_than_the_limit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_function(_picker_app, default_timeout=30)
+    at.run()
+    assert not at.exception
+    single, many = at.selectbox(key='single'), at.multiselect(key='many')
+    assert len(single.options) == len(many.options) == PARTICIPANT_SEARCH_LIMIT
+    assert single.options[0] == many.options[0] == 'Runner 49'
+    assert single.value == 60 and many.value == [60]  # 10 default participants come first.
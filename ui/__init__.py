@@ -1,3 +1,3 @@
 
-from .main_ui import display_leaderboard, display_analytics, display_badges, display_achievements, display_challenges
-from .admin_ui import display_admin_dashboard, display_entry_management, display_badge_management, display_challenge_management
+from .main_ui import display_leaderboard, display_group_standings, display_analytics, display_badges, display_achievements, display_challenges
+from .admin_ui import display_admin_dashboard, display_entry_management, display_badge_management, display_challenge_management, display_participant_management
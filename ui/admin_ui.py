@@ -1,46 +1,326 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from config import DEFAULT_PARTICIPANTS, CATEGORIES, MAX_BONUS, BADGES, PUNISHMENT_BADGES
-from data_manager import save_data, load_badges, save_badges
+import dataset
+import data_manager
+import profiling
+from config import CATEGORIES, MAX_BONUS, BADGES, PUNISHMENT_BADGES, PROFILING_ENABLED
 from utils import show_confetti
-from systems.streak_system import StreakSystem
+from profiling import span, timed
+from .widgets import participant_picker
 
-def display_admin_dashboard(df):
+@timed()
+def display_admin_dashboard(snapshot):
     """Displays the admin dashboard with key metrics."""
     st.subheader("📊 Admin Dashboard")
+    fallbacks = data_manager.date_fallbacks()
+    if fallbacks:
+        st.warning(
+            "Some entry dates are not in YYYY-MM-DD format and were parsed by inference: "
+            + ", ".join(fallbacks)
+        )
+    today = datetime.now().date()
+    df_30 = snapshot.rows_between(today - pd.Timedelta(days=29), today + pd.Timedelta(days=1))
+    daily = df_30.groupby(pd.to_datetime(df_30['Date']).dt.date)['Total Points'].sum()
     col1, col2 = st.columns(2)
     with col1:
-        today = datetime.now().date()
-        today_mask = pd.to_datetime(df['Date']).dt.date == today
-        total_points_today = df[today_mask]['Total Points'].sum()
-        st.metric("Total Points Awarded Today", int(total_points_today))
+        st.metric("Total Points Awarded Today", int(daily.get(today, 0)))
     with col2:
-        active_participants_today = df[today_mask]['Name'].nunique()
-        st.metric("Active Participants Today", int(active_participants_today))
+        st.metric("Active Participants Today", snapshot.activity.active_count(today))
     
     st.subheader("📈 Total Points Awarded Per Day (Last 30 Days)")
-    last_30 = datetime.now() - pd.Timedelta(days=29)
-    df_30 = df[pd.to_datetime(df['Date']) >= last_30]
     if not df_30.empty:
-        daily = df_30.groupby(pd.to_datetime(df_30['Date']).dt.date)['Total Points'].sum().reset_index()
+        daily = daily.rename_axis('Date').reset_index()
         import plotly.express as px
-        fig = px.line(daily, x='Date', y='Total Points', markers=True)
+        with span("admin_dashboard.figures"):
+            fig = px.line(daily, x='Date', y='Total Points', markers=True)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No data for the last 30 days.")
 
-def display_entry_management(df, streak_system):
+    display_performance_panel()
+
+def display_performance_panel():
+    """Displays per-span timings aggregated over recent reruns."""
+    st.subheader("⏱️ Performance")
+    if not PROFILING_ENABLED:
+        st.info("Profiling is disabled. Set PROFILING_ENABLED=true to collect timings.")
+        return
+
+    rows = profiling.summary()
+    if not rows:
+        st.info("No reruns recorded yet.")
+        return
+
+    st.caption(f"Aggregated over the last {profiling.recorded_reruns()} reruns across all sessions.")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    if st.button("Reset Timings", key="reset_timings"):
+        profiling.reset()
+        st.rerun()
+
+def _points_sliders(prefix, entry=None):
+    """Renders the category and bonus sliders; returns (category points, base total, bonus)."""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("### Base Points")
+        base_points = {}
+        for category, max_points in CATEGORIES.items():
+            base_points[category] = st.slider(
+                f"{category} ({max_points})",
+                0, max_points,
+                value=int(entry.get(category, 0)) if entry is not None else 0,
+                key=f"{prefix}_{category}"
+            )
+        total_base = sum(base_points.values())
+        st.metric("Total Base Points", f"{total_base}/100")
+
+    with col2:
+        st.write("### Bonus Points")
+        bonus_points = st.slider(
+            "Bonus Points", 0, MAX_BONUS,
+            value=int(entry.get('Bonus Points', 0)) if entry is not None else 0,
+            key=f"{prefix}_bonus_points"
+        )
+        st.metric("Total Points", f"{total_base + bonus_points}/150")
+    return base_points, total_base, bonus_points
+
+def _make_entry(participant_id, date, base_points, total_base, bonus_points):
+    return {
+        'Participant ID': participant_id,
+        'Date': pd.Timestamp(date),
+        'Month': pd.Period(date, freq='M'),
+        'Source': 'daily',
+        'Ref': '',
+        **base_points,
+        'Base Points': total_base,
+        'Bonus Points': bonus_points,
+        'Total Points': total_base + bonus_points
+    }
+
+def _publish_entry(entry, registry, streak_system):
+    """Upserts a ledger line under its key and runs the badge checks."""
+    entry['Name'] = registry.name_of(entry['Participant ID'])
+    snapshot = dataset.upsert(entry)
+    streak_system.trigger_milestone_and_streak_checks(entry['Participant ID'], snapshot)
+
+@timed()
+def display_entry_management(activity, registry, streak_system):
     """Displays the UI for adding and editing entries."""
     st.subheader("Entry Management")
-    # ... (Add/Edit entry form logic)
+    entry_tabs = st.tabs(["Add New Entry", "Edit Existing Entry"])
+
+    with entry_tabs[0]:
+        entry_date = st.date_input("Select Date", datetime.now(), key="new_entry_date")
+        participant_id = participant_picker(registry, "Select Participant", key="new_entry_participant")
+        base_points, total_base, bonus_points = _points_sliders("new")
+        if st.button("Save Entry") and participant_id is not None:
+            _publish_entry(
+                _make_entry(participant_id, entry_date, base_points, total_base, bonus_points),
+                registry, streak_system
+            )
+            st.success("Entry saved successfully!")
+
+    with entry_tabs[1]:
+        # Only daily lines are edited here; punishments and awards have their own tabs.
+        # The activity bitmaps know which days have daily lines and whose they are.
+        available_dates = activity.active_dates()
+        if not available_dates:
+            st.info("No existing entries to edit")
+            return
+        selected_date = st.selectbox("Select Date to Edit", available_dates, key="edit_entry_date")
+        participant_id = participant_picker(
+            registry, "Select Participant to Edit", key="edit_entry_participant",
+            candidates=activity.active_on(selected_date)
+        )
+        if participant_id is None:
+            return
+
+        entry_to_edit = dataset.get(dataset.entry_key(participant_id, selected_date))
+        if entry_to_edit is None:
+            st.info("That entry was removed.")
+            return
+        base_points, total_base, bonus_points = _points_sliders("edit", entry_to_edit)
+        if st.button("Update Entry"):
+            _publish_entry(
+                _make_entry(participant_id, selected_date, base_points, total_base, bonus_points),
+                registry, streak_system
+            )
+            st.success("Entry updated successfully!")
+            st.rerun()
+
+def _apply_points_adjustment(participant_id, points, source, ref, registry, streak_system):
+    """Adds points to the participant's ledger line for today's source and reference.
+
+    Used for punishments and challenge awards; repeated adjustments on the same
+    day accumulate on one line.
+    """
+    today = datetime.now().date()
+
+    def adjust(entry):
+        if entry is None:
+            entry = dataset.ledger_row(participant_id, today, source, ref, 0)
+            entry['Name'] = registry.name_of(participant_id)
+        else:
+            entry = dict(entry)
+        entry['Total Points'] += points
+        return entry
 
-def display_badge_management():
+    snapshot = dataset.modify(dataset.entry_key(participant_id, today, source, ref), adjust)
+    streak_system.trigger_milestone_and_streak_checks(participant_id, snapshot)
+
+@timed()
+def display_badge_management(registry, badges, streak_system):
     """Displays the UI for awarding and removing badges."""
     st.markdown("### 🏅 Badge Management")
-    # ... (Badge management logic)
+    tabs = st.tabs(["Award/Remove Badges", "Apply Punishment", "Current Badges"])
+
+    with tabs[0]:
+        mode = st.radio("Mode", ["Award Badge", "Remove Badge"], key="badge_mode")
+        participant_id = participant_picker(registry, "Select Participant", key="badge_mgmt_participant")
+        participant_badges = badges.get(participant_id) if participant_id is not None else []
+
+        if mode == "Award Badge":
+            selected_badge = st.selectbox("Select Badge", list(BADGES.keys()), key="badge_mgmt_type")
+            if st.button("Award Badge") and participant_id is not None:
+                if badges.award(participant_id, selected_badge):
+                    show_confetti()
+                    st.success(f"Badge awarded to {registry.name_of(participant_id)}!")
+        elif participant_badges:
+            selected_badge = st.selectbox("Select Badge to Remove", participant_badges, key="badge_remove_select")
+            if st.button("Remove Badge"):
+                badges.remove(participant_id, selected_badge)
+                st.success(f"Badge removed from {registry.name_of(participant_id)}")
+        else:
+            st.info("No badges to remove for this participant")
+
+    with tabs[1]:
+        st.markdown("### ⚠️ Apply Punishment")
+        participant_id = participant_picker(registry, "Select Participant", key="punishment_participant")
+        punishment_type = st.selectbox("Select Punishment", list(PUNISHMENT_BADGES.keys()), key="punishment_type")
+        if st.button("Apply Punishment") and participant_id is not None:
+            points = PUNISHMENT_BADGES[punishment_type]
+            _apply_points_adjustment(participant_id, points, 'punishment', punishment_type, registry, streak_system)
+            st.success(f"Applied {punishment_type} ({points} points) to {registry.name_of(participant_id)}")
+
+    with tabs[2]:
+        st.markdown("### Current Badges")
+        for participant_id, participant_badges in badges.all().items():
+            st.markdown(f"**{registry.name_of(participant_id)}**: {' '.join(participant_badges)}")
 
-def display_challenge_management(challenge_system):
-    """Displays the UI for managing challenges."""
+@timed()
+def display_challenge_management(challenge_system, registry, streak_system):
+    """Displays the UI for adding challenges and reviewing join requests."""
     st.markdown("### ⚔️ Manage Challenges")
-    # ... (Challenge management logic)
\ No newline at end of file
+    tabs = st.tabs(["Add Challenge", "Pending Requests", "Remove Challenge"])
+
+    with tabs[0]:
+        name = st.text_input("Challenge Name", key="challenge_new_name")
+        description = st.text_area("Description", key="challenge_new_description")
+        bonus_points = st.number_input("Bonus Points", 0, MAX_BONUS, 10, key="challenge_new_points")
+        if st.button("Add Challenge"):
+            if name.strip() and challenge_system.add_challenge(name.strip(), description, int(bonus_points)):
+                st.success(f"Challenge '{name.strip()}' added.")
+            else:
+                st.error("That name is empty or already used.")
+
+    with tabs[1]:
+        pending = challenge_system.pending_list()
+        if not pending:
+            st.info("No pending requests.")
+        for challenge_name, participant_id, points in pending:
+            col1, col2, col3 = st.columns([3, 1, 1])
+            col1.markdown(f"**{registry.name_of(participant_id)}** → {challenge_name} (+{points})")
+            if col2.button("Approve", key=f"approve_{challenge_name}_{participant_id}"):
+                if challenge_system.approve_request(participant_id, challenge_name, points):
+                    _apply_points_adjustment(participant_id, points, 'challenge', challenge_name, registry, streak_system)
+                    st.rerun()
+            if col3.button("Reject", key=f"reject_{challenge_name}_{participant_id}"):
+                challenge_system.reject_request(participant_id, challenge_name)
+                st.rerun()
+
+    with tabs[2]:
+        challenge_names = [challenge['name'] for challenge in challenge_system.view()]
+        if not challenge_names:
+            st.info("No challenges to remove.")
+        else:
+            challenge_name = st.selectbox("Select Challenge", challenge_names, key="challenge_remove_select")
+            if st.button("Remove Challenge"):
+                challenge_system.remove_challenge(challenge_name)
+                st.rerun()
+
+@timed()
+def display_participant_management(registry, groups):
+    """Displays the UI for adding, renaming, deactivating and grouping participants."""
+    st.markdown("### 👥 Manage Participants")
+    tabs = st.tabs(["Add Participant", "Rename Participant", "Activate/Deactivate", "Groups"])
+
+    with tabs[0]:
+        new_name = st.text_input("Participant Name", key="registry_new_name")
+        if st.button("Add Participant"):
+            if registry.add(new_name) is None:
+                st.error("That name is empty or already registered.")
+            else:
+                st.success(f"Added {new_name.strip()}.")
+
+    # Renaming and reactivating also apply to inactive participants.
+    all_ids = set(registry.names)
+    with tabs[1]:
+        participant_id = participant_picker(
+            registry, "Select Participant", key="registry_rename_participant", candidates=all_ids
+        )
+        new_name = st.text_input("New Name", key="registry_rename_name")
+        if st.button("Rename Participant", disabled=participant_id is None):
+            if registry.rename(participant_id, new_name):
+                # Entries only store IDs, so renaming just refreshes the derived Name column.
+                dataset.publish(registry.attach_names, persist=False)
+                st.success("Participant renamed.")
+            else:
+                st.error("That name is empty or already registered.")
+
+    with tabs[2]:
+        participant_id = participant_picker(
+            registry, "Select Participant", key="registry_active_participant", candidates=all_ids
+        )
+        if participant_id is not None:
+            is_active = participant_id in registry.active
+            st.markdown(f"Status: **{'Active' if is_active else 'Inactive'}**")
+            if st.button("Deactivate" if is_active else "Activate", key="registry_toggle_active"):
+                registry.set_active(participant_id, not is_active)
+                st.rerun()
+
+    with tabs[3]:
+        display_group_management(registry, groups)
+
+def display_group_management(registry, groups):
+    """Displays the UI for creating and removing groups and assigning participants to them."""
+    def group_label(gid):
+        return "(none)" if gid is None else groups.path(gid)
+    group_ids = sorted(groups.groups, key=groups.path)
+
+    st.markdown("#### Create Group")
+    name = st.text_input("Group Name", key="group_new_name")
+    parent = st.selectbox("Parent Group", [None] + group_ids, format_func=group_label, key="group_new_parent")
+    if st.button("Create Group"):
+        if groups.add(name, parent) is None:
+            st.error("That name is empty or already used under the same parent.")
+        else:
+            st.success(f"Created {name.strip()}.")
+            st.rerun()
+
+    st.markdown("#### Assign Participant")
+    participant_id = participant_picker(registry, "Select Participant", key="group_assign_participant")
+    if participant_id is not None:
+        st.markdown(f"Current group: **{group_label(groups.group_of.get(participant_id))}**")
+        gid = st.selectbox("Group", [None] + group_ids, format_func=group_label, key="group_assign_group")
+        if st.button("Assign"):
+            groups.assign(participant_id, gid)
+            st.success("Group updated.")
+
+    if group_ids:
+        st.markdown("#### Remove Group")
+        gid = st.selectbox("Group to Remove", group_ids, format_func=group_label, key="group_remove")
+        st.caption("Its subgroups and members move up to its parent group.")
+        if st.button("Remove Group"):
+            groups.remove(gid)
+            st.success("Group removed.")
+            st.rerun()
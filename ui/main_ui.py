@@ -1,30 +1,75 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-from config import DEFAULT_PARTICIPANTS, BADGES, WARNING_BADGES
-from data_manager import load_badges
+from config import (
+    BADGES, WARNING_BADGES, CATEGORIES, MAX_BONUS, LEADERBOARD_PAGE_SIZE, LEADERBOARD_NEIGHBOUR_RADIUS,
+    ANALYTICS_RADAR_LIMIT, ANALYTICS_DEFAULT_PARTICIPANTS, PERCENTILE_MIN_ENTRIES
+)
+from activity import day_number
+from dataset import entry_key
+from ranking import rank_movement
+from profiling import span, timed
+from .widgets import participant_picker, participant_multi_picker
 
-def display_leaderboard(cumulative_df, df):
-    """Displays the main leaderboard and top 3 performers."""
+def leaderboard_column_config(min_total, max_total):
+    """Builds the native column configuration for the leaderboard table."""
+    # A progress bar scaled to the period's range replaces the Styler colour
+    # gradient, so no per-cell colours have to be computed or serialized.
+    return {
+        'Participant ID': None,
+        'Rank': st.column_config.NumberColumn(format="%d"),
+        'Change': st.column_config.TextColumn(help="Places gained or lost since the selected baseline"),
+        'Base Points': st.column_config.NumberColumn(format="%d"),
+        'Bonus Points': st.column_config.NumberColumn(format="%d"),
+        'Challenge Points': st.column_config.NumberColumn(format="%d"),
+        'Punishment Points': st.column_config.NumberColumn(format="%d"),
+        'Total Points': st.column_config.ProgressColumn(
+            format="%d",
+            min_value=min(0, int(min_total)),
+            max_value=max(1, int(max_total))
+        )
+    }
+
+def _select_leaderboard_page(ranking):
+    """Returns the slice of the ranking chosen by the page controls."""
+    user = st.session_state.get('user')
+    if ranking.position_of(user) is not None and st.toggle("📍 Jump to my rank", key="leaderboard_jump"):
+        return ranking.neighbours(user, LEADERBOARD_NEIGHBOUR_RADIUS)
+
+    page_count = ranking.page_count(LEADERBOARD_PAGE_SIZE)
+    if page_count == 1:
+        return ranking.top(LEADERBOARD_PAGE_SIZE)
+    if st.session_state.get('leaderboard_page', 1) > page_count:
+        st.session_state.leaderboard_page = page_count
+    page_number = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="leaderboard_page")
+    return ranking.page(page_number, LEADERBOARD_PAGE_SIZE)
+
+@timed()
+def display_leaderboard(ranking, snapshot, cube, badges, baseline_ranks):
+    """Displays one page of the leaderboard with rank movement and the top 3 performers."""
     cols = st.columns([3, 1])
-    badges_data = load_badges()
+    page_df = ranking.top(0)
 
     with cols[0]:
-        if not cumulative_df.empty:
-            display_df = cumulative_df[['Name', 'Rank', 'Base Points', 'Bonus Points', 'Total Points']]
+        if not ranking.empty:
+            page_df = _select_leaderboard_page(ranking)
+            table = page_df.copy()
+            table.insert(table.columns.get_loc('Rank') + 1, 'Change', rank_movement(page_df, baseline_ranks))
             st.dataframe(
-                display_df.style.background_gradient(subset=['Total Points'], cmap='YlGn').format(
-                    {'Base Points': '{:.0f}', 'Bonus Points': '{:.0f}', 'Total Points': '{:.0f}'}
-                ),
+                table,
+                column_config=leaderboard_column_config(ranking.min_total, ranking.max_total),
                 use_container_width=True,
                 hide_index=True
             )
+            if len(page_df):
+                st.caption(f"Showing ranks {page_df['Rank'].iloc[0]}–{page_df['Rank'].iloc[-1]} of {len(ranking)} participants.")
+            _show_user_percentile(snapshot)
         else:
             st.info("No data to display for the selected period.")
 
     with cols[1]:
         st.markdown("### 🏅 Top 3 Performers")
-        top_3 = cumulative_df.head(3)
+        top_3 = ranking.top(3)
         if not top_3.empty:
             for _, row in top_3.iterrows():
                 medal = "🥇" if row['Rank'] == 1 else "🥈" if row['Rank'] == 2 else "🥉"
@@ -33,51 +78,90 @@ def display_leaderboard(cumulative_df, df):
                                 f"<h5>{medal} {row['Name']}</h5>"
                                 f"<p>{int(row['Total Points'])} pts</p>"
                                 f"</div>", unsafe_allow_html=True)
-                    if row['Name'] in badges_data:
-                        st.markdown(" ".join(badges_data[row['Name']]))
+                    participant_badges = badges.get(row['Participant ID'])
+                    if participant_badges:
+                        st.markdown(" ".join(participant_badges))
         else:
             st.info("No performers to display.")
 
     # --- Warning Badges ---
-    for _, participant_data in cumulative_df.iterrows():
-        historical_data = df[df['Name'] == participant_data['Name']].copy()
-        if 'Date' in historical_data.columns:
-            historical_data['Date'] = pd.to_datetime(historical_data['Date'])
-            historical_data = historical_data.sort_values('Date', ascending=False)
+    # Only the participants on the visible page are scanned.
+    with span("leaderboard.warning_scan"):
+        declining = cube.declining()
+        for _, participant_data in page_df.iterrows():
+            warning_badges = check_warning_badges(participant_data, declining)
+            if warning_badges:
+                with st.expander(f"⚠️ Warnings for {participant_data['Name']}"):
+                    for warning in warning_badges:
+                        st.markdown(f"- {warning}")
+
 
-        warning_badges = check_warning_badges(participant_data, historical_data)
-        if warning_badges:
-            with st.expander(f"⚠️ Warnings for {participant_data['Name']}"):
-                for warning in warning_badges:
-                    st.markdown(f"- {warning}")
+@timed()
+def display_group_standings(rollup, groups):
+    """Displays the group leaderboard for one level of the group hierarchy."""
+    st.markdown("### 👥 Group Standings")
+    parents = [None] + [gid for gid in groups.groups if groups.children(gid)]
+    parent = st.selectbox(
+        "Groups in",
+        parents,
+        format_func=lambda gid: "All top-level groups" if gid is None else groups.path(gid),
+        key="group_standings_parent"
+    )
+    st.dataframe(
+        rollup.standings(groups, parent),
+        column_config={'Average Points': st.column_config.NumberColumn(format="%.1f")},
+        use_container_width=True,
+        hide_index=True
+    )
+
+def _show_user_percentile(snapshot):
+    """Tells the selected participant where their latest daily score falls in its month.
 
+    Uses the same sketch and midrank as the percentile badges, so the two agree.
+    """
+    user = st.session_state.get('user')
+    last_active = snapshot.activity.last_active(user) if user is not None else None
+    if last_active is None:
+        return
+    row = snapshot.get(entry_key(user, last_active))
+    month = snapshot.sketches.month(day_number(last_active))
+    if row is None or month.n < PERCENTILE_MIN_ENTRIES:
+        return
+    # Rounded first, so a midrank of exactly 0.99 reads as the top 1%.
+    top = max(1, int(np.ceil(round(100 * (1 - month.midrank(row['Total Points'])), 6))))
+    st.info(f"Your latest daily score ({int(row['Total Points'])} pts on {last_active}) is in the top {top}% of its month.")
 
-def check_warning_badges(participant_data, historical_data):
+def check_warning_badges(participant_data, declining):
     """Checks for and returns any warning badges for a participant."""
     warnings = []
-    # ... (logic for checking warning conditions)
+    if participant_data['Participant ID'] in declining:
+        warnings.append(f"📉 Declining Trend: {WARNING_BADGES['📉 Declining Trend']}")
     return warnings
 
-def display_analytics(df, achievement_system, challenge_system):
+@timed()
+def display_analytics(snapshot, registry, achievement_system, challenge_system, activity, cube, sketches):
     """Displays the analytics tab with charts and stats."""
     st.subheader("Monthly Analytics")
 
-    if df.empty or df['Date'].isnull().all():
+    bounds = snapshot.date_bounds()
+    if bounds is None:
         st.info("No analytics to display. Add some entries first.")
         return
 
     # --- Filters ---
-    participants = st.multiselect(
-        "Select Participants",
-        options=df['Name'].unique(),
-        default=df['Name'].unique()
+    # Starts with the all-time leaders; anyone else is found by search.
+    totals = cube.monthly('Total Points').sum(axis=1)
+    leaders = [cube.ids[row] for row in np.argsort(-totals, kind='stable')[:ANALYTICS_DEFAULT_PARTICIPANTS]]
+    participants = participant_multi_picker(
+        registry, "Select Participants", key="analytics_participants",
+        candidates=set(cube.ids), default=leaders
     )
 
     date_range = st.date_input(
         "Select Date Range",
-        value=(df['Date'].min(), df['Date'].max()),
-        min_value=df['Date'].min(),
-        max_value=df['Date'].max(),
+        value=bounds,
+        min_value=bounds[0],
+        max_value=bounds[1],
     )
 
     if not participants or not date_range or len(date_range) != 2:
@@ -85,58 +169,161 @@ def display_analytics(df, achievement_system, challenge_system):
         return
 
     # --- Filtered Data ---
-    filtered_df = df[
-        df['Name'].isin(participants) &
-        (df['Date'].dt.date >= date_range[0]) &
-        (df['Date'].dt.date <= date_range[1])
-    ]
+    # Only the selected participants' rows in the range are materialized.
+    filtered_df = snapshot.rows_between(date_range[0], date_range[1] + pd.Timedelta(days=1), participants)
 
     if filtered_df.empty:
         st.info("No data available for the selected filters.")
         return
 
     # --- Charts ---
+    import plotly.express as px
     col1, col2 = st.columns(2)
     with col1:
         st.write("### Progress Over Time")
-        fig = px.line(
-            filtered_df,
-            x='Date',
-            y='Total Points',
-            color='Name',
-            markers=True,
-            title="Points Progression"
-        )
+        with span("analytics.figures"):
+            fig = px.line(
+                filtered_df,
+                x='Date',
+                y='Total Points',
+                color='Name',
+                markers=True,
+                title="Points Progression"
+            )
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         st.write("### Points Composition")
-        fig = px.sunburst(
-            filtered_df,
-            path=['Name'],
-            values='Total Points',
-            color='Base Points',
-            title="Total Points by Participant"
+        with span("analytics.figures"):
+            fig = px.sunburst(
+                filtered_df,
+                path=['Name'],
+                values='Total Points',
+                color='Base Points',
+                title="Total Points by Participant"
+            )
+        st.plotly_chart(fig, use_container_width=True)
+
+    display_distribution(sketches, *date_range)
+    display_activity(activity, registry, participants, *date_range)
+    display_categories(cube, registry, participants)
+
+def display_distribution(sketches, start, end):
+    """Displays the distribution of daily entry scores in a date range from the quantile sketches."""
+    st.write("### Score Distribution")
+    sketch = sketches.period(day_number(start), day_number(end))
+    if not sketch.n:
+        st.info("No daily entries in the selected range.")
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Daily Entries", sketch.n)
+    col2.metric("Median Score", f"{sketch.quantile(0.5):.0f}")
+    col3.metric("90th Percentile", f"{sketch.quantile(0.9):.0f}")
+
+    edges = np.arange(0, sum(CATEGORIES.values()) + MAX_BONUS + 20, 10)
+    counts = pd.DataFrame({'Score': edges[:-1], 'Entries': sketch.histogram(edges).round()})
+    import plotly.express as px
+    with span("analytics.figures"):
+        fig = px.bar(counts, x='Score', y='Entries')
+        fig.update_traces(offset=0, width=10)
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_activity(activity, registry, participants, start, end):
+    """Displays a participant's streaks, attendance and a GitHub-style activity heatmap."""
+    st.write("### Activity")
+    participant_id = st.selectbox(
+        "Participant", options=participants, format_func=registry.name_of, key="activity_participant"
+    )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Current Streak", f"{activity.current_streak(participant_id)} days")
+    col2.metric("Longest Streak", f"{activity.longest_streak(participant_id)} days")
+    col3.metric("Attendance", f"{activity.attendance(participant_id, start, end):.0%}")
+
+    # One column per week, Monday at the top; days outside the range stay blank.
+    grid_start = start - pd.Timedelta(days=start.weekday())
+    active = activity.days(participant_id, grid_start, end).astype(float)
+    active[:start.weekday()] = np.nan
+    weeks = -(-len(active) // 7)
+    grid = np.full(weeks * 7, np.nan)
+    grid[:len(active)] = active
+    import plotly.express as px
+    with span("analytics.figures"):
+        fig = px.imshow(
+            grid.reshape(weeks, 7).T,
+            x=pd.date_range(grid_start, periods=weeks, freq='7D'),
+            y=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+            color_continuous_scale=['#ebedf0', '#216e39'],
+            zmin=0, zmax=1,
+            aspect='auto'
         )
+        fig.update_coloraxes(showscale=False)
+        fig.update_traces(xgap=2, ygap=2, hovertemplate="Week of %{x}, %{y}<extra></extra>")
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_categories(cube, registry, participants):
+    """Displays category profiles, per-category leaders and month-over-month changes from the aggregate cube."""
+    st.write("### Categories")
+    months = cube.months[::-1]
+    month = st.selectbox("Month", months, format_func=lambda period: period.strftime('%B %Y'), key="category_month")
+
+    import plotly.express as px
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("#### Category Profile")
+        profiles = pd.DataFrame([
+            {'Name': registry.name_of(pid), 'Category': category, 'Share of Max': share}
+            for pid in participants[:ANALYTICS_RADAR_LIMIT]
+            for category, share in cube.category_profile(pid, month).items()
+        ])
+        with span("analytics.figures"):
+            fig = px.line_polar(
+                profiles, r='Share of Max', theta='Category', color='Name',
+                line_close=True, range_r=[0, 1], render_mode='svg'
+            )
         st.plotly_chart(fig, use_container_width=True)
+        if len(participants) > ANALYTICS_RADAR_LIMIT:
+            st.caption(f"Showing the first {ANALYTICS_RADAR_LIMIT} selected participants.")
+
+    with col2:
+        st.write("#### Category Leaders")
+        category = st.selectbox("Category", list(CATEGORIES), key="category_leaders")
+        leaders = pd.DataFrame(
+            [(registry.name_of(pid), int(points)) for pid, points in cube.leaders(category, month, 10)],
+            columns=['Name', category]
+        )
+        st.dataframe(leaders, use_container_width=True, hide_index=True)
 
-def display_badges():
+    st.write("#### Month-over-Month Change")
+    rows = [cube.rows[pid] for pid in participants if pid in cube.rows]
+    if len(months) < 2 or not rows:
+        st.info("Month-over-month changes need at least two months of entries.")
+        return
+    changes = pd.DataFrame(
+        cube.month_over_month()[rows],
+        index=[registry.name_of(cube.ids[row]) for row in rows],
+        columns=[period.strftime('%b %Y') for period in cube.months[1:]]
+    )
+    st.dataframe(changes.astype(int), use_container_width=True)
+
+@timed()
+def display_badges(registry, badges):
     """Displays the badges tab."""
-    badges_data = load_badges()
     st.markdown("### 🏅 Available Badges")
     for badge, description in BADGES.items():
         st.markdown(f"**{badge}**: {description}")
 
     st.markdown("### 🏆 Awarded Badges")
-    for participant, badges in badges_data.items():
-        if badges:
-            st.markdown(f"**{participant}**: {' '.join(badges)}")
+    for participant_id, participant_badges in badges.all().items():
+        st.markdown(f"**{registry.name_of(participant_id)}**: {' '.join(participant_badges)}")
 
-def display_achievements(achievement_system):
+@timed()
+def display_achievements(achievement_system, registry):
     """Displays the achievements tab."""
-    selected_participant = st.selectbox("Select Participant", DEFAULT_PARTICIPANTS, key="ach_part_select")
-    st.markdown(f"### 🏆 Achievements for {selected_participant}")
-    data = achievement_system.data.get(selected_participant, {})
+    selected_participant = participant_picker(registry, "Select Participant", key="ach_part_select")
+    if selected_participant is None:
+        return
+    st.markdown(f"### 🏆 Achievements for {registry.name_of(selected_participant)}")
+    data = achievement_system.get(selected_participant)
     if not data:
         st.info("No achievements yet.")
         return
@@ -145,14 +332,49 @@ def display_achievements(achievement_system):
         for achievement, count in achievements.items():
             st.markdown(f"- **{achievement}**: {count}")
 
-def display_challenges(challenge_system):
-    """Displays the challenges tab for users."""
+@timed()
+def display_challenges(challenge_system, registry, user, stats):
+    """Displays the challenges tab; user is the selected participant ID, or None for admins.
+
+    stats holds the per-challenge ledger totals from get_challenge_stats.
+    """
     st.markdown("### ⚔️ Active Challenges")
-    if challenge_system.challenges:
-        for name, challenge in challenge_system.challenges.items():
-            with st.expander(f"📌 {name}"):
-                st.markdown(f"**Description**: {challenge.get('description', 'N/A')}")
-                st.markdown(f"**Bonus Points**: {challenge.get('bonus_points', 0)}")
-                # ... (rest of challenge display logic)
-    else:
-        st.info("No active challenges.")
\ No newline at end of file
+    challenges = challenge_system.view()
+    if not challenges:
+        st.info("No active challenges.")
+        return
+    joined = challenge_system.joined(user) | challenge_system.pending_for(user)
+    completed = challenge_system.completed(user)
+    for challenge in challenges:
+        name = challenge['name']
+        with st.expander(f"📌 {name}"):
+            st.markdown(f"**Description**: {challenge.get('description', 'N/A')}")
+            st.markdown(f"**Bonus Points**: {challenge.get('bonus_points', 0)}")
+            if name in stats.index:
+                col1, col2 = st.columns(2)
+                col1.metric("Completions", int(stats.at[name, 'Completions']))
+                col2.metric("Points Awarded", int(stats.at[name, 'Points']))
+
+            st.markdown("**Current Participants:**")
+            if challenge['participants']:
+                for participant_id in sorted(challenge['participants'], key=registry.name_of):
+                    st.markdown(f"- {registry.name_of(participant_id)}")
+            else:
+                st.markdown("_No participants yet_")
+
+            pending = challenge['pending']
+            if pending:
+                st.markdown("**Pending Requests:**")
+                for participant_id in sorted(pending, key=registry.name_of):
+                    st.markdown(f"- {registry.name_of(participant_id)} _(pending approval)_")
+
+            if user is None:
+                continue
+            if name in completed:
+                st.success("✅ You have completed this challenge")
+            elif name in joined:
+                st.info("You have already applied or are participating in this challenge")
+            elif st.button("Apply for Challenge", key=f"apply_{name}"):
+                if challenge_system.request_join(user, name):
+                    st.success("Application submitted for approval!")
+                    st.rerun()
@@ -0,0 +1,43 @@
+import streamlit as st
+from config import PARTICIPANT_SEARCH_LIMIT
+
+def participant_picker(registry, label, key, candidates=None):
+    """Search-as-you-type participant picker; only the top matches are sent to the browser.
+
+    candidates restricts the choices to a set of IDs and defaults to the
+    active participants. Returns the selected participant ID or None.
+    """
+    if candidates is None:
+        candidates = registry.active
+    query = st.text_input("🔍 Search participants", key=f"{key}_query", placeholder="Type a name...")
+    options = registry.search(query, PARTICIPANT_SEARCH_LIMIT, candidates)
+
+    # With an empty search box, keep the current selection among the options.
+    selected = st.session_state.get(key)
+    if selected is not None and selected not in options and selected in candidates and not query:
+        options = [selected] + options[:PARTICIPANT_SEARCH_LIMIT - 1]
+
+    if not options:
+        st.info("No matching participants.")
+        return None
+    return st.selectbox(label, options, format_func=registry.name_of, key=key)
+
+def participant_multi_picker(registry, label, key, candidates=None, default=()):
+    """Search-as-you-type picker for several participants.
+
+    Only the current selection and the top matches are sent to the browser,
+    at most PARTICIPANT_SEARCH_LIMIT options. default is the selection the
+    first time the picker is shown. Returns the selected participant IDs.
+    """
+    if candidates is None:
+        candidates = registry.active
+    if key not in st.session_state:
+        st.session_state[key] = list(default)
+    query = st.text_input("🔍 Search participants", key=f"{key}_query", placeholder="Type a name...")
+    selected = [pid for pid in st.session_state[key] if pid in candidates][:PARTICIPANT_SEARCH_LIMIT]
+    matches = registry.search(query, PARTICIPANT_SEARCH_LIMIT, candidates)
+    options = selected + [pid for pid in matches if pid not in selected][:PARTICIPANT_SEARCH_LIMIT - len(selected)]
+    st.session_state[key] = selected
+    return st.multiselect(
+        label, options, format_func=registry.name_of, key=key, max_selections=PARTICIPANT_SEARCH_LIMIT
+    )